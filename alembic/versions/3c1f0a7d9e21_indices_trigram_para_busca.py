@@ -0,0 +1,54 @@
+"""índices de trigramas para a busca em clientes e produtos
+
+Revision ID: 3c1f0a7d9e21
+Revises: fad97b0eb4e6
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0a7d9e21'
+down_revision: Union[str, None] = 'fad97b0eb4e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGRAM_INDEXES = [
+    ('clientes', 'nome'),
+    ('clientes', 'email'),
+    ('clientes', 'cpf'),
+    ('produtos', 'nome'),
+    ('produtos', 'descricao'),
+    ('produtos', 'cod_barras'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Os índices GIN com gin_trgm_ops só existem no PostgreSQL; nos demais bancos a
+    # busca usa LIKE sem índice.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            f'ix_{table}_{column}_trgm',
+            table,
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column in reversed(TRIGRAM_INDEXES):
+        op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
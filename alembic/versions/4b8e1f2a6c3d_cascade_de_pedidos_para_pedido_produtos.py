@@ -0,0 +1,36 @@
+"""Add ON DELETE CASCADE to pedido_id in pedido_produtos
+
+Completa a cadeia clientes -> pedidos -> pedido_produtos iniciada em fad97b0eb4e6:
+apagar um cliente (ou um lote de pedidos) remove as linhas dos pedidos no próprio
+banco, sem que a aplicação precise carregá-las.
+
+Revision ID: 4b8e1f2a6c3d
+Revises: 7d2e4b91c0a5
+Create Date: 2026-10-18 14:37:05.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e1f2a6c3d'
+down_revision: Union[str, None] = '7d2e4b91c0a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('pedido_produtos_pedido_id_fkey', 'pedido_produtos', type_='foreignkey')
+    op.create_foreign_key(
+        'pedido_produtos_pedido_id_fkey', 'pedido_produtos', 'pedidos', ['pedido_id'], ['id'], ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('pedido_produtos_pedido_id_fkey', 'pedido_produtos', type_='foreignkey')
+    op.create_foreign_key('pedido_produtos_pedido_id_fkey', 'pedido_produtos', 'pedidos', ['pedido_id'], ['id'])
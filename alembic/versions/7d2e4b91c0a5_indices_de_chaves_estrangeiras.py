@@ -0,0 +1,45 @@
+"""índices das chaves estrangeiras e índices compostos de pedidos
+
+Revision ID: 7d2e4b91c0a5
+Revises: 3c1f0a7d9e21
+Create Date: 2026-10-18 11:02:17.840213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e4b91c0a5'
+down_revision: Union[str, None] = '3c1f0a7d9e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# pedidos.cliente_id é atendido pela coluna à esquerda de ix_pedidos_cliente_id_d_pedido
+INDEXES = [
+    ('ix_pedido_produtos_pedido_id', 'pedido_produtos', ['pedido_id']),
+    ('ix_pedido_produtos_produto_id', 'pedido_produtos', ['produto_id']),
+    ('ix_produto_imagens_produto_id', 'produto_imagens', ['produto_id']),
+    ('ix_pedidos_d_pedido', 'pedidos', ['d_pedido']),
+    ('ix_pedidos_cliente_id_d_pedido', 'pedidos', ['cliente_id', 'd_pedido']),
+    ('ix_pedidos_status_d_pedido', 'pedidos', ['status', 'd_pedido']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # No PostgreSQL os índices são criados com CONCURRENTLY, sem bloquear as escritas
+    # nas tabelas; isso exige rodar fora da transação da migração.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
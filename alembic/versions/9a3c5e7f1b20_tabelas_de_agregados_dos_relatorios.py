@@ -0,0 +1,54 @@
+"""tabelas de agregados dos relatórios de pedidos
+
+Depois do upgrade, preencha as tabelas com os pedidos existentes:
+    python -m scripts.rebuild_relatorios
+
+Revision ID: 9a3c5e7f1b20
+Revises: 4b8e1f2a6c3d
+Create Date: 2026-10-18 16:05:48.772019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3c5e7f1b20'
+down_revision: Union[str, None] = '4b8e1f2a6c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('relatorio_vendas_dia',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('pedidos', sa.Integer(), nullable=False),
+    sa.Column('itens', sa.Integer(), nullable=False),
+    sa.Column('receita', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('dia')
+    )
+    op.create_table('relatorio_vendas_produto',
+    sa.Column('produto_id', sa.Integer(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('receita', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('produto_id')
+    )
+    op.create_index(op.f('ix_relatorio_vendas_produto_quantidade'), 'relatorio_vendas_produto', ['quantidade'], unique=False)
+    op.create_index(op.f('ix_relatorio_vendas_produto_receita'), 'relatorio_vendas_produto', ['receita'], unique=False)
+    op.create_table('relatorio_pedidos_status',
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('pedidos', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('status')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('relatorio_pedidos_status')
+    op.drop_index(op.f('ix_relatorio_vendas_produto_receita'), table_name='relatorio_vendas_produto')
+    op.drop_index(op.f('ix_relatorio_vendas_produto_quantidade'), table_name='relatorio_vendas_produto')
+    op.drop_table('relatorio_vendas_produto')
+    op.drop_table('relatorio_vendas_dia')
@@ -0,0 +1,38 @@
+"""tabela de chaves de idempotência (Idempotency-Key)
+
+Revision ID: a7c9e1b3d5f6
+Revises: f3a5c7e9b1d4
+Create Date: 2026-10-18 22:15:03.842617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1b3d5f6'
+down_revision: Union[str, None] = 'f3a5c7e9b1d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chaves_idempotencia',
+    sa.Column('chave', sa.String(length=255), nullable=False),
+    sa.Column('rota', sa.String(length=200), nullable=False),
+    sa.Column('fingerprint', sa.String(length=32), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('corpo', sa.LargeBinary(), nullable=True),
+    sa.Column('expira_em', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('chave', 'rota')
+    )
+    op.create_index(op.f('ix_chaves_idempotencia_expira_em'), 'chaves_idempotencia', ['expira_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chaves_idempotencia_expira_em'), table_name='chaves_idempotencia')
+    op.drop_table('chaves_idempotencia')
@@ -0,0 +1,57 @@
+"""fila de jobs das operações pesadas
+
+Revision ID: b8d0f2a4c6e8
+Revises: a7c9e1b3d5f6
+Create Date: 2026-10-18 23:02:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d0f2a4c6e8'
+down_revision: Union[str, None] = 'a7c9e1b3d5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+JOB_ATIVO = "status IN ('pendente', 'executando')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('chave', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('parametros', sa.JSON(), nullable=False),
+    sa.Column('progresso', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=True),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('detail', sa.Text(), nullable=True),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('criado_em', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('iniciado_em', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('atualizado_em', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('concluido_em', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_id', 'jobs', ['status', 'id'], unique=False)
+    op.create_index('ix_jobs_chave', 'jobs', ['chave'], unique=False)
+    op.create_index(
+        'uq_jobs_chave_ativo', 'jobs', ['chave'], unique=True,
+        postgresql_where=sa.text(JOB_ATIVO), sqlite_where=sa.text(JOB_ATIVO),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_jobs_chave_ativo', table_name='jobs')
+    op.drop_index('ix_jobs_chave', table_name='jobs')
+    op.drop_index('ix_jobs_status_id', table_name='jobs')
+    op.drop_table('jobs')
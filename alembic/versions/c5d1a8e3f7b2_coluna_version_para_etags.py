@@ -0,0 +1,33 @@
+"""coluna version em clientes, produtos e pedidos (ETag / If-Match)
+
+Revision ID: c5d1a8e3f7b2
+Revises: 9a3c5e7f1b20
+Create Date: 2026-10-18 20:41:12.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d1a8e3f7b2'
+down_revision: Union[str, None] = '9a3c5e7f1b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Com server_default constante o PostgreSQL 11+ adiciona a coluna sem reescrever a tabela
+    op.add_column('clientes', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('produtos', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('pedidos', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('pedidos', 'version')
+    op.drop_column('produtos', 'version')
+    op.drop_column('clientes', 'version')
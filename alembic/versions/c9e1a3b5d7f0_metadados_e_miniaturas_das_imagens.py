@@ -0,0 +1,41 @@
+"""hash, dimensões e miniaturas das imagens de produto
+
+Revision ID: c9e1a3b5d7f0
+Revises: b8d0f2a4c6e8
+Create Date: 2026-10-18 23:41:12.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e1a3b5d7f0'
+down_revision: Union[str, None] = 'b8d0f2a4c6e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nulas nas imagens já cadastradas (só por URL)
+    op.add_column('produto_imagens', sa.Column('hash', sa.String(length=64), nullable=True))
+    op.add_column('produto_imagens', sa.Column('content_type', sa.String(length=50), nullable=True))
+    op.add_column('produto_imagens', sa.Column('largura', sa.Integer(), nullable=True))
+    op.add_column('produto_imagens', sa.Column('altura', sa.Integer(), nullable=True))
+    op.add_column('produto_imagens', sa.Column('tamanho', sa.Integer(), nullable=True))
+    op.add_column('produto_imagens', sa.Column('miniaturas', sa.JSON(), nullable=True))
+    op.create_index(op.f('ix_produto_imagens_hash'), 'produto_imagens', ['hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_produto_imagens_hash'), table_name='produto_imagens')
+    op.drop_column('produto_imagens', 'miniaturas')
+    op.drop_column('produto_imagens', 'tamanho')
+    op.drop_column('produto_imagens', 'altura')
+    op.drop_column('produto_imagens', 'largura')
+    op.drop_column('produto_imagens', 'content_type')
+    op.drop_column('produto_imagens', 'hash')
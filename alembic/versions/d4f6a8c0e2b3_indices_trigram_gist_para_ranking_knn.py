@@ -0,0 +1,57 @@
+"""índices de trigramas GiST para o ranking da busca por distância (KNN)
+
+Revision ID: d4f6a8c0e2b3
+Revises: c9e1a3b5d7f0
+Create Date: 2026-10-19 09:27:53.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6a8c0e2b3'
+down_revision: Union[str, None] = 'c9e1a3b5d7f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGRAM_INDEXES = [
+    ('clientes', 'nome'),
+    ('clientes', 'email'),
+    ('clientes', 'cpf'),
+    ('produtos', 'nome'),
+    ('produtos', 'descricao'),
+    ('produtos', 'cod_barras'),
+]
+
+
+def _recriar(using: str) -> None:
+    for table, column in TRIGRAM_INDEXES:
+        op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
+        op.create_index(
+            f'ix_{table}_{column}_trgm',
+            table,
+            [column],
+            unique=False,
+            postgresql_using=using,
+            postgresql_ops={column: f'{using}_trgm_ops'},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # O GIN só atende o ILIKE; o GiST também devolve as linhas em ordem de distância
+    # (ORDER BY coluna <-> termo), sem ordenar todas as que casam com a busca
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _recriar('gist')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _recriar('gin')
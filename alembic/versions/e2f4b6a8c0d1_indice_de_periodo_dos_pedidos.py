@@ -0,0 +1,34 @@
+"""índice para o filtro de sobreposição de período dos pedidos
+
+Revision ID: e2f4b6a8c0d1
+Revises: c5d1a8e3f7b2
+Create Date: 2026-10-18 21:02:44.517730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f4b6a8c0d1'
+down_revision: Union[str, None] = 'c5d1a8e3f7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no PostgreSQL, fora da transação da migração (como em 7d2e4b91c0a5)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pedidos_periodo_fim_periodo_inicio', 'pedidos', ['periodo_fim', 'periodo_inicio'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_pedidos_periodo_fim_periodo_inicio', table_name='pedidos', postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""preço unitário nas linhas e total/itens desnormalizados nos pedidos
+
+Revision ID: f3a5c7e9b1d4
+Revises: e2f4b6a8c0d1
+Create Date: 2026-10-18 21:40:27.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a5c7e9b1d4'
+down_revision: Union[str, None] = 'e2f4b6a8c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pedido_produtos', sa.Column('preco_unitario', sa.Float(), server_default='0', nullable=False))
+    op.add_column('pedidos', sa.Column('total', sa.Float(), server_default='0', nullable=False))
+    op.add_column('pedidos', sa.Column('itens', sa.Integer(), server_default='0', nullable=False))
+
+    # O preço de quando os pedidos existentes foram feitos não foi guardado: usa o atual.
+    # Os relatórios foram somados com os preços da época; rode
+    # scripts.rebuild_relatorios --verificar para ver a diferença e sem a opção para alinhá-los.
+    op.execute(
+        "UPDATE pedido_produtos SET preco_unitario = "
+        "(SELECT produtos.preco FROM produtos WHERE produtos.id = pedido_produtos.produto_id)"
+    )
+    op.execute(
+        "UPDATE pedidos SET "
+        "total = (SELECT COALESCE(ROUND(CAST(SUM(quantidade * preco_unitario) AS NUMERIC), 2), 0) "
+        "FROM pedido_produtos WHERE pedido_produtos.pedido_id = pedidos.id), "
+        "itens = (SELECT COALESCE(SUM(quantidade), 0) FROM pedido_produtos WHERE pedido_produtos.pedido_id = pedidos.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('pedidos', 'itens')
+    op.drop_column('pedidos', 'total')
+    op.drop_column('pedido_produtos', 'preco_unitario')
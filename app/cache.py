@@ -0,0 +1,288 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.concurrency import run_in_threadpool
+
+from app.metrics import Counter
+
+
+# Cache read-through para as leituras de item único (produto e cliente por id).
+#
+# CACHE_BACKEND escolhe onde os valores ficam:
+# - memory: LRU com TTL no próprio processo. A invalidação também é só do processo,
+#   e o app.worker (remoção de clientes, importação de produtos) roda em outro: só
+#   serve para um único processo da API, sem jobs que alterem produtos ou clientes;
+# - redis: qualquer servidor que fale o protocolo Redis em CACHE_URL (Redis, Valkey,
+#   um stand-in local...), compartilhado entre os processos e com o worker (pip
+#   install -r requirements-redis.txt);
+# - none: desliga o cache.
+# O padrão é redis quando há um servidor compartilhado (CACHE_URL definida) ou quando
+# WEB_CONCURRENCY (os --workers do uvicorn) pede mais de um processo, e none nos
+# demais casos: sem um backend compartilhado, o que o worker escreve não invalidaria
+# o cache da API.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis" if WEB_CONCURRENCY > 1 or os.getenv("CACHE_URL") else "none").lower()
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "10000"))
+# Por quanto tempo a marca deixada por uma invalidação no Redis impede que uma carga
+# iniciada antes da escrita (em qualquer processo) grave o valor antigo
+CACHE_INVALIDATION_TTL = float(os.getenv("CACHE_INVALIDATION_TTL", "5"))
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Leituras do cache por resultado (hit ou miss)",
+    ["cache", "result"],
+)
+CACHE_COALESCED = Counter(
+    "cache_coalesced_total",
+    "Misses que aguardaram uma carga já em andamento para a mesma chave (single-flight)",
+    ["cache"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total",
+    "Chaves invalidadas por escritas",
+    ["cache"],
+)
+
+MISS = object()
+
+# Invalidações feitas por uma escrita cuja transação só é comitada depois que o CRUD
+# retorna (ver app/idempotency.py): quem abriu a transação as repete após o commit
+_invalidacoes_adiadas: ContextVar = ContextVar("invalidacoes_adiadas", default=None)
+# Remoções em backends bloqueantes pedidas por um CRUD que roda na própria event loop
+# (AsyncSession.run_sync): DatabaseSession.run as aplica depois, no threadpool
+_remocoes_na_loop: ContextVar = ContextVar("remocoes_na_loop", default=None)
+
+
+class LRUTTLCache:
+    """LRU com expiração por TTL, em memória e seguro entre threads."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISS
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisCache:
+    """
+    Backend no protocolo Redis. Os valores são gravados como o JSON do modelo
+    Pydantic e revalidados na leitura.
+
+    delete não apaga a chave: grava uma marca vazia por invalidation_ttl, e set só
+    grava se a chave não existe (SET NX). Assim a carga que outro processo iniciou
+    antes da escrita não sobrescreve a invalidação com o valor que leu.
+
+    client: qualquer objeto com get/set(ex=)/delete no estilo do redis-py (ex.:
+    redis.Redis ou um substituto local em testes).
+    """
+
+    blocking = True
+
+    def __init__(self, client, model, prefix: str, ttl: float = CACHE_TTL, invalidation_ttl: float = CACHE_INVALIDATION_TTL):
+        self.client = client
+        self.model = model
+        self.prefix = prefix
+        self.ttl = ttl
+        self.invalidation_ttl = invalidation_ttl
+
+    def get(self, key):
+        raw = self.client.get(f"{self.prefix}:{key}")
+        if not raw:  # ausente ou invalidada
+            return MISS
+        return self.model.model_validate_json(raw)
+
+    def set(self, key, value):
+        self.client.set(f"{self.prefix}:{key}", value.model_dump_json(), ex=max(1, int(self.ttl)), nx=True)
+
+    def delete(self, key):
+        self.client.set(f"{self.prefix}:{key}", "", ex=max(1, int(self.invalidation_ttl)))
+
+
+class NullCache:
+    blocking = False
+
+    def get(self, key):
+        return MISS
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+def _redis_client():
+    import redis  # dependência opcional, só necessária com CACHE_BACKEND=redis
+
+    return redis.Redis.from_url(CACHE_URL)
+
+
+def build_backend(name: str, model):
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND == "redis":
+        return RedisCache(_redis_client(), model, prefix=name)
+    return LRUTTLCache()
+
+
+class ReadThroughCache:
+    """
+    Cache de um tipo de recurso (ex.: "produto"), indexado pelo id numérico.
+
+    get_or_load garante uma única carga por chave por vez (single-flight): os
+    misses concorrentes aguardam a carga em andamento em vez de irem ao banco.
+    invalidate é chamado pelas escritas depois do commit e descarta a carga em
+    andamento da chave: uma carga iniciada antes da escrita não grava o valor antigo.
+    Entre processos, quem garante isso é o backend (ver RedisCache); uma carga que
+    demorou mais que CACHE_INVALIDATION_TTL não é gravada, porque a marca pode ter
+    expirado. Só as chaves com carga em andamento ocupam memória fora do backend.
+    """
+
+    def __init__(self, name: str, model, backend=None):
+        self.name = name
+        self.backend = backend if backend is not None else build_backend(name, model)
+        self._inflight = {}
+
+    async def _call(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get_or_load(self, id_, loader):
+        key = cache_key(id_)
+        if key is None:
+            return await loader()
+
+        value = await self._call(self.backend.get, key)
+        if value is not MISS:
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return value
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            CACHE_COALESCED.inc(cache=self.name)
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            started = time.monotonic()
+            value = await loader()
+            # Uma escrita comitada durante a carga (invalidate) tirou a carga de _inflight
+            if self._inflight.get(key) is future and time.monotonic() - started < CACHE_INVALIDATION_TTL:
+                await self._call(self.backend.set, key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marca como recuperada se ninguém estiver aguardando
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, id_):
+        key = cache_key(id_)
+        if key is None:
+            return
+        # A carga em andamento não grava o que leu, e os misses posteriores à escrita
+        # não se juntam a ela
+        self._inflight.pop(key, None)
+        remocoes = _remocoes_na_loop.get()
+        if remocoes is not None and self.backend.blocking:
+            remocoes.append((self, key))
+        else:
+            self.backend.delete(key)
+        CACHE_INVALIDATIONS.inc(cache=self.name)
+        adiadas = _invalidacoes_adiadas.get()
+        if adiadas is not None:
+            adiadas.append((self, key))
+
+    async def ainvalidate(self, id_):
+        """invalidate para quem está na event loop: a remoção bloqueante vai para o threadpool."""
+        key = cache_key(id_)
+        if key is None:
+            return
+        self._inflight.pop(key, None)
+        await self._call(self.backend.delete, key)
+        CACHE_INVALIDATIONS.inc(cache=self.name)
+
+
+@contextmanager
+def adiar_invalidacoes():
+    """Registra as invalidações feitas no bloco, para repetir_invalidacoes após o commit."""
+    adiadas = []
+    token = _invalidacoes_adiadas.set(adiadas)
+    try:
+        yield adiadas
+    finally:
+        _invalidacoes_adiadas.reset(token)
+
+
+async def repetir_invalidacoes(adiadas: list):
+    for cache, key in adiadas:
+        await cache.ainvalidate(key)
+
+
+@contextmanager
+def remocoes_fora_da_loop():
+    """
+    Usado em volta de um CRUD síncrono executado na event loop: as remoções nos
+    backends bloqueantes ficam na lista, para aplicar_remocoes.
+    """
+    remocoes = []
+    token = _remocoes_na_loop.set(remocoes)
+    try:
+        yield remocoes
+    finally:
+        _remocoes_na_loop.reset(token)
+
+
+async def aplicar_remocoes(remocoes: list):
+    if remocoes:
+        await run_in_threadpool(lambda: [cache.backend.delete(key) for cache, key in remocoes])
+
+
+# Normaliza o id vindo da rota (str) para a chave do cache; ids não numéricos não são
+# cacheados (assim "01" e "1" não viram entradas distintas que a invalidação não alcança)
+def cache_key(id_):
+    try:
+        return int(id_)
+    except (TypeError, ValueError):
+        return None
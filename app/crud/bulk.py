@@ -0,0 +1,231 @@
+import json
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+import app.schemas.bulk_schema as schemas
+
+
+# Tamanho de cada lote inserido (e comitado) de uma vez
+BULK_BATCH_SIZE = 1000
+
+# Itens com conflito ou erro detalhados no resultado de uma importação em segundo plano
+BULK_JOB_MAX_DETAILS = 1000
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+# INSERT ... ON CONFLICT DO NOTHING disponível por dialeto
+ON_CONFLICT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Documentação do corpo das rotas de lote, que leem a Request diretamente
+BULK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "description": "Array JSON de itens ou, para cargas grandes, um stream NDJSON (um item por linha).",
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+def insert_ignoring_conflicts(db, orm, rows: list, key: str) -> dict:
+    """
+    Insere as linhas com um INSERT multi-valores ... ON CONFLICT DO NOTHING RETURNING.
+
+    Retorna {valor da coluna key: id} apenas das linhas inseridas; as ausentes
+    conflitaram com uma restrição única. Em bancos sem ON CONFLICT, cada linha é
+    inserida em um SAVEPOINT próprio.
+    """
+    if not rows:
+        return {}
+    key_column = getattr(orm, key)
+    on_conflict_insert = ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+
+    if on_conflict_insert is not None:
+        stmt = on_conflict_insert(orm).on_conflict_do_nothing().returning(orm.id, key_column)
+        return {row_key: row_id for row_id, row_key in db.execute(stmt, rows)}
+
+    inserted = {}
+    for row in rows:
+        try:
+            with db.begin_nested():
+                inserted[row[key]] = db.execute(insert(orm).returning(orm.id), [row]).scalar_one()
+        except IntegrityError:
+            pass
+    return inserted
+
+
+def dedupe_batch(items: list, keys: tuple, results: list) -> list:
+    """
+    Remove do lote os itens que repetem uma chave única de um item anterior do
+    mesmo lote, registrando-os como conflito.
+    """
+    seen = {key: set() for key in keys}
+    unique = []
+    for index, item in items:
+        values = {key: getattr(item, key) for key in keys}
+        if any(value in seen[key] for key, value in values.items()):
+            results.append(conflict_result(index, "Item duplicado dentro do próprio lote."))
+            continue
+        for key, value in values.items():
+            seen[key].add(value)
+        unique.append((index, item))
+    return unique
+
+
+def missing_fields(item, fields: tuple) -> list:
+    return [field for field in fields if getattr(item, field) is None]
+
+
+def created_result(index: int, id_: int):
+    return schemas.BulkItemResultModel(index=index, status=schemas.BulkItemStatus.CRIADO, id=id_)
+
+
+def conflict_result(index: int, detail: str):
+    return schemas.BulkItemResultModel(index=index, status=schemas.BulkItemStatus.CONFLITO, detail=detail)
+
+
+def error_result(index: int, detail: str):
+    return schemas.BulkItemResultModel(index=index, status=schemas.BulkItemStatus.ERRO, detail=detail)
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc']) or 'item'}: {e['msg']}" for e in error.errors()
+    )
+
+
+async def iter_bulk_payloads(request: Request, model):
+    """
+    Lê o corpo da requisição item a item, como array JSON ou stream NDJSON.
+
+    Gera (índice, item validado) ou (índice, mensagem de erro) para itens inválidos,
+    sem interromper a leitura dos demais.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith(NDJSON_MEDIA_TYPES):
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_line(model, line)
+                    index += 1
+        if buffer.strip():
+            yield index, _parse_line(model, buffer)
+        return
+
+    try:
+        body = await request.json()
+    except json.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Corpo da requisição não é um JSON válido.",
+        ) from e
+    if not isinstance(body, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O corpo deve ser um array JSON ou um stream NDJSON.",
+        )
+    for index, item in enumerate(body):
+        try:
+            yield index, model.model_validate(item)
+        except ValidationError as e:
+            yield index, _validation_detail(e)
+
+
+def _parse_line(model, line: bytes):
+    try:
+        return model.model_validate_json(line)
+    except ValidationError as e:
+        return _validation_detail(e)
+
+
+async def run_bulk(db, request: Request, model, crud_fn, batch_size: int = BULK_BATCH_SIZE):
+    """
+    Envia os itens da requisição para crud_fn em lotes de batch_size.
+
+    Cada lote roda na sua própria transação: um lote com erro não desfaz os anteriores.
+    """
+    results = []
+    batch = []
+    async for index, item in iter_bulk_payloads(request, model):
+        if isinstance(item, str):
+            results.append(error_result(index, item))
+            continue
+        batch.append((index, item))
+        if len(batch) >= batch_size:
+            results.extend(await db.run(crud_fn, items=batch))
+            batch = []
+    if batch:
+        results.extend(await db.run(crud_fn, items=batch))
+
+    results.sort(key=lambda r: r.index)
+    counts = _count_results(results)
+
+    return schemas.BulkResponseModel(
+        status=schemas.Status.Success,
+        message=f"{counts[schemas.BulkItemStatus.CRIADO]} de {len(results)} item(ns) criado(s).",
+        criados=counts[schemas.BulkItemStatus.CRIADO],
+        conflitos=counts[schemas.BulkItemStatus.CONFLITO],
+        erros=counts[schemas.BulkItemStatus.ERRO],
+        data=results,
+    )
+
+
+def _count_results(results: list) -> dict:
+    counts = {s: 0 for s in schemas.BulkItemStatus}
+    for result in results:
+        counts[result.status] += 1
+    return counts
+
+
+async def collect_bulk_payloads(request: Request, model) -> dict:
+    """
+    Lê todos os itens da requisição (como iter_bulk_payloads) para os parâmetros de um
+    job de importação: {"itens": [{"index", "item"}], "erros": [{"index", "detail"}]}.
+    """
+    itens = []
+    erros = []
+    async for index, item in iter_bulk_payloads(request, model):
+        if isinstance(item, str):
+            erros.append({"index": index, "detail": item})
+        else:
+            itens.append({"index": index, "item": item.model_dump(mode="json", exclude_unset=True)})
+    return {"itens": itens, "erros": erros}
+
+
+def run_bulk_job(db, progresso, model, crud_fn, itens: list, erros: list, batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """
+    Versão de run_bulk para um job (app/crud/job_crud.py): envia os itens coletados por
+    collect_bulk_payloads para crud_fn em lotes de batch_size, reportando o progresso
+    a cada lote.
+
+    Retorna as contagens e os itens que não foram criados (até BULK_JOB_MAX_DETAILS).
+    """
+    results = [error_result(erro["index"], erro["detail"]) for erro in erros]
+    progresso(len(results), len(itens) + len(erros))
+    for start in range(0, len(itens), batch_size):
+        batch = [(item["index"], model.model_validate(item["item"])) for item in itens[start:start + batch_size]]
+        results.extend(crud_fn(items=batch, db=db))
+        progresso(len(results))
+
+    counts = _count_results(results)
+    details = sorted((r for r in results if r.status != schemas.BulkItemStatus.CRIADO), key=lambda r: r.index)
+    return {
+        "criados": counts[schemas.BulkItemStatus.CRIADO],
+        "conflitos": counts[schemas.BulkItemStatus.CONFLITO],
+        "erros": counts[schemas.BulkItemStatus.ERRO],
+        "data": [r.model_dump(mode="json", exclude_none=True) for r in details[:BULK_JOB_MAX_DETAILS]],
+    }
@@ -1,10 +1,43 @@
+import os
+
 from fastapi import Depends, HTTPException, status  
+from sqlalchemy import delete, func, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError  
-from sqlalchemy.orm import Session  
+from sqlalchemy.orm import Session, raiseload  
   
 import app.models as models  
 import app.schemas.cliente_schema as schemas
+from app.cache import ReadThroughCache, cache_key
+from app.crud.bulk import conflict_result, created_result, dedupe_batch, error_result, insert_ignoring_conflicts, missing_fields
+from app.crud.estoque import devolver_estoque_dos_pedidos
+from app.crud.job_crud import enfileirar_job, job_ativo, job_handler
+from app.crud.pagination import paginate
+from app.crud.produto_crud import produto_cache
+from app.crud.projection import project, projection_loading
+from app.crud.relatorios import descontar_pedidos
+from app.crud.search import apply_search
+from app.crud.updates import row_exists, update_returning
 from app.database import get_db
+from app.etag import if_match_versions, version_conflict
+
+
+# ClienteModel não expõe relacionamentos: nenhuma leitura precisa carregar os pedidos,
+# e raiseload("*") impede que um acesso acidental vire um N+1.
+CLIENTE_LOADING = (raiseload("*"),)
+
+# Cache das leituras de cliente por id; update e delete invalidam a entrada
+cliente_cache = ReadThroughCache("cliente", schemas.ClienteResponseModel)
+
+# Colunas aceitas como ordenação da listagem (todas indexadas)
+CLIENTE_ORDER_BY = ("id", "nome")
+
+# Colunas NOT NULL que o ClienteCreateModel aceita como opcionais
+CLIENTE_REQUIRED_FIELDS = ("nome", "email", "cpf")
+
+# Acima deste número de pedidos o DELETE do cliente vira um job de remoção, feito pelo
+# worker em lotes de CLIENTE_REMOCAO_LOTE pedidos
+CLIENTE_REMOCAO_LIMITE = int(os.getenv("CLIENTE_REMOCAO_LIMITE", "5000"))
+CLIENTE_REMOCAO_LOTE = int(os.getenv("CLIENTE_REMOCAO_LOTE", "1000"))
   
   
 def create_cliente_crud( payload: schemas.ClienteCreateModel, db: Session = Depends(get_db)):  
@@ -38,6 +71,7 @@ def create_cliente_crud( payload: schemas.ClienteCreateModel, db: Session = Depe
 def get_cliente_crud(cliente_id: str, db: Session = Depends(get_db)):  
     cliente_data = (  
         db.query(models.ClienteOrm)  
+        .options(*CLIENTE_LOADING)  
         .filter(models.ClienteOrm.id == cliente_id)  
         .first()  
     )  
@@ -61,36 +95,32 @@ def get_cliente_crud(cliente_id: str, db: Session = Depends(get_db)):
         ) from e  
   
   
-def update_cliente_crud( cliente_id: str, payload: schemas.ClienteUpdateModel, db: Session):  
-    cliente_query = db.query(models.ClienteOrm).filter(  
-        models.ClienteOrm.id == cliente_id  
-    )  
-    db_cliente = cliente_query.first()  
-  
-    if not db_cliente:  
+def update_cliente_crud( cliente_id: str, payload: schemas.ClienteUpdateModel, db: Session, if_match: str = None):  
+    # Prepare update data from the payload, only including fields that are set  
+    update_data = payload.model_dump(exclude_unset=True)  
+    if not update_data:  
         raise HTTPException(  
-            status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado."  
+            status_code=status.HTTP_400_BAD_REQUEST,  
+            detail="Campo(s) inválido(s).",  
         )  
   
     try:  
-        # Prepare update data from the payload, only including fields that are set  
-        update_data = payload.model_dump(exclude_unset=True)  
-        if update_data:  
-            cliente_query.update(update_data, synchronize_session="evaluate")  
-            db.commit()  
-            db.refresh(db_cliente)  
-  
-            # Convert the updated ORM model back to a Pydantic model  
-            return schemas.ClienteResponseModel(  
-                status=schemas.Status.Success,  
-                message="Cliente atualizado com successo.",  
-                data=schemas.ClienteModel.model_validate(db_cliente),  
-            )  
-        else:  
+        # Um único UPDATE ... RETURNING: com If-Match, a versão entra no WHERE  
+        cliente_row = update_returning(db, models.ClienteOrm, cliente_id, update_data, if_match_versions(if_match))  
+        if cliente_row is None:  
+            db.rollback()  
+            if row_exists(db, models.ClienteOrm, cliente_id):  
+                raise version_conflict()  
             raise HTTPException(  
-                status_code=status.HTTP_400_BAD_REQUEST,  
-                detail="Campo(s) inválido(s).",  
+                status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado."  
             )  
+        db.commit()  
+  
+        return schemas.ClienteResponseModel(  
+            status=schemas.Status.Success,  
+            message="Cliente atualizado com successo.",  
+            data=schemas.ClienteModel.model_validate(cliente_row),  
+        )  
     except IntegrityError as e:  
         db.rollback()  
         raise HTTPException(  
@@ -103,45 +133,276 @@ def update_cliente_crud( cliente_id: str, payload: schemas.ClienteUpdateModel, d
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,  
             detail=f"Um erro ocorreu ao tentar atualizar o cliente: {str(e)}",  
         ) from e  
+    finally:  
+        cliente_cache.invalidate(cliente_id)  
   
   
 def delete_cliente_crud(cliente_id: int, db: Session = Depends(get_db)):
+    """
+    Remove o cliente e, pelo ON DELETE CASCADE do banco, seus pedidos e as linhas deles.
+
+    Com até CLIENTE_REMOCAO_LIMITE pedidos, é um único DELETE na própria requisição.
+    Acima disso a remoção vira um job (job_remocao_cliente), feito em lotes pelo
+    worker, para não prender uma transação enorme nem a requisição.
+    """
+    key = cache_key(cliente_id)
     try:
-        cliente_ = db.query(models.ClienteOrm).filter(models.ClienteOrm.id == cliente_id).first()
-        if not cliente_:
+        job = job_ativo(db, _chave_remocao(key)) if key is not None else None
+        if job is not None:
+            return _remocao_agendada(key, job)
+
+        existe = db.scalar(select(models.ClienteOrm.id).where(models.ClienteOrm.id == key)) if key is not None else None
+        if existe is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Não foi encontrado nenhum cliente com o ID: {cliente_id}",
             )
-        
-        # Apaga pedidos associados manualmente
-        pedidos_assoc = db.query(models.PedidoOrm).filter(models.PedidoOrm.cliente_id == cliente_id).all()
-        for pedido in pedidos_assoc:
-            db.delete(pedido)
-        
-        # Apaga o cliente
-        db.delete(cliente_)
-        db.commit()
-        
+
+        # Conta no máximo LIMITE + 1 pedidos (pelo índice de cliente_id): basta saber se passa do limite
+        pedidos = select(models.PedidoOrm.id).where(models.PedidoOrm.cliente_id == key)
+        amostra = db.scalar(select(func.count()).select_from(pedidos.limit(CLIENTE_REMOCAO_LIMITE + 1).subquery()))
+        if amostra > CLIENTE_REMOCAO_LIMITE:
+            total = db.scalar(select(func.count()).select_from(pedidos.subquery()))
+            job = enfileirar_job(db, "remocao_cliente", {"cliente_id": key}, chave=_chave_remocao(key), total=total)
+            return _remocao_agendada(key, job)
+
+        delete_cliente_row_crud(key, db)
+
         return schemas.ClienteDeleteModel(
-            id=cliente_id,
+            id=key,
             status=schemas.Status.Success,
             message="Cliente removido com sucesso.",
         )
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Um erro ocorreu ao tentar remover o cliente. Erro: {str(e)}",
         ) from e
+    finally:
+        cliente_cache.invalidate(cliente_id)
+
+
+# Remoção em segundo plano de clientes com muitos pedidos: um job remocao_cliente
+# (app/crud/job_crud.py), executado por app/worker.py. No máximo um job ativo por cliente.
+
+def _chave_remocao(cliente_id: int) -> str:
+    return f"remocao_cliente:{cliente_id}"
+
+
+# Status do job -> status da remoção
+REMOCAO_STATUS = {
+    models.StatusJobEnum.PENDENTE.value: schemas.ClienteRemocaoStatus.pendente,
+    models.StatusJobEnum.EXECUTANDO.value: schemas.ClienteRemocaoStatus.executando,
+    models.StatusJobEnum.CONCLUIDO.value: schemas.ClienteRemocaoStatus.concluida,
+    models.StatusJobEnum.ERRO.value: schemas.ClienteRemocaoStatus.erro,
+}
+
+
+def _remocao(job):
+    return schemas.ClienteRemocaoModel(
+        cliente_id=job.parametros["cliente_id"],
+        job_id=job.id,
+        status=REMOCAO_STATUS[job.status],
+        total_pedidos=job.total or 0,
+        pedidos_removidos=job.progresso,
+        detail=job.detail,
+    )
+
+
+def _remocao_agendada(cliente_id: int, job):
+    return schemas.ClienteDeleteModel(
+        id=cliente_id,
+        status=schemas.Status.Success,
+        message="O cliente tem muitos pedidos: a remoção será feita em segundo plano.",
+        remocao=_remocao(job),
+    )
+
+
+def _remover_pedidos(db, *where):
+    """
+    Tira dos relatórios e devolve ao estoque os pedidos que atendem a where, antes do
+    DELETE em conjunto. Trava os pedidos primeiro, na mesma ordem de update_pedido_crud
+    (pedido e depois produtos). Retorna os produto_ids cujo estoque mudou.
+    """
+    db.execute(select(models.PedidoOrm.id).where(*where).with_for_update())
+    descontar_pedidos(db, *where)
+    return devolver_estoque_dos_pedidos(db, *where)
+
+
+def _invalidar_produtos(produto_ids):
+    for produto_id in produto_ids:
+        produto_cache.invalidate(produto_id)
+
+
+def delete_cliente_pedidos_lote_crud(cliente_id: int, batch_size: int, db: Session):
+    """Apaga até batch_size pedidos do cliente (as linhas vão junto, por cascade) e retorna quantos."""
+    ids = db.scalars(
+        select(models.PedidoOrm.id)
+        .where(models.PedidoOrm.cliente_id == cliente_id)
+        .limit(batch_size)
+    ).all()
+    if not ids:
+        return 0
+    devolvidos = _remover_pedidos(db, models.PedidoOrm.id.in_(ids))
+    removidos = db.execute(
+        delete(models.PedidoOrm)
+        .where(models.PedidoOrm.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    _invalidar_produtos(devolvidos)
+    return removidos
+
+
+def delete_cliente_row_crud(cliente_id: int, db: Session):
+    """Apaga o cliente; os pedidos restantes vão junto pelo cascade."""
+    devolvidos = _remover_pedidos(db, models.PedidoOrm.cliente_id == cliente_id)
+    db.execute(delete(models.ClienteOrm).where(models.ClienteOrm.id == cliente_id))
+    db.commit()
+    _invalidar_produtos(devolvidos)
+
+
+@job_handler("remocao_cliente")
+def job_remocao_cliente(db: Session, progresso, cliente_id: int, batch_size: int = CLIENTE_REMOCAO_LOTE):
+    """
+    Apaga os pedidos em lotes, um commit por lote, e por fim o cliente (levando junto
+    pedidos criados durante a remoção). Uma reexecução continua de onde parou.
+    """
+    removidos = 0
+    try:
+        while True:
+            lote = delete_cliente_pedidos_lote_crud(cliente_id, batch_size, db)
+            removidos += lote
+            progresso(removidos)
+            if lote < batch_size:
+                break
+        delete_cliente_row_crud(cliente_id, db)
+    finally:
+        cliente_cache.invalidate(cliente_id)
+    return {"pedidos_removidos": removidos}
+
+
+def get_cliente_remocao_crud(cliente_id: str, db: Session):
+    key = cache_key(cliente_id)
+    job = db.scalar(
+        select(models.JobOrm)
+        .where(models.JobOrm.chave == _chave_remocao(key))
+        .order_by(models.JobOrm.id.desc())
+        .limit(1)
+    ) if key is not None else None
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Nenhuma remoção em segundo plano registrada para este cliente.",
+        )
+    return schemas.ClienteRemocaoResponseModel(
+        status=schemas.Status.Success,
+        message="Progresso da remoção do cliente.",
+        data=_remocao(job),
+    )
+
+def _cliente_list_loading(projecao, order_by: str = "id"):
+    if projecao is None:
+        return CLIENTE_LOADING
+    return projection_loading(models.ClienteOrm, projecao, {}, order_by)
+
+
+def get_clientes_crud( db: Session = Depends(get_db), limit: int = 10, skip: int = 0, page: int = 1, search: str = "", cursor: str = None, order_by: str = "id", projecao=None):  
   
-def get_clientes_crud( db: Session = Depends(get_db), limit: int = 10, skip: int = 0, page: int = 1, search: str = ""):  
+    query = db.query(models.ClienteOrm).options(*_cliente_list_loading(projecao, order_by))  
   
-    clientes = db.query(models.ClienteOrm).limit(limit).offset(skip).all()  
-    return schemas.ClienteListResponseModel(  
+    skip = skip or (page - 1) * limit  
+    if search:  
+        # O ranking por relevância não é uma ordem de keyset: a busca pagina por page/skip  
+        if cursor:  
+            raise HTTPException(  
+                status_code=status.HTTP_400_BAD_REQUEST,  
+                detail="A busca não suporta paginação por cursor; use page ou skip.",  
+            )  
+        query = apply_search(  
+            query,  
+            db,  
+            search,  
+            columns=[models.ClienteOrm.nome, models.ClienteOrm.email, models.ClienteOrm.cpf],  
+            exact_columns=[models.ClienteOrm.cpf, models.ClienteOrm.email],  
+            depth=skip + limit + 1,  
+        )  
+  
+    clientes, next_cursor = paginate(  
+        query,  
+        models.ClienteOrm,  
+        limit=limit,  
+        skip=skip,  
+        cursor=cursor,  
+        order_by=order_by,  
+        allowed=CLIENTE_ORDER_BY,  
+    )  
+    if search:  
+        next_cursor = None  
+    return project(  
+        schemas.ClienteListResponseModel,  
+        schemas.ClienteModel,  
+        projecao,  
+        clientes,  
         status=schemas.Status.Success,  
         message="Lista com todos os clientes obtida com sucesso.",  
-        data=[  
-            schemas.ClienteModel.model_validate(cliente_) for cliente_ in clientes  
-        ],  
+        next_cursor=next_cursor,  
+    )
+
+
+def get_clientes_by_ids_crud(ids: list, db: Session, projecao=None):
+    """
+    Busca vários clientes por id em um único SELECT ... WHERE id IN (...). Os
+    clientes voltam na ordem dos ids pedidos; os inexistentes são listados em missing.
+    """
+    ids = list(dict.fromkeys(ids))
+    clientes = {
+        cliente_.id: cliente_
+        for cliente_ in db.query(models.ClienteOrm).options(*_cliente_list_loading(projecao)).filter(models.ClienteOrm.id.in_(ids))
+    }
+    return project(
+        schemas.ClienteBatchResponseModel,
+        schemas.ClienteModel,
+        projecao,
+        [clientes[id_] for id_ in ids if id_ in clientes],
+        status=schemas.Status.Success,
+        message="Clientes retornados com sucesso.",
+        missing=[id_ for id_ in ids if id_ not in clientes],
     )
+
+
+def create_clientes_bulk_crud(items: list, db: Session):
+    """
+    Insere um lote de (índice, ClienteCreateModel) em uma única transação.
+
+    Clientes com CPF ou e-mail já existente são reportados como conflito sem
+    abortar o lote.
+    """
+    results = []
+    valid = []
+    for index, cliente in items:
+        missing = missing_fields(cliente, CLIENTE_REQUIRED_FIELDS)
+        if missing:
+            results.append(error_result(index, f"Campo(s) obrigatório(s) ausente(s): {', '.join(missing)}."))
+        else:
+            valid.append((index, cliente))
+    valid = dedupe_batch(valid, ("cpf", "email"), results)
+
+    try:
+        rows = [cliente.model_dump() for _, cliente in valid]
+        inserted = insert_ignoring_conflicts(db, models.ClienteOrm, rows, key="cpf")
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        return results + [error_result(index, f"Erro ao inserir o lote: {str(e)}") for index, _ in valid]
+
+    for index, cliente in valid:
+        if cliente.cpf in inserted:
+            results.append(created_result(index, inserted[cliente.cpf]))
+        else:
+            results.append(conflict_result(index, "Já existe um cliente com este CPF ou e-mail."))
+    return results
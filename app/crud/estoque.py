@@ -0,0 +1,128 @@
+from collections import Counter
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, delete, select, update
+
+import app.models as models
+
+
+# Reserva de estoque dos pedidos.
+#
+# As alterações de estoque são sempre aplicadas em ordem crescente de produto_id:
+# como todas as transações travam as linhas de produtos na mesma ordem, dois
+# checkouts concorrentes nunca ficam esperando um pelo outro em ciclo (deadlock).
+#
+# Toda remoção de pedido devolve o que ele reservava: delete_pedido_crud pela
+# variação negativa e as remoções em conjunto (clientes) por devolver_estoque_dos_pedidos.
+
+
+def quantidades_por_produto(linhas) -> Counter:
+    """Soma as quantidades por produto_id (um pedido pode repetir o produto)."""
+    total = Counter()
+    for linha in linhas:
+        if isinstance(linha, dict):
+            total[linha["produto_id"]] += linha["quantidade"]
+        else:
+            total[linha.produto_id] += linha.quantidade
+    return total
+
+
+def aplicar_variacao_estoque(db, variacao: dict):
+    """
+    Aplica {produto_id: quantidade a reservar} ao estoque; valores negativos devolvem.
+
+    Cada reserva é um único UPDATE condicional (estoque >= quantidade), que trava a
+    linha do produto até o fim da transação. Se algum produto não tiver estoque, a
+    exceção sobe e o chamador desfaz a transação inteira.
+    """
+    for produto_id in sorted(variacao):
+        quantidade = variacao[produto_id]
+        if quantidade == 0:
+            continue
+
+        stmt = (
+            update(models.ProdutoOrm)
+            .where(models.ProdutoOrm.id == produto_id)
+            # O estoque faz parte da representação do produto: muda também o ETag
+            .values(estoque=models.ProdutoOrm.estoque - quantidade, version=models.ProdutoOrm.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if quantidade > 0:
+            stmt = stmt.where(models.ProdutoOrm.estoque >= quantidade)
+
+        if db.execute(stmt).rowcount != 1:
+            existe = db.scalar(select(models.ProdutoOrm.id).where(models.ProdutoOrm.id == produto_id))
+            if existe is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Produto {produto_id} não encontrado.",
+                )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Estoque insuficiente para o produto {produto_id}.",
+            )
+
+
+def travar_estoques(db, produto_ids) -> dict:
+    """
+    Trava (SELECT ... FOR UPDATE, em ordem de id) e retorna {produto_id: estoque}.
+
+    Usado quando é preciso decidir item a item quais pedidos cabem no estoque,
+    como na criação em lote.
+    """
+    if not produto_ids:
+        return {}
+    rows = db.execute(
+        select(models.ProdutoOrm.id, models.ProdutoOrm.estoque)
+        .where(models.ProdutoOrm.id.in_(produto_ids))
+        .order_by(models.ProdutoOrm.id)
+        .with_for_update()
+    )
+    return {produto_id: estoque for produto_id, estoque in rows}
+
+
+def variacao_reserva(linhas_antigas, reservado_antes: bool, linhas_novas, reservado_depois: bool) -> dict:
+    """Diferença de reserva entre o estado anterior e o novo de um pedido."""
+    antes = quantidades_por_produto(linhas_antigas) if reservado_antes else Counter()
+    depois = quantidades_por_produto(linhas_novas) if reservado_depois else Counter()
+    return {
+        produto_id: depois.get(produto_id, 0) - antes.get(produto_id, 0)
+        for produto_id in set(antes) | set(depois)
+    }
+
+
+def devolver_estoque_dos_pedidos(db, *where) -> Counter:
+    """
+    Apaga as linhas dos pedidos não cancelados que atendem a where e devolve ao
+    estoque o que elas reservavam, antes de uma remoção em conjunto (DELETE com
+    cascade) que não passa pelos objetos ORM. Retorna {produto_id: quantidade devolvida}.
+
+    As linhas saem em um DELETE ... RETURNING e a devolução é um único UPDATE para
+    todos os produtos, depois de travá-los em ordem de id como os checkouts. Quem
+    chama deve ter travado os pedidos antes (e já descontado os relatórios, que leem
+    as linhas).
+    """
+    linha = models.PedidoProdutoOrm
+    reservados = select(models.PedidoOrm.id).where(*where, models.PedidoOrm.status != models.StatusPedidoEnum.CANCELADO)
+
+    # As linhas dos cancelados (que não reservam nada) saem depois, pelo cascade
+    stmt = delete(linha).where(linha.pedido_id.in_(reservados)).execution_options(synchronize_session=False)
+    if db.get_bind().dialect.delete_returning:
+        devolucao = quantidades_por_produto(db.execute(stmt.returning(linha.produto_id, linha.quantidade)))
+    else:
+        # Dialetos sem RETURNING no DELETE: soma as linhas antes de apagá-las
+        devolucao = quantidades_por_produto(db.execute(select(linha.produto_id, linha.quantidade).where(linha.pedido_id.in_(reservados))))
+        db.execute(stmt)
+
+    if devolucao:
+        travar_estoques(db, devolucao)
+        db.execute(
+            update(models.ProdutoOrm)
+            .where(models.ProdutoOrm.id.in_(devolucao))
+            .values(
+                estoque=models.ProdutoOrm.estoque + case(devolucao, value=models.ProdutoOrm.id, else_=0),
+                version=models.ProdutoOrm.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return devolucao
@@ -0,0 +1,93 @@
+import csv
+import io
+from datetime import date, datetime
+from enum import Enum
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.database import stream_partitions
+
+
+# Exportação em stream: as linhas saem do cursor do servidor direto para o corpo da
+# resposta, lote a lote, sem materializar objetos ORM nem modelos Pydantic.
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _json_line(item: dict) -> bytes:
+    # orjson, como nas respostas da API (app/responses.py): datas e enums no mesmo formato
+    return orjson.dumps(item, default=_plain, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+
+
+async def ndjson_stream(records):
+    """Serializa dicts em NDJSON, um bloco por lote recebido."""
+    async for batch in records:
+        yield b"".join(_json_line(item) for item in batch)
+
+
+async def csv_stream(records, header: list):
+    """Serializa dicts em CSV com o cabeçalho informado, um bloco por lote."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    async for batch in records:
+        for item in batch:
+            writer.writerow([_plain(item.get(column)) for column in header])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def row_batches(stmt):
+    """Lotes de linhas da consulta, cada linha convertida para dict."""
+    async for partition in stream_partitions(stmt, EXPORT_BATCH_SIZE):
+        yield [dict(row._mapping) for row in partition]
+
+
+async def grouped_batches(stmt, key: str, fields: list, child: str, child_fields: list):
+    """
+    Agrupa as linhas de um JOIN pai/filhos ordenado pela chave do pai.
+
+    Cada item gerado é o pai (colunas em fields) com a lista dos filhos em child.
+    Um pai cujas linhas atravessam o limite de um lote é emitido no lote seguinte.
+    """
+    current = None
+    async for partition in stream_partitions(stmt, EXPORT_BATCH_SIZE):
+        done = []
+        for row in partition:
+            mapping = row._mapping
+            if current is None or current[key] != mapping[key]:
+                if current is not None:
+                    done.append(current)
+                current = {field: mapping[field] for field in fields}
+                current[child] = []
+            if mapping[child_fields[0]] is not None:
+                current[child].append({field: mapping[field] for field in child_fields})
+        if done:
+            yield done
+    if current is not None:
+        yield [current]
+
+
+def export_response(body, export_format: str, filename: str):
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,122 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import app.models as models
+import app.schemas.job_schema as schemas
+from app.crud.pagination import paginate
+from app.responses import ModelResponse
+
+
+# Fila de jobs das operações pesadas (remoção de cliente com muitos pedidos, importação
+# de catálogo, reconstrução dos relatórios).
+#
+# A rota só grava o job (status pendente) e responde 202 com o id; quem executa é um
+# processo de app/worker.py, que pega os jobs da tabela com SELECT ... FOR UPDATE SKIP
+# LOCKED. O progresso é consultado em GET /api/v1/jobs/job/{id}.
+#
+# Cada tipo de job tem um handler registrado com @job_handler(tipo) no módulo CRUD da
+# operação. O handler recebe db, progresso (callback progresso(feito, total=None)) e os
+# parâmetros gravados no job como argumentos nomeados, e retorna o resultado
+# (serializável em JSON).
+
+JOB_HANDLERS = {}
+
+# Colunas aceitas como ordenação da listagem
+JOB_ORDER_BY = ("id",)
+
+
+def job_handler(tipo: str):
+    def registrar(fn):
+        JOB_HANDLERS[tipo] = fn
+        return fn
+    return registrar
+
+
+def job_ativo(db: Session, chave: str):
+    return db.scalar(
+        select(models.JobOrm).where(
+            models.JobOrm.chave == chave,
+            models.JobOrm.status.in_((models.StatusJobEnum.PENDENTE.value, models.StatusJobEnum.EXECUTANDO.value)),
+        )
+    )
+
+
+def enfileirar_job(db: Session, tipo: str, parametros: dict = None, chave: str = None, total: int = None):
+    """
+    Grava um job pendente e comita. Com chave, se já houver um job pendente ou em
+    execução com a mesma chave, retorna esse job em vez de criar outro.
+    """
+    if chave is not None:
+        ativo = job_ativo(db, chave)
+        if ativo is not None:
+            return ativo
+    job = models.JobOrm(tipo=tipo, chave=chave, parametros=parametros or {}, total=total)
+    try:
+        db.add(job)
+        db.commit()
+    except IntegrityError:
+        # Outro processo enfileirou a mesma chave entre a consulta e o INSERT
+        db.rollback()
+        ativo = job_ativo(db, chave)
+        if ativo is None:
+            raise
+        return ativo
+    return job
+
+
+def job_enfileirado(job, message: str = "Operação enfileirada."):
+    return schemas.JobResponseModel(
+        status=schemas.Status.Success,
+        message=message,
+        data=schemas.JobModel.model_validate(job),
+    )
+
+
+def job_aceito(result: schemas.JobResponseModel) -> ModelResponse:
+    """202 com o job e, em Location, a rota de acompanhamento."""
+    return ModelResponse(
+        result,
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/api/v1/jobs/job/{result.data.id}"},
+    )
+
+
+def get_job_crud(job_id: int, db: Session):
+    job = db.get(models.JobOrm, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job não encontrado.",
+        )
+    return schemas.JobResponseModel(
+        status=schemas.Status.Success,
+        message="Job retornado com sucesso.",
+        data=schemas.JobModel.model_validate(job),
+    )
+
+
+def get_jobs_crud(db: Session, limit: int = 10, cursor: str = None, order_by: str = "-id", status_job: Optional[list] = None, tipo: Optional[str] = None):
+    query = db.query(models.JobOrm)
+    if status_job:
+        query = query.filter(models.JobOrm.status.in_([s.value for s in status_job]))
+    if tipo:
+        query = query.filter(models.JobOrm.tipo == tipo)
+
+    jobs, next_cursor = paginate(
+        query,
+        models.JobOrm,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        allowed=JOB_ORDER_BY,
+    )
+    return schemas.JobListResponseModel(
+        status=schemas.Status.Success,
+        message="Lista de jobs obtida com sucesso.",
+        data=[schemas.JobModel.model_validate(job) for job in jobs],
+        next_cursor=next_cursor,
+    )
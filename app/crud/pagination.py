@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+
+# Paginação por keyset (cursor): em vez de OFFSET, cada página começa logo depois da
+# última linha da página anterior, usando o índice da coluna de ordenação. O custo de
+# buscar a página 10.000 passa a ser o mesmo da página 1.
+#
+# order_by aceita o nome de uma coluna, com prefixo "-" para ordem decrescente
+# (ex.: "nome", "-d_pedido"). O id é sempre usado como critério de desempate.
+
+
+def _parse_order_by(model, order_by: str, allowed: tuple):
+    descending = order_by.startswith("-")
+    field = order_by.lstrip("-")
+    if field not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ordenação inválida: {order_by}. Use um de: {', '.join(allowed)}.",
+        )
+    return getattr(model, field), descending
+
+
+def encode_cursor(order_by: str, value, last_id: int) -> str:
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps({"o": order_by, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = payload["v"], int(payload["id"])
+        if payload["o"] != order_by:
+            raise ValueError("cursor gerado para outra ordenação")
+        python_type = column.type.python_type
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif python_type is date:
+            value = date.fromisoformat(value)
+        return value, last_id
+    except (ValueError, KeyError, TypeError, binascii.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido.",
+        ) from e
+
+
+def paginate(query, model, *, limit: int, skip: int = 0, cursor: str = None, order_by: str = "id", allowed: tuple = ("id",)):
+    """
+    Aplica ordenação estável e paginação (cursor ou offset) à query.
+
+    Retorna as linhas da página e o cursor da próxima página (None na última).
+    """
+    column, descending = _parse_order_by(model, order_by, allowed)
+    pk = model.id
+
+    if column is pk:
+        query = query.order_by(pk.desc() if descending else pk.asc())
+    else:
+        query = query.order_by(
+            column.desc() if descending else column.asc(),
+            pk.desc() if descending else pk.asc(),
+        )
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, order_by, column)
+        if column is pk:
+            query = query.filter(pk < last_id if descending else pk > last_id)
+        elif descending:
+            query = query.filter(or_(column < value, and_(column == value, pk < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, pk > last_id)))
+    elif skip:
+        query = query.offset(skip)
+
+    # Busca uma linha a mais só para saber se existe uma próxima página
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(order_by, getattr(last, column.key), last.id)
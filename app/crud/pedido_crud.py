@@ -1,10 +1,62 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import case, delete, insert, select, update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
 
 import app.models as models
 import app.schemas.pedido_schema as schemas
+from app.crud.bulk import created_result, error_result
+from app.crud.estoque import aplicar_variacao_estoque, quantidades_por_produto, travar_estoques, variacao_reserva
+from app.crud.export import csv_stream, export_response, grouped_batches, ndjson_stream, row_batches
+from app.crud.pagination import paginate
+from app.crud.projection import project, projection_loading
+from app.crud.relatorios import RetratoPedido, atualizar_relatorios, retrato
+from app.crud.totais import precos_dos_produtos, totais_das_linhas
+from app.crud.updates import pair_children, update_returning
+from app.crud.produto_crud import produto_cache
 from app.database import get_db
+from app.etag import check_if_match
+
+
+# Política de carregamento por formato de resposta: joinedload para o item único e
+# selectinload para listas (um SELECT ... IN para as linhas de todos os pedidos da página).
+PEDIDO_ITEM_LOADING = (joinedload(models.PedidoOrm.produtos), raiseload("*"))
+PEDIDO_LIST_LOADING = (selectinload(models.PedidoOrm.produtos), raiseload("*"))
+
+# Relacionamentos que a listagem aceita em include= (com o loader de cada um)
+PEDIDO_RELATIONS = {"produtos": selectinload(models.PedidoOrm.produtos)}
+
+# Colunas aceitas como ordenação da listagem
+PEDIDO_ORDER_BY = ("id", "d_pedido")
+
+# Colunas exportadas por /export: as do pedido e as de cada linha (pedido_produtos)
+PEDIDO_EXPORT_FIELDS = ["id", "cliente_id", "d_pedido", "status", "periodo_inicio", "periodo_fim", "total", "itens"]
+PEDIDO_PRODUTO_EXPORT_FIELDS = ["produto_id", "quantidade", "preco_unitario"]
+
+
+def _reserva_estoque(status_pedido) -> bool:
+    """Pedidos cancelados não mantêm estoque reservado."""
+    return status_pedido != models.StatusPedidoEnum.CANCELADO
+
+
+def _invalidar_produtos(produto_ids):
+    for produto_id in produto_ids:
+        produto_cache.invalidate(produto_id)
+
+
+def _precos_das_linhas(db, produto_ids) -> dict:
+    """Preço atual de cada produto das linhas, gravado nelas como preco_unitario."""
+    precos = precos_dos_produtos(db, produto_ids)
+    faltantes = sorted(set(produto_ids) - set(precos))
+    if faltantes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Produto(s) não encontrado(s): {', '.join(map(str, faltantes))}.",
+        )
+    return precos
 
 
 def create_pedido_crud(payload: schemas.PedidoCreateModel, db: Session = Depends(get_db)):
@@ -13,20 +65,32 @@ def create_pedido_crud(payload: schemas.PedidoCreateModel, db: Session = Depends
 
         produtos_data = data.pop("produtos", [])
 
+        # Reserva o estoque na mesma transação que grava o pedido
+        reserva = quantidades_por_produto(produtos_data) if _reserva_estoque(data.get("status")) else {}
+        aplicar_variacao_estoque(db, reserva)
+
+        precos = _precos_das_linhas(db, {produto["produto_id"] for produto in produtos_data})
+        linhas = [(produto["produto_id"], produto["quantidade"], precos[produto["produto_id"]]) for produto in produtos_data]
+        data["total"], data["itens"] = totais_das_linhas(linhas)
+
         new_pedido = models.PedidoOrm(**data)
 
         # Cria os objetos PedidoProdutoOrm e associa ao pedido
         new_pedido.produtos = [
             models.PedidoProdutoOrm(
-                produto_id=produto["produto_id"],
-                quantidade=produto["quantidade"]
+                produto_id=produto_id,
+                quantidade=quantidade,
+                preco_unitario=preco,
             )
-            for produto in produtos_data
+            for produto_id, quantidade, preco in linhas
         ]
 
         db.add(new_pedido)
+        db.flush()
+        atualizar_relatorios(db, depois=[retrato(new_pedido)])
         db.commit()
         db.refresh(new_pedido)
+        _invalidar_produtos(reserva)
 
         pedido_data = schemas.PedidoModel.model_validate(new_pedido)
         return schemas.PedidoResponseModel(
@@ -34,6 +98,9 @@ def create_pedido_crud(payload: schemas.PedidoCreateModel, db: Session = Depends
             message="Pedido criado com sucesso.",
             data=pedido_data,
         )
+    except HTTPException:
+        db.rollback()
+        raise
     except IntegrityError:
         db.rollback()
         raise HTTPException(
@@ -49,7 +116,12 @@ def create_pedido_crud(payload: schemas.PedidoCreateModel, db: Session = Depends
 
 
 def get_pedido_crud(pedido_id: int, db: Session = Depends(get_db)):
-    pedido = db.query(models.PedidoOrm).filter(models.PedidoOrm.id == pedido_id).first()
+    pedido = (
+        db.query(models.PedidoOrm)
+        .options(*PEDIDO_ITEM_LOADING)
+        .filter(models.PedidoOrm.id == pedido_id)
+        .first()
+    )
 
     if not pedido:
         raise HTTPException(
@@ -70,9 +142,15 @@ def get_pedido_crud(pedido_id: int, db: Session = Depends(get_db)):
         ) from e
 
 
-def update_pedido_crud(pedido_id: int, payload: schemas.PedidoUpdateModel, db: Session):
-    pedido_query = db.query(models.PedidoOrm).filter(models.PedidoOrm.id == pedido_id)
-    db_pedido = pedido_query.first()
+def update_pedido_crud(pedido_id: int, payload: schemas.PedidoUpdateModel, db: Session, if_match: str = None):
+    # Trava o pedido e lê as linhas no mesmo SELECT: duas atualizações concorrentes não
+    # podem devolver o estoque duas vezes, e o estado anterior é a base do estoque e dos relatórios
+    db_pedido = db.execute(
+        select(models.PedidoOrm)
+        .options(*PEDIDO_ITEM_LOADING)
+        .where(models.PedidoOrm.id == pedido_id)
+        .with_for_update(of=models.PedidoOrm)
+    ).unique().scalar_one_or_none()
 
     if not db_pedido:
         raise HTTPException(
@@ -81,39 +159,92 @@ def update_pedido_crud(pedido_id: int, payload: schemas.PedidoUpdateModel, db: S
         )
 
     try:
+        # O pedido já está travado: a versão lida não muda até o commit
+        check_if_match(if_match, db_pedido.version)
+
         update_data = payload.model_dump(exclude_unset=True)
 
         produtos_data = update_data.pop("produtos", None)
 
-        if update_data:
-            pedido_query.update(update_data, synchronize_session="evaluate")
-            db.commit()
-            db.refresh(db_pedido)
+        # Cancelar devolve o estoque, reativar reserva de novo e trocar os produtos
+        # reserva/devolve só a diferença; tudo na mesma transação da atualização
+        linhas_antigas = list(db_pedido.produtos)
+        antes = retrato(db_pedido)
+        variacao = variacao_reserva(
+            linhas_antigas,
+            _reserva_estoque(db_pedido.status),
+            produtos_data if produtos_data is not None else linhas_antigas,
+            _reserva_estoque(update_data.get("status", db_pedido.status)),
+        )
+        aplicar_variacao_estoque(db, variacao)
+
+        linhas = antes.linhas
+        if produtos_data is not None:
+            # As linhas são casadas pelo produto: a que continua no pedido mantém o preço
+            # de quando entrou e só tem a quantidade alterada no lugar; apaga as dos
+            # produtos que saíram e insere as dos que entraram, com o preço atual
+            remover, manter, inserir = pair_children(
+                linhas_antigas,
+                produtos_data,
+                key=lambda linha: linha.produto_id,
+                desired_key=lambda p: p["produto_id"],
+            )
+            quantidades = {linha.id: p["quantidade"] for linha, p in manter}
+            alterar = {linha.id: p["quantidade"] for linha, p in manter if linha.quantidade != p["quantidade"]}
+            precos = _precos_das_linhas(db, {p["produto_id"] for p in inserir})
+            inserir = [(p["produto_id"], p["quantidade"], precos[p["produto_id"]]) for p in inserir]
+            linhas = [
+                (linha.produto_id, quantidades[linha.id], linha.preco_unitario)
+                for linha in linhas_antigas
+                if linha.id in quantidades
+            ] + inserir
+            update_data["total"], update_data["itens"] = totais_das_linhas(linhas)
+
+        pedido_row = update_returning(db, models.PedidoOrm, db_pedido.id, update_data)
 
         if produtos_data is not None:
-            # Limpa os produtos antigos
-            db_pedido.produtos.clear()
-            db.flush()
-
-            # Adiciona novos produtos
-            novos_produtos = [
-                models.PedidoProdutoOrm(
-                    produto_id=p["produto_id"],
-                    quantidade=p["quantidade"]
+            if remover:
+                db.execute(
+                    delete(models.PedidoProdutoOrm)
+                    .where(models.PedidoProdutoOrm.id.in_([linha.id for linha in remover]))
+                    .execution_options(synchronize_session=False)
+                )
+            if alterar:
+                db.execute(
+                    update(models.PedidoProdutoOrm)
+                    .where(models.PedidoProdutoOrm.id.in_(alterar))
+                    .values(quantidade=case(alterar, value=models.PedidoProdutoOrm.id))
+                    .execution_options(synchronize_session=False)
+                )
+            if inserir:
+                db.execute(
+                    insert(models.PedidoProdutoOrm),
+                    [
+                        {"pedido_id": db_pedido.id, "produto_id": produto_id, "quantidade": quantidade, "preco_unitario": preco}
+                        for produto_id, quantidade, preco in inserir
+                    ],
                 )
-                for p in produtos_data
-            ]
-            db_pedido.produtos.extend(novos_produtos)
 
-            db.commit()
-            db.refresh(db_pedido)
+        atualizar_relatorios(db, antes=[antes], depois=[RetratoPedido(pedido_row.d_pedido, pedido_row.status, linhas)])
+        db.commit()
+        _invalidar_produtos(variacao)
 
+        pedido_data = {
+            **pedido_row._mapping,
+            "produtos": [
+                {"produto_id": produto_id, "quantidade": quantidade, "preco_unitario": preco}
+                for produto_id, quantidade, preco in linhas
+            ],
+        }
         return schemas.PedidoResponseModel(
             status=schemas.Status.Success,
             message="Pedido atualizado com sucesso.",
-            data=schemas.PedidoModel.model_validate(db_pedido),
+            data=schemas.PedidoModel.model_validate(pedido_data),
         )
 
+    except HTTPException:
+        db.rollback()
+        raise
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(
@@ -130,19 +261,34 @@ def update_pedido_crud(pedido_id: int, payload: schemas.PedidoUpdateModel, db: S
 
 def delete_pedido_crud(pedido_id: int, db: Session = Depends(get_db)):
     try:
-        pedido = db.query(models.PedidoOrm).filter(models.PedidoOrm.id == pedido_id).first()
+        # Trava o pedido como em update_pedido_crud: um cancelamento concorrente não
+        # pode devolver o mesmo estoque de novo
+        pedido = db.execute(
+            select(models.PedidoOrm)
+            .options(*PEDIDO_ITEM_LOADING)
+            .where(models.PedidoOrm.id == pedido_id)
+            .with_for_update(of=models.PedidoOrm)
+        ).unique().scalar_one_or_none()
         if not pedido:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Pedido com ID {pedido_id} não encontrado.",
             )
+        # Devolve o que o pedido reservava na mesma transação da remoção
+        variacao = variacao_reserva(pedido.produtos, _reserva_estoque(pedido.status), [], False)
+        aplicar_variacao_estoque(db, variacao)
+        atualizar_relatorios(db, antes=[retrato(pedido)])
         db.delete(pedido)
         db.commit()
+        _invalidar_produtos(variacao)
         return schemas.PedidoDeleteModel(
             id=pedido_id,
             status=schemas.Status.Success,
             message="Pedido removido com sucesso.",
         )
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -151,10 +297,179 @@ def delete_pedido_crud(pedido_id: int, db: Session = Depends(get_db)):
         ) from e
 
 
-def get_pedidos_crud(db: Session = Depends(get_db), limit: int = 10, skip: int = 0):
-    pedidos = db.query(models.PedidoOrm).limit(limit).offset(skip).all()
-    return schemas.PedidoListResponseModel(
+def filtros_pedidos(cliente_id: int = None, status_pedido: list = None, d_pedido_de: datetime = None, d_pedido_ate: datetime = None, periodo_inicio: date = None, periodo_fim: date = None) -> list:
+    """
+    Condições WHERE da listagem de pedidos (também usadas pelo scripts/index_advisor).
+
+    d_pedido_de é inclusivo e d_pedido_ate exclusivo; datas sem fuso são tratadas como
+    UTC. periodo_inicio/periodo_fim selecionam os pedidos cujo período se sobrepõe ao
+    intervalo informado (pedidos sem período ficam de fora).
+    """
+    if d_pedido_de and d_pedido_ate and _utc(d_pedido_de) >= _utc(d_pedido_ate):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="d_pedido_de deve ser anterior a d_pedido_ate.",
+        )
+    if periodo_inicio and periodo_fim and periodo_inicio > periodo_fim:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="periodo_inicio deve ser anterior ou igual a periodo_fim.",
+        )
+
+    pedido = models.PedidoOrm
+    filtros = []
+    if cliente_id is not None:
+        filtros.append(pedido.cliente_id == cliente_id)
+    if status_pedido:
+        filtros.append(pedido.status.in_([models.StatusPedidoEnum(s) for s in status_pedido]))
+    if d_pedido_de:
+        filtros.append(pedido.d_pedido >= _utc(d_pedido_de))
+    if d_pedido_ate:
+        filtros.append(pedido.d_pedido < _utc(d_pedido_ate))
+    if periodo_inicio:
+        filtros.append(pedido.periodo_fim >= periodo_inicio)
+    if periodo_fim:
+        filtros.append(pedido.periodo_inicio <= periodo_fim)
+    return filtros
+
+
+def _utc(valor: datetime) -> datetime:
+    # d_pedido é gravado em UTC (ver PedidoOrm._d_pedido_utc)
+    if valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
+
+
+def get_pedidos_crud(db: Session = Depends(get_db), limit: int = 10, skip: int = 0, cursor: str = None, order_by: str = "id", projecao=None, **filtros):
+    loading = PEDIDO_LIST_LOADING if projecao is None else projection_loading(models.PedidoOrm, projecao, PEDIDO_RELATIONS, order_by)
+    query = db.query(models.PedidoOrm).options(*loading).filter(*filtros_pedidos(**filtros))
+    pedidos, next_cursor = paginate(
+        query,
+        models.PedidoOrm,
+        limit=limit,
+        skip=skip,
+        cursor=cursor,
+        order_by=order_by,
+        allowed=PEDIDO_ORDER_BY,
+    )
+    return project(
+        schemas.PedidoListResponseModel,
+        schemas.PedidoModel,
+        projecao,
+        pedidos,
         status=schemas.Status.Success,
         message="Lista de pedidos obtida com sucesso.",
-        data=[schemas.PedidoModel.model_validate(p) for p in pedidos],
+        next_cursor=next_cursor,
+    )
+
+
+def create_pedidos_bulk_crud(items: list, db: Session):
+    """
+    Insere um lote de (índice, PedidoCreateModel) em uma única transação.
+
+    Pedidos que referenciam clientes ou produtos inexistentes são reportados como
+    erro antes do INSERT, para não abortar o lote inteiro por violação de chave estrangeira.
+    """
+    cliente_ids = {pedido.cliente_id for _, pedido in items}
+    produto_ids = {linha.produto_id for _, pedido in items for linha in pedido.produtos or []}
+    clientes_existentes = set(
+        db.scalars(select(models.ClienteOrm.id).where(models.ClienteOrm.id.in_(cliente_ids)))
+    )
+    # Os preços atuais viram o preco_unitario das linhas
+    precos = precos_dos_produtos(db, produto_ids)
+    produtos_existentes = set(precos)
+
+    results = []
+    valid = []
+    for index, pedido in items:
+        faltantes = {linha.produto_id for linha in pedido.produtos or []} - produtos_existentes
+        if pedido.cliente_id not in clientes_existentes:
+            results.append(error_result(index, f"Cliente {pedido.cliente_id} não encontrado."))
+        elif faltantes:
+            results.append(error_result(index, f"Produto(s) não encontrado(s): {', '.join(map(str, sorted(faltantes)))}."))
+        else:
+            valid.append((index, pedido))
+    if not valid:
+        return results
+
+    try:
+        # Trava os produtos do lote em ordem de id e decide, na ordem dos itens, quais
+        # pedidos cabem no estoque; os demais são reportados sem abortar o lote
+        estoques = travar_estoques(db, {linha.produto_id for _, pedido in valid for linha in pedido.produtos or []})
+        reserva_total = Counter()
+        aceitos = []
+        for index, pedido in valid:
+            reserva = quantidades_por_produto(pedido.produtos or []) if _reserva_estoque(pedido.status) else {}
+            sem_estoque = sorted(p for p, q in reserva.items() if estoques[p] < q)
+            if sem_estoque:
+                results.append(error_result(index, f"Estoque insuficiente para o(s) produto(s): {', '.join(map(str, sem_estoque))}."))
+                continue
+            for produto_id, quantidade in reserva.items():
+                estoques[produto_id] -= quantidade
+            reserva_total.update(reserva)
+            aceitos.append((index, pedido))
+        valid = aceitos
+        if not valid:
+            db.rollback()
+            return results
+        aplicar_variacao_estoque(db, reserva_total)
+
+        rows, linhas_por_pedido = [], []
+        for _, pedido in valid:
+            row = pedido.model_dump(exclude={"produtos"})
+            row["d_pedido"] = row["d_pedido"] or datetime.now(timezone.utc)
+            if row["d_pedido"].tzinfo is not None:
+                row["d_pedido"] = row["d_pedido"].astimezone(timezone.utc)
+            row["status"] = row["status"] or models.StatusPedidoEnum.PENDENTE
+            linhas_pedido = [(linha.produto_id, linha.quantidade, precos[linha.produto_id]) for linha in pedido.produtos or []]
+            row["total"], row["itens"] = totais_das_linhas(linhas_pedido)
+            rows.append(row)
+            linhas_por_pedido.append(linhas_pedido)
+        # sort_by_parameter_order garante que os ids voltam na ordem das linhas enviadas
+        pedido_ids = db.scalars(
+            insert(models.PedidoOrm).returning(models.PedidoOrm.id, sort_by_parameter_order=True),
+            rows,
+        ).all()
+
+        linhas = [
+            {"pedido_id": pedido_id, "produto_id": produto_id, "quantidade": quantidade, "preco_unitario": preco}
+            for pedido_id, linhas_pedido in zip(pedido_ids, linhas_por_pedido)
+            for produto_id, quantidade, preco in linhas_pedido
+        ]
+        if linhas:
+            db.execute(insert(models.PedidoProdutoOrm), linhas)
+        atualizar_relatorios(db, depois=[
+            RetratoPedido(row["d_pedido"], row["status"], linhas_pedido)
+            for row, linhas_pedido in zip(rows, linhas_por_pedido)
+        ])
+        db.commit()
+    except (SQLAlchemyError, HTTPException) as e:
+        db.rollback()
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        return results + [error_result(index, f"Erro ao inserir o lote: {detail}") for index, _ in valid]
+
+    _invalidar_produtos(reserva_total)
+    results.extend(created_result(index, pedido_id) for pedido_id, (index, _) in zip(pedido_ids, valid))
+    return results
+
+
+def export_pedidos_crud(export_format: str = "ndjson"):
+    """
+    Exporta os pedidos com suas linhas em um único SELECT com LEFT JOIN ordenado
+    por pedido. No NDJSON cada linha do arquivo é um pedido com a lista "produtos";
+    no CSV cada linha do arquivo é uma linha do pedido.
+    """
+    stmt = (
+        select(
+            *[getattr(models.PedidoOrm, field) for field in PEDIDO_EXPORT_FIELDS],
+            *[getattr(models.PedidoProdutoOrm, field) for field in PEDIDO_PRODUTO_EXPORT_FIELDS],
+        )
+        .outerjoin(models.PedidoProdutoOrm, models.PedidoProdutoOrm.pedido_id == models.PedidoOrm.id)
+        .order_by(models.PedidoOrm.id, models.PedidoProdutoOrm.id)
     )
+    if export_format == "csv":
+        body = csv_stream(row_batches(stmt), PEDIDO_EXPORT_FIELDS + PEDIDO_PRODUTO_EXPORT_FIELDS)
+    else:
+        records = grouped_batches(stmt, "id", PEDIDO_EXPORT_FIELDS, "produtos", PEDIDO_PRODUTO_EXPORT_FIELDS)
+        body = ndjson_stream(records)
+    return export_response(body, export_format, "pedidos")
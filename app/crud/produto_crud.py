@@ -1,10 +1,57 @@
 from fastapi import Depends, HTTPException, status  
+from sqlalchemy import delete, insert, select  
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError  
-from sqlalchemy.orm import Session  
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload  
   
 import app.models as models  
 import app.schemas.produto_schema as schemas
+from app.cache import ReadThroughCache
+from app.crud.bulk import conflict_result, created_result, dedupe_batch, error_result, insert_ignoring_conflicts, missing_fields, run_bulk_job
+from app.crud.export import csv_stream, export_response, ndjson_stream, row_batches
+from app.crud.job_crud import enfileirar_job, job_enfileirado, job_handler
+from app.crud.pagination import paginate
+from app.crud.projection import project, projection_loading
+from app.crud.relatorios import descontar_linhas_do_produto
+from app.crud.search import apply_search
+from app.crud.totais import descontar_produto_dos_totais
+from app.crud.updates import diff_children, pair_children, row_exists, update_returning
 from app.database import get_db
+from app.etag import if_match_versions, version_conflict
+
+
+# Política de carregamento por formato de resposta. O item único usa joinedload
+# (um único SELECT com JOIN); as listas usam selectinload, que busca as imagens da
+# página inteira em um SELECT ... IN sem multiplicar as linhas afetadas pelo LIMIT.
+# raiseload("*") faz qualquer outro lazy load falhar em vez de virar um N+1 silencioso.
+PRODUTO_ITEM_LOADING = (joinedload(models.ProdutoOrm.imagens), raiseload("*"))
+PRODUTO_LIST_LOADING = (selectinload(models.ProdutoOrm.imagens), raiseload("*"))
+
+# Relacionamentos que as listagens aceitam em include= (com o loader de cada um)
+PRODUTO_RELATIONS = {"imagens": selectinload(models.ProdutoOrm.imagens)}
+
+# Cache das leituras de produto por id; update e delete invalidam a entrada
+produto_cache = ReadThroughCache("produto", schemas.ProdutoResponseModel)
+
+# Colunas aceitas como ordenação da listagem (todas indexadas)
+PRODUTO_ORDER_BY = ("id", "nome")
+
+# Colunas exportadas por /export, na ordem do CSV
+PRODUTO_EXPORT_FIELDS = ["id", "nome", "descricao", "preco", "cod_barras", "secao", "estoque", "data_validade"]
+
+# Colunas de uma imagem enviada por upload, reaproveitadas quando o mesmo arquivo
+# (mesmo hash) é enviado de novo
+IMAGEM_UPLOAD_COLUMNS = [
+    models.ProdutoImagemOrm.url,
+    models.ProdutoImagemOrm.hash,
+    models.ProdutoImagemOrm.content_type,
+    models.ProdutoImagemOrm.largura,
+    models.ProdutoImagemOrm.altura,
+    models.ProdutoImagemOrm.tamanho,
+    models.ProdutoImagemOrm.miniaturas,
+]
+
+# Colunas NOT NULL que o ProdutoCreateModel aceita como opcionais
+PRODUTO_REQUIRED_FIELDS = ("nome", "descricao", "preco", "cod_barras")
   
   
 def create_produto_crud(payload: schemas.ProdutoCreateModel, db: Session = Depends(get_db)):
@@ -48,6 +95,7 @@ def create_produto_crud(payload: schemas.ProdutoCreateModel, db: Session = Depen
 def get_produto_crud(produto_id: str, db: Session = Depends(get_db)):  
     produto_data = (  
         db.query(models.ProdutoOrm)  
+        .options(*PRODUTO_ITEM_LOADING)  
         .filter(models.ProdutoOrm.id == produto_id)  
         .first()  
     )  
@@ -71,42 +119,54 @@ def get_produto_crud(produto_id: str, db: Session = Depends(get_db)):
         ) from e  
   
   
-def update_produto_crud(produto_id: int, payload: schemas.ProdutoUpdateModel, db: Session):
-    produto_query = db.query(models.ProdutoOrm).filter(models.ProdutoOrm.id == produto_id)
-    db_produto = produto_query.first()
+def _imagens_do_produto(db: Session, produto_id: int) -> list:
+    return db.execute(
+        select(*models.ProdutoImagemOrm.__table__.columns)
+        .where(models.ProdutoImagemOrm.produto_id == produto_id)
+        .order_by(models.ProdutoImagemOrm.id)
+    ).all()
 
-    if not db_produto:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado."
-        )
 
-    try:
-        update_data = payload.model_dump(exclude_unset=True)
+def update_produto_crud(produto_id: int, payload: schemas.ProdutoUpdateModel, db: Session, if_match: str = None):
+    update_data = payload.model_dump(exclude_unset=True)
+
+    # Se tiver imagens no update, vamos tratar separado
+    imagens_data = update_data.pop("imagens", None)
 
-        # Se tiver imagens no update, vamos tratar separado
-        imagens_data = update_data.pop("imagens", None)
+    try:
+        # Tudo em uma transação: um UPDATE ... RETURNING do produto (só com a versão,
+        # se mudarem apenas as imagens) e a leitura das imagens atuais
+        produto_row = update_returning(
+            db, models.ProdutoOrm, produto_id, update_data, if_match_versions(if_match), touch=imagens_data is not None
+        )
+        if produto_row is None:
+            db.rollback()
+            if row_exists(db, models.ProdutoOrm, produto_id):
+                raise version_conflict()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado."
+            )
 
-        if update_data:
-            produto_query.update(update_data, synchronize_session="evaluate")
-            db.commit()
-            db.refresh(db_produto)
+        imagens = _imagens_do_produto(db, produto_row.id)
 
         if imagens_data is not None:
-            # Apaga as imagens antigas (porque o cascade "delete-orphan" está configurado)
-            db_produto.imagens.clear()
-            db.flush()  # Garante que a remoção é feita antes da inserção
-            
-            # Cria e adiciona as novas imagens
-            novas_imagens = [models.ProdutoImagemOrm(**img) for img in imagens_data]
-            db_produto.imagens.extend(novas_imagens)
+            # Apaga e insere só as imagens que mudaram; as iguais ficam como estão
+            remover, inserir = diff_children(imagens, [(img["url"],) for img in imagens_data], key=lambda img: (img.url,))
+            if remover:
+                db.execute(delete(models.ProdutoImagemOrm).where(models.ProdutoImagemOrm.id.in_([img.id for img in remover])))
+            if inserir:
+                db.execute(insert(models.ProdutoImagemOrm), [{"produto_id": produto_row.id, "url": url} for url, in inserir])
+                imagens = _imagens_do_produto(db, produto_row.id)
+            # As linhas completas (como no GET), na ordem em que as imagens foram enviadas
+            _, pares, _ = pair_children(imagens, imagens_data, key=lambda img: img.url, desired_key=lambda img: img["url"])
+            imagens = [img for img, _ in pares]
 
-            db.commit()
-            db.refresh(db_produto)
+        db.commit()
 
         return schemas.ProdutoResponseModel(
             status=schemas.Status.Success,
             message="Produto atualizado com sucesso.",
-            data=schemas.ProdutoModel.model_validate(db_produto),
+            data=schemas.ProdutoModel.model_validate({**produto_row._mapping, "imagens": [img._mapping for img in imagens]}),
         )
 
     except IntegrityError as e:
@@ -121,36 +181,244 @@ def update_produto_crud(produto_id: int, payload: schemas.ProdutoUpdateModel, db
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Um erro ocorreu ao tentar atualizar o produto: {str(e)}",
         ) from e
+    finally:
+        produto_cache.invalidate(produto_id)
+  
+def get_imagem_por_hash_crud(produto_id: int, hash_: str, db: Session):
+    """
+    Metadados de uma imagem já enviada com este conteúdo (sha256), para o upload não
+    processar o mesmo arquivo de novo: (colunas da imagem, se ela já é deste produto),
+    ou (None, False). 404 se o produto não existe.
+    """
+    if not row_exists(db, models.ProdutoOrm, produto_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado.")
+    imagens = models.ProdutoImagemOrm
+    no_produto = imagens.produto_id == produto_id
+    existente = db.execute(
+        select(*IMAGEM_UPLOAD_COLUMNS, no_produto.label("no_produto"))
+        .where(imagens.hash == hash_)
+        # Prefere a imagem deste produto, se já estiver nele
+        .order_by(no_produto.desc(), imagens.id)
+        .limit(1)
+    ).first()
+    # Encerra a transação: a conexão volta ao pool enquanto a imagem é processada
+    db.commit()
+    if existente is None:
+        return None, False
+    metadados = {column.key: getattr(existente, column.key) for column in IMAGEM_UPLOAD_COLUMNS}
+    return metadados, bool(existente.no_produto)
+
+
+def create_produto_imagem_crud(produto_id: int, metadados: dict, db: Session):
+    """Associa ao produto a imagem enviada e incrementa a versão do produto."""
+    try:
+        if update_returning(db, models.ProdutoOrm, produto_id, {}, touch=True) is None:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado.")
+        db.execute(insert(models.ProdutoImagemOrm).values(produto_id=produto_id, **metadados))
+        db.commit()
+        return schemas.ProdutoImagemResponseModel(
+            status=schemas.Status.Success,
+            message="Imagem adicionada ao produto com sucesso.",
+            data=schemas.ProdutoImagemModel.model_validate(metadados),
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Um erro ocorreu ao tentar adicionar a imagem: {str(e)}",
+        ) from e
+    finally:
+        produto_cache.invalidate(produto_id)
+
   
 def delete_produto_crud(produto_id: int, db: Session = Depends(get_db)):
     try:
-        produto_ = db.query(models.ProdutoOrm).filter(models.ProdutoOrm.id == produto_id).first()
+        # Trava os pedidos com linhas do produto, em ordem de id, e depois o produto, na
+        # mesma ordem de update_pedido_crud: um PATCH concorrente de um desses pedidos
+        # espera a remoção em vez de gravar um total calculado com as linhas antigas
+        linhas_do_produto = select(models.PedidoProdutoOrm.pedido_id).where(models.PedidoProdutoOrm.produto_id == produto_id)
+        db.execute(
+            select(models.PedidoOrm.id)
+            .where(models.PedidoOrm.id.in_(linhas_do_produto))
+            .order_by(models.PedidoOrm.id)
+            .with_for_update()
+        )
+        produto_ = db.query(models.ProdutoOrm).filter(models.ProdutoOrm.id == produto_id).with_for_update().first()
         if not produto_:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Não foi encontrado nenhum produto com o ID: {produto_id}",
             )
-        db.delete(produto_)  # Deleta o objeto ORM, cascata funciona aqui
+        # Tira as linhas de pedidos do produto dos relatórios e dos totais dos pedidos e
+        # as apaga em um único DELETE, sem carregá-las na sessão (passive_deletes)
+        descontar_linhas_do_produto(db, produto_.id)
+        descontar_produto_dos_totais(db, produto_.id)
+        db.execute(
+            delete(models.PedidoProdutoOrm)
+            .where(models.PedidoProdutoOrm.produto_id == produto_.id)
+            .execution_options(synchronize_session=False)
+        )
+        db.delete(produto_)  # As imagens saem junto pelo cascade
         db.commit()
         return schemas.ProdutoDeleteModel(
             id=produto_id,
             status=schemas.Status.Success,
             message="Produto removido com sucesso.",
         )
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Um erro ocorreu ao tentar remover o produto.",
         ) from e  
+    finally:
+        produto_cache.invalidate(produto_id)
+  
+def _produto_list_loading(projecao, order_by: str = "id"):
+    if projecao is None:
+        return PRODUTO_LIST_LOADING
+    return projection_loading(models.ProdutoOrm, projecao, PRODUTO_RELATIONS, order_by)
+
+
+def get_produtos_crud( db: Session = Depends(get_db), limit: int = 10, skip: int = 0, page: int = 1, search: str = "", cursor: str = None, order_by: str = "id", projecao=None):  
   
-def get_produtos_crud( db: Session = Depends(get_db), limit: int = 10, skip: int = 0, page: int = 1, search: str = ""):  
+    query = db.query(models.ProdutoOrm).options(*_produto_list_loading(projecao, order_by))  
+  
+    skip = skip or (page - 1) * limit  
+    if search:  
+        # O ranking por relevância não é uma ordem de keyset: a busca pagina por page/skip  
+        if cursor:  
+            raise HTTPException(  
+                status_code=status.HTTP_400_BAD_REQUEST,  
+                detail="A busca não suporta paginação por cursor; use page ou skip.",  
+            )  
+        query = apply_search(  
+            query,  
+            db,  
+            search,  
+            columns=[models.ProdutoOrm.nome, models.ProdutoOrm.descricao, models.ProdutoOrm.cod_barras],  
+            exact_columns=[models.ProdutoOrm.cod_barras],  
+            depth=skip + limit + 1,  
+        )  
   
-    produtos = db.query(models.ProdutoOrm).limit(limit).offset(skip).all()  
-    return schemas.ProdutoListResponseModel(  
+    produtos, next_cursor = paginate(  
+        query,  
+        models.ProdutoOrm,  
+        limit=limit,  
+        skip=skip,  
+        cursor=cursor,  
+        order_by=order_by,  
+        allowed=PRODUTO_ORDER_BY,  
+    )  
+    if search:  
+        next_cursor = None  
+    return project(  
+        schemas.ProdutoListResponseModel,  
+        schemas.ProdutoModel,  
+        projecao,  
+        produtos,  
         status=schemas.Status.Success,  
         message="Lista com todos os produtos obtida com sucesso.",  
-        data=[  
-            schemas.ProdutoModel.model_validate(produto_) for produto_ in produtos  
-        ],  
+        next_cursor=next_cursor,  
+    )  
+
+
+def get_produtos_by_ids_crud(ids: list, db: Session, projecao=None):
+    """
+    Busca vários produtos por id em um único SELECT ... WHERE id IN (...), com as
+    imagens de todos em um segundo SELECT ... IN. Os produtos voltam na ordem dos
+    ids pedidos; os inexistentes são listados em missing.
+    """
+    ids = list(dict.fromkeys(ids))
+    produtos = {
+        produto_.id: produto_
+        for produto_ in db.query(models.ProdutoOrm).options(*_produto_list_loading(projecao)).filter(models.ProdutoOrm.id.in_(ids))
+    }
+    return project(
+        schemas.ProdutoBatchResponseModel,
+        schemas.ProdutoModel,
+        projecao,
+        [produtos[id_] for id_ in ids if id_ in produtos],
+        status=schemas.Status.Success,
+        message="Produtos retornados com sucesso.",
+        missing=[id_ for id_ in ids if id_ not in produtos],
+    )
+
+
+def create_produtos_bulk_crud(items: list, db: Session):
+    """
+    Insere um lote de (índice, ProdutoCreateModel) em uma única transação.
+
+    Produtos com código de barras já existente são reportados como conflito sem
+    abortar o lote.
+    """
+    results = []
+    valid = []
+    for index, produto in items:
+        missing = missing_fields(produto, PRODUTO_REQUIRED_FIELDS)
+        if missing:
+            results.append(error_result(index, f"Campo(s) obrigatório(s) ausente(s): {', '.join(missing)}."))
+        else:
+            valid.append((index, produto))
+    valid = dedupe_batch(valid, ("cod_barras",), results)
+
+    try:
+        rows = []
+        for _, produto in valid:
+            row = produto.model_dump(exclude={"imagens"})
+            row["estoque"] = row["estoque"] or 0
+            rows.append(row)
+        inserted = insert_ignoring_conflicts(db, models.ProdutoOrm, rows, key="cod_barras")
+
+        imagens = [
+            {"produto_id": inserted[produto.cod_barras], "url": imagem.url}
+            for _, produto in valid
+            if produto.cod_barras in inserted
+            for imagem in produto.imagens or []
+        ]
+        if imagens:
+            db.execute(insert(models.ProdutoImagemOrm), imagens)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        return results + [error_result(index, f"Erro ao inserir o lote: {str(e)}") for index, _ in valid]
+
+    for index, produto in valid:
+        if produto.cod_barras in inserted:
+            results.append(created_result(index, inserted[produto.cod_barras]))
+        else:
+            results.append(conflict_result(index, "Já existe um produto com este código de barras."))
+    return results
+
+
+def create_produtos_importacao_crud(parametros: dict, db: Session):
+    """Enfileira a importação dos itens coletados por collect_bulk_payloads."""
+    total = len(parametros["itens"]) + len(parametros["erros"])
+    job = enfileirar_job(db, "importacao_produtos", parametros, total=total)
+    return job_enfileirado(job, f"Importação de {total} produto(s) enfileirada.")
+
+
+@job_handler("importacao_produtos")
+def job_importacao_produtos(db: Session, progresso, itens: list, erros: list):
+    """
+    Importação de catálogo pelo worker, com create_produtos_bulk_crud em lotes. Se o
+    job for reexecutado, os produtos já inseridos voltam como conflito.
+    """
+    return run_bulk_job(db, progresso, schemas.ProdutoCreateModel, create_produtos_bulk_crud, itens, erros)
+
+
+def export_produtos_crud(export_format: str = "ndjson"):
+    stmt = (
+        select(*[getattr(models.ProdutoOrm, field) for field in PRODUTO_EXPORT_FIELDS])
+        .order_by(models.ProdutoOrm.id)
     )
+    records = row_batches(stmt)
+    if export_format == "csv":
+        body = csv_stream(records, PRODUTO_EXPORT_FIELDS)
+    else:
+        body = ndjson_stream(records)
+    return export_response(body, export_format, "produtos")
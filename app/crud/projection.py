@@ -0,0 +1,102 @@
+import functools
+from collections import namedtuple
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from pydantic import ConfigDict, create_model
+from sqlalchemy.orm import load_only, raiseload
+
+
+# Projeções das listagens (sparse fieldsets): fields=id,nome,preco devolve só essas
+# colunas e include=imagens escolhe quais relacionamentos vêm junto.
+#
+# O SELECT carrega só as colunas pedidas (load_only) e os relacionamentos fora do
+# include não são carregados (raiseload), então cada item sai de um modelo reduzido
+# com só esses campos, com os mesmos tipos do modelo completo. id e version vêm
+# sempre: identificam o item e formam o ETag da lista, que também varia com a projeção.
+#
+# Sem fields nem include a listagem devolve o modelo completo, como antes. Com um
+# deles, fields ausente são todas as colunas e include ausente nenhum relacionamento.
+
+SEMPRE = ("id", "version")
+
+Projecao = namedtuple("Projecao", ["campos", "relacoes"])
+
+
+def _nomes(valor: str, permitidos: tuple, tipo: str) -> set:
+    nomes = {nome.strip() for nome in valor.split(",") if nome.strip()}
+    invalidos = sorted(nomes - set(permitidos))
+    if invalidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{tipo} inválido(s): {', '.join(invalidos)}. Use um de: {', '.join(permitidos)}.",
+        )
+    return nomes
+
+
+def parse_projection(fields: Optional[str], include: Optional[str], model, relations: tuple = ()) -> Optional[Projecao]:
+    """
+    Valida fields/include contra os campos do modelo Pydantic do item (as colunas são
+    os campos que não estão em relations). None quando nenhum dos dois foi informado.
+    """
+    if fields is None and include is None:
+        return None
+    colunas = tuple(nome for nome in model.model_fields if nome not in relations)
+    campos = _nomes(fields, colunas, "Campo") | set(SEMPRE) if fields is not None else set(colunas)
+    relacoes = _nomes(include, relations, "Relacionamento") if include is not None else set()
+    # Na ordem do modelo: a mesma projeção escrita de outro jeito dá o mesmo ETag
+    return Projecao(
+        tuple(nome for nome in colunas if nome in campos),
+        tuple(nome for nome in relations if nome in relacoes),
+    )
+
+
+def projection_etag(projecao: Optional[Projecao]) -> str:
+    """O que a projeção acrescenta ao ETag da lista ("" para o modelo completo)."""
+    if projecao is None:
+        return ""
+    return f"{','.join(projecao.campos)};{','.join(projecao.relacoes)}"
+
+
+def projection_loading(orm, projecao: Projecao, loaders: dict, order_by: str = "id") -> tuple:
+    """
+    Opções de carregamento da projeção: load_only das colunas pedidas (mais a de
+    ordenação, lida pelo cursor) e o loader de cada relacionamento do include.
+    """
+    colunas = dict.fromkeys(projecao.campos + (order_by.lstrip("-"),))
+    return (
+        load_only(*(getattr(orm, nome) for nome in colunas)),
+        *(loaders[nome] for nome in projecao.relacoes),
+        raiseload("*"),
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def partial_model(model, campos: tuple):
+    """Modelo com só os campos informados de model (mesmos tipos, validações e defaults)."""
+    return create_model(
+        f"{model.__name__}Parcial",
+        __config__=ConfigDict(from_attributes=True),
+        **{nome: (model.model_fields[nome].annotation, model.model_fields[nome]) for nome in campos},
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def partial_list_model(list_model, item_model, campos: tuple):
+    """list_model (um *ListResponseModel ou *BatchResponseModel) com data do modelo parcial."""
+    return create_model(
+        list_model.__name__,
+        __base__=list_model,
+        data=(List[partial_model(item_model, campos)], ...),
+    )
+
+
+def project(list_model, item_model, projecao: Optional[Projecao], rows, **kwargs):
+    """Monta a resposta da listagem com o modelo completo ou com o da projeção."""
+    if projecao is None:
+        return list_model(data=[item_model.model_validate(row) for row in rows], **kwargs)
+    campos = projecao.campos + projecao.relacoes
+    parcial = partial_model(item_model, campos)
+    return partial_list_model(list_model, item_model, campos)(
+        data=[parcial.model_validate(row) for row in rows], **kwargs
+    )
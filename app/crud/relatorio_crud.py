@@ -0,0 +1,82 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import app.models as models
+import app.schemas.relatorio_schema as schemas
+from app.crud.job_crud import enfileirar_job, job_enfileirado, job_handler
+from app.crud.relatorios import reconstruir_relatorios
+
+
+# Os relatórios leem só as tabelas de agregados (app/crud/relatorios.py), nunca os
+# pedidos: o custo é proporcional ao número de dias ou de produtos consultados.
+
+# Colunas aceitas como ordenação do ranking de produtos (ambas indexadas)
+PRODUTOS_ORDER_BY = ("quantidade", "receita")
+
+
+def get_vendas_por_dia_crud(db: Session, inicio: Optional[date] = None, fim: Optional[date] = None):
+    if inicio and fim and inicio > fim:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="inicio deve ser anterior ou igual a fim.",
+        )
+    vendas = models.RelatorioVendasDiaOrm
+    stmt = select(vendas).order_by(vendas.dia)
+    if inicio:
+        stmt = stmt.where(vendas.dia >= inicio)
+    if fim:
+        stmt = stmt.where(vendas.dia <= fim)
+    return schemas.VendasDiaResponseModel(
+        status=schemas.Status.Success,
+        message="Vendas por dia obtidas com sucesso.",
+        data=[
+            schemas.VendasDiaModel.model_validate(dia)
+            for dia in db.scalars(stmt)
+            if dia.pedidos or dia.itens
+        ],
+    )
+
+
+def get_produtos_mais_vendidos_crud(db: Session, limit: int = 10, order_by: str = "quantidade"):
+    vendas = models.RelatorioVendasProdutoOrm
+    coluna = getattr(vendas, order_by if order_by in PRODUTOS_ORDER_BY else "quantidade")
+    stmt = (
+        select(vendas.produto_id, models.ProdutoOrm.nome, vendas.quantidade, vendas.receita)
+        .join(models.ProdutoOrm, models.ProdutoOrm.id == vendas.produto_id)
+        .where(vendas.quantidade > 0)
+        .order_by(coluna.desc(), vendas.produto_id)
+        .limit(limit)
+    )
+    return schemas.VendasProdutoResponseModel(
+        status=schemas.Status.Success,
+        message="Produtos mais vendidos obtidos com sucesso.",
+        data=[schemas.VendasProdutoModel.model_validate(row._mapping) for row in db.execute(stmt)],
+    )
+
+
+def get_pedidos_por_status_crud(db: Session):
+    por_status = models.RelatorioPedidosStatusOrm
+    stmt = select(por_status).where(por_status.pedidos > 0).order_by(por_status.status)
+    return schemas.PedidosStatusResponseModel(
+        status=schemas.Status.Success,
+        message="Pedidos por status obtidos com sucesso.",
+        data=[schemas.PedidosStatusModel.model_validate(row) for row in db.scalars(stmt)],
+    )
+
+
+def reconstruir_relatorios_crud(db: Session):
+    """Enfileira a reconstrução dos agregados; com uma já na fila, retorna a existente."""
+    job = enfileirar_job(db, "reconstrucao_relatorios", chave="reconstrucao_relatorios")
+    return job_enfileirado(job, "Reconstrução dos relatórios enfileirada.")
+
+
+@job_handler("reconstrucao_relatorios")
+def job_reconstrucao_relatorios(db: Session, progresso, batch_size: int = 1000):
+    """Mesma reconstrução de scripts/rebuild_relatorios.py, em uma única transação."""
+    variacao = reconstruir_relatorios(db, batch_size=batch_size)
+    db.commit()
+    return {"dias": len(variacao.dias), "produtos": len(variacao.produtos)}
@@ -0,0 +1,209 @@
+from collections import Counter, defaultdict, namedtuple
+from datetime import timezone
+
+from sqlalchemy import insert, select, text, update
+
+import app.models as models
+from app.crud.bulk import ON_CONFLICT_INSERTS
+
+
+# Manutenção incremental dos agregados dos relatórios.
+#
+# Toda escrita que cria, altera ou remove pedidos (ou linhas de pedidos) soma a sua
+# contribuição às tabelas relatorio_* na mesma transação: o estado anterior entra com
+# sinal negativo e o novo com sinal positivo. Assim os relatórios leem O(dias) ou
+# O(produtos) linhas, nunca os pedidos.
+#
+# A receita usa o preço gravado em cada linha do pedido (preco_unitario), então mudar
+# o preço de um produto não altera os relatórios de vendas já feitas.
+
+# Linhas por INSERT multi-valores (limita o número de parâmetros de cada comando)
+UPSERT_BATCH_SIZE = 1000
+
+# Estado de um pedido do ponto de vista dos relatórios; linhas é
+# [(produto_id, quantidade, preco_unitario)]
+RetratoPedido = namedtuple("RetratoPedido", ["d_pedido", "status", "linhas"])
+
+
+def retrato(pedido) -> RetratoPedido:
+    """Retrato de um PedidoOrm (com as linhas já carregadas)."""
+    return RetratoPedido(
+        pedido.d_pedido,
+        pedido.status,
+        [(linha.produto_id, linha.quantidade, linha.preco_unitario) for linha in pedido.produtos],
+    )
+
+
+def _status(valor) -> str:
+    return models.StatusPedidoEnum(valor).value
+
+
+def _dia(d_pedido):
+    # Datas sem fuso (SQLite) já estão em UTC
+    if d_pedido.tzinfo is not None:
+        d_pedido = d_pedido.astimezone(timezone.utc)
+    return d_pedido.date()
+
+
+def _conta_como_venda(status_pedido) -> bool:
+    return _status(status_pedido) != models.StatusPedidoEnum.CANCELADO.value
+
+
+class VariacaoRelatorios:
+    """Acumula as variações dos agregados e as aplica com um upsert por tabela."""
+
+    def __init__(self):
+        self.dias = defaultdict(lambda: [0, 0, 0.0])  # dia -> [pedidos, itens, receita]
+        self.produtos = defaultdict(lambda: [0, 0.0])  # produto_id -> [quantidade, receita]
+        self.status = Counter()
+
+    def contar_pedido(self, d_pedido, status_pedido, sinal: int = 1):
+        self.status[_status(status_pedido)] += sinal
+        if _conta_como_venda(status_pedido):
+            self.dias[_dia(d_pedido)][0] += sinal
+
+    def contar_linha(self, d_pedido, status_pedido, produto_id: int, quantidade: int, preco: float, sinal: int = 1):
+        if not _conta_como_venda(status_pedido):
+            return
+        receita = quantidade * (preco or 0)
+        dia = self.dias[_dia(d_pedido)]
+        dia[1] += sinal * quantidade
+        dia[2] += sinal * receita
+        produto = self.produtos[produto_id]
+        produto[0] += sinal * quantidade
+        produto[1] += sinal * receita
+
+    def contar(self, pedido: RetratoPedido, sinal: int = 1):
+        self.contar_pedido(pedido.d_pedido, pedido.status, sinal)
+        for produto_id, quantidade, preco in pedido.linhas:
+            self.contar_linha(pedido.d_pedido, pedido.status, produto_id, quantidade, preco, sinal)
+
+    def aplicar(self, db):
+        _somar(
+            db,
+            models.RelatorioVendasDiaOrm,
+            "dia",
+            [{"dia": dia, "pedidos": p, "itens": i, "receita": r} for dia, (p, i, r) in self.dias.items() if p or i or r],
+        )
+        _somar(
+            db,
+            models.RelatorioVendasProdutoOrm,
+            "produto_id",
+            [{"produto_id": produto_id, "quantidade": q, "receita": r} for produto_id, (q, r) in self.produtos.items() if q or r],
+        )
+        _somar(
+            db,
+            models.RelatorioPedidosStatusOrm,
+            "status",
+            [{"status": s, "pedidos": n} for s, n in self.status.items() if n],
+        )
+
+
+def _somar(db, orm, key: str, rows: list):
+    """Soma as colunas de cada linha às existentes (INSERT ... ON CONFLICT DO UPDATE)."""
+    if not rows:
+        return
+    columns = [column for column in rows[0] if column != key]
+    on_conflict_insert = ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+
+    # Chaves em ordem: escritas concorrentes travam as linhas dos agregados na mesma ordem
+    rows = sorted(rows, key=lambda row: row[key])
+
+    if on_conflict_insert is not None:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = on_conflict_insert(orm).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={column: getattr(orm, column) + getattr(stmt.excluded, column) for column in columns},
+            )
+            db.execute(stmt)
+        return
+
+    for row in rows:
+        atualizadas = db.execute(
+            update(orm)
+            .where(getattr(orm, key) == row[key])
+            .values({column: getattr(orm, column) + row[column] for column in columns})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not atualizadas:
+            db.execute(insert(orm).values(row))
+
+
+def atualizar_relatorios(db, antes=(), depois=()):
+    """
+    Troca a contribuição dos pedidos em antes pela dos pedidos em depois (listas de
+    RetratoPedido): criação é só depois, remoção só antes, atualização os dois.
+    """
+    variacao = VariacaoRelatorios()
+    for pedido in antes:
+        variacao.contar(pedido, sinal=-1)
+    for pedido in depois:
+        variacao.contar(pedido)
+    variacao.aplicar(db)
+
+
+def _linhas_com_preco(*where):
+    return (
+        select(
+            models.PedidoOrm.d_pedido,
+            models.PedidoOrm.status,
+            models.PedidoProdutoOrm.produto_id,
+            models.PedidoProdutoOrm.quantidade,
+            models.PedidoProdutoOrm.preco_unitario,
+        )
+        .join(models.PedidoOrm, models.PedidoOrm.id == models.PedidoProdutoOrm.pedido_id)
+        .where(*where)
+    )
+
+
+def descontar_pedidos(db, *where):
+    """
+    Retira dos agregados os pedidos que atendem a where, antes de uma remoção em
+    conjunto (DELETE com cascade) que não passa pelos objetos ORM.
+    """
+    variacao = VariacaoRelatorios()
+    for d_pedido, status_pedido in db.execute(select(models.PedidoOrm.d_pedido, models.PedidoOrm.status).where(*where)):
+        variacao.contar_pedido(d_pedido, status_pedido, sinal=-1)
+    pedido_ids = select(models.PedidoOrm.id).where(*where)
+    for row in db.execute(_linhas_com_preco(models.PedidoProdutoOrm.pedido_id.in_(pedido_ids))):
+        variacao.contar_linha(*row, sinal=-1)
+    variacao.aplicar(db)
+
+
+def descontar_linhas_do_produto(db, produto_id: int):
+    """Retira dos agregados as linhas de pedidos de um produto que vai ser removido."""
+    variacao = VariacaoRelatorios()
+    for row in db.execute(_linhas_com_preco(models.PedidoProdutoOrm.produto_id == produto_id)):
+        variacao.contar_linha(*row, sinal=-1)
+    variacao.aplicar(db)
+
+
+RELATORIO_TABELAS = (models.RelatorioVendasDiaOrm, models.RelatorioVendasProdutoOrm, models.RelatorioPedidosStatusOrm)
+
+
+def reconstruir_relatorios(db, batch_size: int = 1000):
+    """
+    Recalcula os agregados a partir de todos os pedidos (backfill ou correção),
+    substituindo o conteúdo das tabelas na transação de db. Lê os pedidos em lotes;
+    a memória usada é proporcional ao número de dias e de produtos.
+
+    As tabelas são esvaziadas (e, no PostgreSQL, travadas) antes da leitura dos
+    pedidos: uma escrita concorrente espera o commit da reconstrução para aplicar a
+    sua variação, em vez de ser sobrescrita por uma contagem feita antes dela.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        tabelas = ", ".join(orm.__tablename__ for orm in RELATORIO_TABELAS)
+        db.execute(text(f"LOCK TABLE {tabelas} IN SHARE ROW EXCLUSIVE MODE"))
+    for orm in RELATORIO_TABELAS:
+        db.query(orm).delete(synchronize_session=False)
+
+    variacao = VariacaoRelatorios()
+    stmt = select(models.PedidoOrm.d_pedido, models.PedidoOrm.status).execution_options(yield_per=batch_size)
+    for d_pedido, status_pedido in db.execute(stmt):
+        variacao.contar_pedido(d_pedido, status_pedido)
+    for row in db.execute(_linhas_com_preco().execution_options(yield_per=batch_size)):
+        variacao.contar_linha(*row)
+
+    variacao.aplicar(db)
+    return variacao
@@ -0,0 +1,55 @@
+from sqlalchemy import Float, case, func, literal, or_, select, union
+
+
+# Busca textual usada pelas listagens de clientes e produtos.
+#
+# No PostgreSQL o ranking é pela distância de trigramas (operador <->, 1 - similarity)
+# e não ordena todas as linhas que casam com o ILIKE '%termo%': para cada coluna, os
+# índices GiST com gist_trgm_ops (extensão pg_trgm) devolvem em ordem de distância
+# (busca KNN) só as linhas necessárias até a página pedida, e apenas esses candidatos
+# (mais as correspondências exatas) são ordenados. Nos demais bancos (SQLite) o mesmo
+# filtro vira um LIKE sem índice e o ranking é feito por faixas: correspondência
+# exata, prefixo do primeiro campo e, por fim, qualquer ocorrência.
+
+
+def _dialect_name(db) -> str:
+    return db.get_bind().dialect.name
+
+
+def _distance(col, term):
+    return col.op("<->", return_type=Float)(term)
+
+
+def apply_search(query, db, term: str, columns: list, exact_columns: list = (), *, depth: int):
+    """
+    Filtra a query pelas colunas informadas e a ordena por relevância.
+
+    columns: colunas pesquisadas por substring, a primeira é a principal (ex.: nome).
+    exact_columns: colunas de identificação (código de barras, CPF) cuja
+    correspondência exata sobe para o topo do ranking.
+    depth: quantas linhas do ranking a paginação vai ler (offset + limit + 1).
+    """
+    term = term.strip()
+    match = or_(*[col.icontains(term, autoescape=True) for col in columns])
+    query = query.filter(match)
+
+    exact = [col == term for col in exact_columns]
+    exact_rank = case((or_(*exact), 1), else_=0) if exact else literal(0)
+
+    if _dialect_name(db) == "postgresql":
+        # Uma linha entre as `depth` primeiras pela menor distância está entre as
+        # `depth` mais próximas da coluna em que essa distância ocorre
+        pk = columns[0].class_.id
+        candidates = [select(pk).where(match).order_by(_distance(col, term)).limit(depth) for col in columns]
+        if exact:
+            candidates.append(select(pk).where(or_(*exact)))
+        distance = func.least(*[_distance(col, term) for col in columns])
+        return query.filter(pk.in_(union(*candidates))).order_by(exact_rank.desc(), distance)
+
+    main = columns[0]
+    fallback_rank = case(
+        (main.istartswith(term, autoescape=True), 2),
+        (main.icontains(term, autoescape=True), 1),
+        else_=0,
+    )
+    return query.order_by(exact_rank.desc(), fallback_rank.desc())
@@ -0,0 +1,53 @@
+from sqlalchemy import Numeric, cast, func, select, update
+
+import app.models as models
+
+
+# Totais desnormalizados dos pedidos.
+#
+# Cada linha guarda o preço do produto no momento em que entrou no pedido
+# (preco_unitario) e o pedido guarda total (soma de quantidade * preco_unitario) e
+# itens (soma das quantidades). Toda escrita que cria, troca ou remove linhas
+# recalcula os dois na mesma transação; mudar o preço do produto não altera pedidos
+# já feitos.
+
+
+def precos_dos_produtos(db, produto_ids) -> dict:
+    """{produto_id: preço atual} dos produtos existentes entre produto_ids."""
+    if not produto_ids:
+        return {}
+    return dict(db.execute(
+        select(models.ProdutoOrm.id, models.ProdutoOrm.preco).where(models.ProdutoOrm.id.in_(produto_ids))
+    ).all())
+
+
+def totais_das_linhas(linhas) -> tuple:
+    """(total, itens) de linhas [(produto_id, quantidade, preco_unitario)]."""
+    total = sum(quantidade * preco for _, quantidade, preco in linhas)
+    return round(total, 2), sum(quantidade for _, quantidade, _ in linhas)
+
+
+def descontar_produto_dos_totais(db, produto_id: int):
+    """
+    Recalcula total e itens dos pedidos que têm linhas do produto, sem essas linhas,
+    antes de uma remoção do produto (as linhas saem junto por cascade).
+    """
+    linha = models.PedidoProdutoOrm
+
+    def restantes(valor):
+        return (
+            select(func.coalesce(func.sum(valor), 0))
+            .where(linha.pedido_id == models.PedidoOrm.id, linha.produto_id != produto_id)
+            .scalar_subquery()
+        )
+
+    db.execute(
+        update(models.PedidoOrm)
+        .where(models.PedidoOrm.id.in_(select(linha.pedido_id).where(linha.produto_id == produto_id)))
+        .values(
+            total=func.round(cast(restantes(linha.quantidade * linha.preco_unitario), Numeric), 2),
+            itens=restantes(linha.quantidade),
+            version=models.PedidoOrm.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
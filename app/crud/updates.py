@@ -0,0 +1,84 @@
+from collections import defaultdict, deque
+
+from sqlalchemy import select, update
+
+
+# Atualizações (PATCH) em uma única transação e com o mínimo de idas ao banco.
+#
+# update_returning aplica os campos e incrementa a versão em um único
+# UPDATE ... RETURNING quando o dialeto suporta (PostgreSQL, SQLite >= 3.35), sem o
+# SELECT antes nem o refresh depois. diff_children e pair_children comparam as linhas
+# filhas atuais (imagens, linhas do pedido) com as enviadas, para inserir, alterar e
+# apagar só o que mudou.
+
+
+def update_returning(db, model, id_, values: dict, versions=None, touch: bool = False):
+    """
+    UPDATE model SET values, version = version + 1 WHERE id = id_ [AND version IN versions]
+    RETURNING todas as colunas; retorna a linha atualizada ou None se nenhuma casou.
+
+    Sem values nada é alterado (nem a versão) e a linha é só lida, com os mesmos
+    filtros; touch=True incrementa a versão mesmo assim (ex.: só as linhas filhas
+    mudaram). versions=None não restringe a versão (sem If-Match, ou If-Match: *).
+    """
+    columns = model.__table__.columns
+    where = [model.id == id_]
+    if versions is not None:
+        where.append(model.version.in_(versions))
+
+    if not values and not touch:
+        return db.execute(select(*columns).where(*where)).first()
+
+    stmt = (
+        update(model)
+        .where(*where)
+        .values(**values, version=model.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(*columns)).first()
+
+    # Dialetos sem RETURNING no UPDATE: relê a linha na mesma transação
+    if db.execute(stmt).rowcount != 1:
+        return None
+    return db.execute(select(*columns).where(model.id == id_)).first()
+
+
+def row_exists(db, model, id_) -> bool:
+    return db.scalar(select(model.id).where(model.id == id_)) is not None
+
+
+def diff_children(existing, desired: list, key) -> tuple:
+    """
+    Compara as linhas filhas atuais (existing) com as desejadas como multiconjuntos.
+
+    desired são as chaves (tuplas) das linhas enviadas e key(linha) a chave de uma
+    linha atual. Retorna (linhas atuais a apagar, chaves a inserir); linhas com a
+    mesma chave ficam como estão.
+    """
+    to_delete, _, to_insert = pair_children(existing, desired, key, desired_key=lambda item: item)
+    return to_delete, to_insert
+
+
+def pair_children(existing, desired: list, key, desired_key) -> tuple:
+    """
+    Como diff_children, mas casa cada item enviado com uma linha atual de mesma
+    identidade (key(linha) == desired_key(item)), para que o resto da linha possa ser
+    alterado no lugar. Retorna (linhas atuais a apagar, pares (linha atual, item),
+    itens a inserir).
+    """
+    pending = defaultdict(deque)
+    for row in existing:
+        pending[key(row)].append(row)
+
+    pairs = []
+    to_insert = []
+    for item in desired:
+        matches = pending.get(desired_key(item))
+        if matches:
+            pairs.append((matches.popleft(), item))
+        else:
+            to_insert.append(item)
+
+    to_delete = [row for rows in pending.values() for row in rows]
+    return to_delete, pairs, to_insert
@@ -1,9 +1,26 @@
 # Importa as funções para criar o mecanismo de conexão com o banco de dados e iniciar sessões
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
 
 # Importa o módulo os para acessar variáveis de ambiente
 import os
+import uuid
+
+from app.cache import aplicar_remocoes, remocoes_fora_da_loop
+from app.instrumentation import register_query_metrics
+from app.metrics import Counter, Gauge
+from app.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, register_pool_metrics
 
 # Importa funções da biblioteca dotenv para carregar variáveis de ambiente de um arquivo .env
 from dotenv import load_dotenv, dotenv_values
@@ -12,12 +29,274 @@ load_dotenv()
 # Obtém a URL de conexão com o banco de dados da variável de ambiente DATABASE_URL
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Configuração do pool de conexões
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Modo compatível com o pgbouncer em pool_mode=transaction: nenhum prepared statement
+# nomeado pode sobreviver entre transações, pois a conexão do servidor muda a cada uma.
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+# Monta os argumentos de create_engine/create_async_engine a partir das variáveis acima
+def engine_options(url, is_async: bool = False) -> dict:
+    parsed = make_url(url)
+    # SQLite em memória usa um pool próprio de conexão única, que não aceita dimensionamento
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    # O psycopg2 não usa prepared statements no servidor; o asyncpg sim, então o cache
+    # é desligado e cada statement recebe um nome único.
+    if DB_PGBOUNCER and parsed.get_backend_name() == "postgresql" and is_async:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
+
+
 # Cria o mecanismo de conexão (engine) com o banco de dados usando a URL obtida
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+
+# O SQLite só aplica as chaves estrangeiras (e o ON DELETE CASCADE) com o pragma ligado
+# em cada conexão
+def enable_sqlite_foreign_keys(bind):
+    if bind.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(bind, "connect")
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+enable_sqlite_foreign_keys(engine)
 
 # Cria uma fábrica de sessões do SQLAlchemy com a engine configurada
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Modo assíncrono (DATABASE_ASYNC=true): as rotas usam uma AsyncSession sobre asyncpg
+# (ou aiosqlite) em vez de ocupar uma thread do threadpool por requisição.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Drivers assíncronos usados para cada banco quando DATABASE_ASYNC está ativo
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+# Converte a URL síncrona (ex.: postgresql+psycopg2://) para o driver assíncrono equivalente
+def async_database_url(url: str):
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+if DATABASE_ASYNC:
+    async_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL),
+        **engine_options(SQLALCHEMY_DATABASE_URL, is_async=True),
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    register_pool_metrics(async_engine.sync_engine)
+    register_query_metrics(async_engine.sync_engine)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+    register_pool_metrics(engine)
+    register_query_metrics(engine)
+
+# Réplicas de leitura (DATABASE_REPLICA_URLS, separadas por vírgula).
+#
+# As requisições GET/HEAD leem de uma réplica, em rodízio entre as saudáveis; as
+# escritas e todo o resto vão para o primário. Uma thread em segundo plano consulta
+# cada réplica a cada REPLICA_HEALTH_INTERVAL segundos: uma réplica fora do ar ou com
+# atraso de replicação acima de REPLICA_MAX_LAG sai do rodízio até se recuperar, e
+# sem nenhuma réplica disponível as leituras voltam para o primário.
+#
+# Read-your-writes: depois de uma escrita bem-sucedida, a resposta leva um cookie que
+# manda as leituras do mesmo cliente para o primário por REPLICA_STICKY_SECONDS (o
+# atraso máximo aceito mais o intervalo entre as verificações), de modo que ele sempre
+# enxerga o que acabou de gravar.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_STICKY_SECONDS = REPLICA_MAX_LAG + REPLICA_HEALTH_INTERVAL
+
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+READ_METHODS = ("GET", "HEAD")
+
+# Atraso de replicação, em segundos, por dialeto. No PostgreSQL uma réplica que já
+# aplicou todo o WAL recebido está em dia, mesmo que a última transação seja antiga
+# (primário ocioso); o SQLite não replica (uma "réplica" local é só outro arquivo).
+REPLICA_LAG_SQL = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+    "sqlite": "SELECT 0",
+}
+
+DB_SESSIONS = Counter(
+    "db_sessions_total",
+    "Sessões abertas pelas rotas por destino (primary, replica ou fallback: leitura no primário sem réplica disponível)",
+    ["target"],
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Atraso de replicação medido na última verificação",
+    ["replica"],
+)
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "1 se a réplica está no rodízio das leituras",
+    ["replica"],
+)
+
+# Se a requisição corrente pode ler de uma réplica (definido por ReadReplicaMiddleware)
+_read_from_replica: ContextVar = ContextVar("read_from_replica", default=False)
+
+
+class Replica:
+    """Uma réplica de leitura: engines, fábricas de sessão e o estado da última verificação."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_engine(url, **engine_options(url))
+        enable_sqlite_foreign_keys(self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        if DATABASE_ASYNC:
+            # A engine síncrona fica só para as verificações
+            self.async_engine = create_async_engine(async_database_url(url), **engine_options(url, is_async=True))
+            enable_sqlite_foreign_keys(self.async_engine.sync_engine)
+            register_pool_metrics(self.async_engine.sync_engine, label=name)
+            register_query_metrics(self.async_engine.sync_engine)
+            self.AsyncSessionLocal = async_sessionmaker(self.async_engine, autoflush=False)
+        else:
+            register_pool_metrics(self.engine, label=name)
+            register_query_metrics(self.engine)
+        self.healthy = False
+        self.lag = None
+        DB_REPLICA_HEALTHY.set_function(lambda: int(self.healthy), replica=name)
+        DB_REPLICA_LAG.set_function(lambda: self.lag if self.lag is not None else -1, replica=name)
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                self.lag = float(conn.execute(text(REPLICA_LAG_SQL[self.engine.dialect.name])).scalar())
+            self.healthy = self.lag <= REPLICA_MAX_LAG
+        except Exception:
+            self.healthy = False
+
+
+class ReplicaSet:
+    """Rodízio entre as réplicas saudáveis, verificadas por uma thread em segundo plano."""
+
+    def __init__(self, urls: list):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls)]
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._checker = None
+
+    def _start(self):
+        # Iniciada no primeiro uso, no processo que atende as requisições; até a primeira
+        # verificação terminar as leituras vão para o primário
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._run, name="replica-health", daemon=True)
+                self._checker.start()
+
+    def _run(self):
+        while True:
+            self.check_all()
+            time.sleep(REPLICA_HEALTH_INTERVAL)
+
+    def check_all(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def choose(self):
+        """A próxima réplica saudável, ou None se nenhuma estiver disponível."""
+        if self._checker is None:
+            self._start()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+def read_replica():
+    """Réplica para a sessão da requisição corrente, ou None para usar o primário."""
+    if not replicas.replicas:
+        return None
+    if not _read_from_replica.get():
+        DB_SESSIONS.inc(target="primary")
+        return None
+    replica = replicas.choose()
+    DB_SESSIONS.inc(target="replica" if replica is not None else "fallback")
+    return replica
+
+
+class ReadReplicaMiddleware:
+    """
+    Marca as requisições GET/HEAD sem o cookie de read-your-writes como leituras que
+    podem ir para uma réplica, e grava o cookie nas respostas de escritas bem-sucedidas.
+    Sem réplicas configuradas, não faz nada.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in READ_METHODS:
+            token = _read_from_replica.set(not _sticky_to_primary(scope))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _read_from_replica.reset(token)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time() + REPLICA_STICKY_SECONDS) + 1
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={until}; Max-Age={int(REPLICA_STICKY_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _sticky_to_primary(scope) -> bool:
+    try:
+        return float(HTTPConnection(scope).cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
 # Cria a classe base que será usada como superclasse para os modelos
 Base = declarative_base()
 
@@ -28,3 +307,129 @@ def get_db():
         yield db         # "Entrega" a sessão para uso temporário
     finally:
         db.close()       # Garante que a sessão será fechada após o uso
+
+
+class DatabaseSession:
+    """
+    Sessão entregue às rotas assíncronas.
+
+    As funções CRUD são escritas uma vez só, sobre a API síncrona da Session, e
+    executadas de acordo com DATABASE_ASYNC:
+    - síncrono: Session + psycopg2 em uma thread do threadpool do Starlette;
+    - assíncrono: AsyncSession.run_sync, na própria event loop, sobre a conexão
+      asyncpg (o I/O é feito pelo driver assíncrono e nenhuma thread fica bloqueada).
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, /, **kwargs):
+        if isinstance(self.session, AsyncSession):
+            # As invalidações do cache em um backend bloqueante (Redis) não rodam na loop
+            with remocoes_fora_da_loop() as remocoes:
+                try:
+                    return await self.session.run_sync(lambda sync_session: fn(db=sync_session, **kwargs))
+                finally:
+                    await aplicar_remocoes(remocoes)
+        return await run_in_threadpool(fn, db=self.session, **kwargs)
+
+
+@asynccontextmanager
+async def _database_session(replica=None):
+    if DATABASE_ASYNC:
+        async with (replica.AsyncSessionLocal if replica else AsyncSessionLocal)() as session:
+            yield DatabaseSession(session)
+    else:
+        db = (replica.SessionLocal if replica else SessionLocal)()
+        try:
+            yield DatabaseSession(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+# Dependência das rotas: fornece uma DatabaseSession no modo configurado, sobre uma
+# réplica nas leituras que podem ir para uma (read_replica) e sobre o primário no resto
+async def get_session():
+    async with _database_session(read_replica()) as session:
+        yield session
+
+
+# Dependência das leituras que alimentam um cache compartilhado (produto e cliente por
+# id): sempre no primário, para que um miss logo depois de uma invalidação não grave no
+# cache o valor antigo de uma réplica atrasada
+async def get_primary_session():
+    if replicas.replicas:
+        DB_SESSIONS.inc(target="primary")
+    async with _database_session() as session:
+        yield session
+
+
+# Mesma sessão de get_session, para tarefas que rodam fora de uma requisição
+session_scope = asynccontextmanager(get_session)
+
+
+# Lê o resultado de uma consulta em lotes de batch_size por meio de um cursor no
+# servidor (yield_per/stream_results), com uma sessão própria que vive enquanto o
+# stream estiver aberto. A memória fica limitada a um lote, qualquer que seja o total.
+async def stream_partitions(stmt, batch_size: int = 1000):
+    stmt = stmt.execution_options(yield_per=batch_size)
+    replica = read_replica()
+
+    if DATABASE_ASYNC:
+        async with (replica.AsyncSessionLocal if replica else AsyncSessionLocal)() as session:
+            result = await session.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        return
+
+    def _partitions():
+        with (replica.SessionLocal if replica else SessionLocal)() as session:
+            yield from session.execute(stmt).partitions()
+
+    partitions = _partitions()
+    try:
+        async for partition in iterate_in_threadpool(partitions):
+            yield partition
+    finally:
+        await run_in_threadpool(partitions.close)
+
+
+class QueryCounter:
+    """Acumula os comandos SQL enviados ao banco dentro de um bloco ``count_queries``."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+# Conta os comandos SQL executados pela engine enquanto o bloco estiver ativo
+@contextmanager
+def count_queries(bind=None):
+    if bind is None:
+        bind = async_engine.sync_engine if DATABASE_ASYNC else engine
+    counter = QueryCounter()
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", _before_cursor_execute)
+
+
+# Falha com AssertionError se o bloco executar mais comandos SQL do que o esperado,
+# o que torna uma regressão para N+1 visível em testes e benchmarks
+@contextmanager
+def assert_max_queries(limit, bind=None):
+    with count_queries(bind) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"Esperado no máximo {limit} consulta(s), executadas {counter.count}:\n"
+            + "\n".join(counter.statements)
+        )
@@ -0,0 +1,91 @@
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+
+from app.responses import ModelResponse
+
+
+# ETags e requisições condicionais de clientes, produtos e pedidos.
+#
+# Cada registro tem uma coluna version, incrementada por toda escrita que muda a sua
+# representação. O ETag (forte) de um item é a sua versão; o de uma lista é um hash
+# dos pares (id, versão) da página e do next_cursor. Os dois saem do modelo já
+# carregado (do banco ou do cache), então um If-None-Match que casa responde 304 sem
+# serializar o corpo. No PATCH, If-Match faz o controle de concorrência otimista: a
+# atualização só é aplicada se a versão no banco ainda for a informada.
+
+
+def item_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def etag_for(model, variant: str = "") -> str:
+    """
+    ETag de um *ResponseModel (item único), *ListResponseModel ou *BatchResponseModel.
+
+    variant distingue representações diferentes da mesma lista (ex.: a projeção de
+    fields/include), que não podem compartilhar o ETag.
+    """
+    data = model.data
+    if not isinstance(data, list):
+        return item_etag(data.version)
+    digest = hashlib.blake2b(digest_size=16)
+    for item in data:
+        digest.update(b"%d:%d;" % (item.id, item.version))
+    digest.update((getattr(model, "next_cursor", None) or "").encode())
+    if variant:
+        digest.update(b"|" + variant.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def _etags(header: str) -> set:
+    return {tag.strip() for tag in header.split(",")}
+
+
+def not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match usa a comparação fraca: W/"x" casa com "x"."""
+    if not if_none_match:
+        return False
+    tags = {tag.removeprefix("W/") for tag in _etags(if_none_match)}
+    return "*" in tags or etag in tags
+
+
+def etag_response(model, if_none_match: Optional[str] = None, status_code: int = status.HTTP_200_OK, variant: str = "") -> Response:
+    """Resposta com ETag, ou 304 sem corpo se o cliente já tem esta versão."""
+    etag = etag_for(model, variant)
+    if not_modified(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return ModelResponse(model, status_code=status_code, headers={"ETag": etag})
+
+
+def check_if_match(if_match: Optional[str], version: int):
+    """412 se If-Match não corresponde à versão atual (comparação forte: W/ nunca casa)."""
+    if not if_match:
+        return
+    tags = _etags(if_match)
+    if "*" not in tags and item_etag(version) not in tags:
+        raise version_conflict()
+
+
+def version_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="O registro foi alterado por outra requisição; busque a versão atual e tente de novo.",
+    )
+
+
+def if_match_versions(if_match: Optional[str]):
+    """
+    Versões aceitas por um If-Match, para filtrar o próprio UPDATE (WHERE version IN ...).
+
+    None quando não há restrição (sem cabeçalho ou *); ETags fracos ou que não são de
+    uma versão nunca casam.
+    """
+    if not if_match:
+        return None
+    tags = _etags(if_match)
+    if "*" in tags:
+        return None
+    return [int(tag[1:-1]) for tag in tags if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit()]
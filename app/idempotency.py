@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.cache import MISS, LRUTTLCache, adiar_invalidacoes, repetir_invalidacoes
+from app.crud.bulk import ON_CONFLICT_INSERTS
+from app.metrics import Counter
+from app.responses import ModelResponse
+
+
+# Idempotency-Key nas escritas que criam registros (POST /pedido e as rotas /bulk).
+#
+# A primeira requisição com uma chave reserva a chave no banco (tabela
+# chaves_idempotencia) e executa; se terminar com 2xx, a resposta é gravada e repetida
+# byte a byte, com Idempotency-Replayed: true, para as retentativas com a mesma chave
+# até IDEMPOTENCY_TTL, sem passar pelo CRUD. As respostas recentes ficam também em um
+# LRU no processo, na frente do banco.
+#
+# O CRUD roda dentro da transação que grava a resposta: os commits dele viram
+# SAVEPOINTs e o que ele escreveu só é comitado junto com a resposta. Se o processo cair
+# no meio, nada fica gravado e a retentativa (vencida a reserva) executa de novo, sem
+# duplicar o pedido. Por isso um lote com chave é uma transação só, e o corpo (lido
+# inteiro para o fingerprint) é limitado a IDEMPOTENCY_MAX_BODY_BYTES; sem a chave, as
+# rotas /bulk continuam lendo o stream em lotes.
+#
+# Uma duplicata que chega enquanto a original ainda roda espera por ela: no mesmo
+# processo, pelo future da original; em outro processo, consultando a reserva no banco
+# até a resposta aparecer (ou IDEMPOTENCY_WAIT se esgotar: 409). Respostas de erro não
+# são gravadas (a transação foi desfeita, então repetir é seguro) e liberam a chave.
+# A mesma chave com outro corpo é recusada com 422.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "300"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))
+IDEMPOTENCY_CACHE_MAXSIZE = int(os.getenv("IDEMPOTENCY_CACHE_MAXSIZE", "10000"))
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
+# Chaves vencidas apagadas a cada resposta gravada (a tabela se mantém compacta sem
+# um job de limpeza)
+IDEMPOTENCY_PURGE_BATCH = 100
+
+REPLAYED_HEADER = "Idempotency-Replayed"
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Requisições com Idempotency-Key por resultado (executada, repetida, aguardou, conflito)",
+    ["result"],
+)
+
+RespostaGravada = namedtuple("RespostaGravada", ["fingerprint", "status_code", "corpo"])
+
+_respostas = LRUTTLCache(maxsize=IDEMPOTENCY_CACHE_MAXSIZE, ttl=IDEMPOTENCY_TTL)
+_inflight = {}
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _filtro_chave(chave: str, rota: str):
+    tabela = models.ChaveIdempotenciaOrm
+    return tabela.chave == chave, tabela.rota == rota
+
+
+def reservar_chave(chave: str, rota: str, fingerprint: str, db):
+    """
+    Reserva a chave para esta requisição, apagando antes uma reserva ou resposta vencida.
+
+    Retorna (True, None) se reservou; senão (False, linha existente), com linha None se
+    a reserva que impediu esta acabou de ser liberada.
+    """
+    tabela = models.ChaveIdempotenciaOrm
+    agora = _agora()
+    db.execute(delete(tabela).where(*_filtro_chave(chave, rota), tabela.expira_em < agora))
+
+    valores = {
+        "chave": chave,
+        "rota": rota,
+        "fingerprint": fingerprint,
+        "expira_em": agora + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT),
+    }
+    on_conflict_insert = ON_CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+    if on_conflict_insert is not None:
+        reservou = db.execute(on_conflict_insert(tabela).values(valores).on_conflict_do_nothing()).rowcount == 1
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(insert(tabela).values(valores))
+            reservou = True
+        except IntegrityError:
+            reservou = False
+    db.commit()
+    if reservou:
+        return True, None
+    return False, ler_chave(chave, rota, db)
+
+
+def travar_chave(chave: str, rota: str, db):
+    """
+    Abre a transação da execução com um UPDATE na reserva, que fica travada até o commit
+    da resposta: outro processo que encontre a reserva vencida espera por ela em vez de
+    apagá-la e executar de novo. No SQLite a escrita também faz o driver abrir a
+    transação antes do primeiro SAVEPOINT (fora de uma, o RELEASE comitaria o CRUD).
+    """
+    tabela = models.ChaveIdempotenciaOrm
+    db.execute(
+        update(tabela)
+        .where(*_filtro_chave(chave, rota))
+        .values(expira_em=_agora() + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT))
+    )
+
+
+def ler_chave(chave: str, rota: str, db):
+    linha = db.execute(
+        select(
+            models.ChaveIdempotenciaOrm.fingerprint,
+            models.ChaveIdempotenciaOrm.status_code,
+            models.ChaveIdempotenciaOrm.corpo,
+        ).where(*_filtro_chave(chave, rota))
+    ).first()
+    # Encerra a transação: a próxima consulta da espera enxerga o que foi comitado
+    db.commit()
+    return RespostaGravada(*linha) if linha is not None else None
+
+
+def gravar_resposta(chave: str, rota: str, resposta: RespostaGravada, db):
+    tabela = models.ChaveIdempotenciaOrm
+    agora = _agora()
+    db.execute(
+        update(tabela)
+        .where(*_filtro_chave(chave, rota))
+        .values(status_code=resposta.status_code, corpo=resposta.corpo, expira_em=agora + timedelta(seconds=IDEMPOTENCY_TTL))
+    )
+    vencidas = select(tabela.chave, tabela.rota).where(tabela.expira_em < agora).limit(IDEMPOTENCY_PURGE_BATCH)
+    db.execute(delete(tabela).where(tuple_(tabela.chave, tabela.rota).in_(vencidas)))
+    db.commit()
+
+
+def liberar_chave(chave: str, rota: str, db):
+    """
+    Desfaz o que a requisição escreveu (a transação aberta por SessaoNaTransacao) e
+    apaga a reserva de uma requisição que terminou sem resposta gravável.
+    """
+    db.rollback()
+    tabela = models.ChaveIdempotenciaOrm
+    db.execute(delete(tabela).where(*_filtro_chave(chave, rota), tabela.status_code.is_(None)))
+    db.commit()
+
+
+class SessaoNaTransacao:
+    """
+    DatabaseSession para o CRUD de uma requisição com Idempotency-Key: cada run usa uma
+    Session sobre a transação aberta em db, em que commit e rollback só liberam ou
+    desfazem um SAVEPOINT. Quem comita é gravar_resposta (ou liberar_chave).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def run(self, fn, /, **kwargs):
+        return await self.db.run(_em_savepoint, fn=fn, kwargs=kwargs)
+
+
+def _em_savepoint(db, fn, kwargs):
+    with Session(bind=db.connection(), join_transaction_mode="create_savepoint", autoflush=False) as sessao:
+        return fn(db=sessao, **kwargs)
+
+
+async def _corpo(request: Request, limite: Optional[int]) -> bytes:
+    """O corpo da requisição para o fingerprint, recusando sem lê-lo o que passar de limite."""
+    if limite is not None:
+        content_length = request.headers.get("content-length")
+        if content_length is None or not content_length.isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_411_LENGTH_REQUIRED,
+                detail=f"Com Idempotency-Key, envie o corpo com Content-Length (até {limite} bytes).",
+            )
+        if int(content_length) > limite:
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail=f"Com Idempotency-Key, o corpo pode ter até {limite} bytes; divida o lote ou envie sem a chave.",
+            )
+    return await request.body()
+
+
+def _outro_corpo() -> HTTPException:
+    IDEMPOTENCY_REQUESTS.inc(result="conflito")
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        detail="Idempotency-Key já usada com outro corpo de requisição.",
+    )
+
+
+def _em_andamento() -> HTTPException:
+    IDEMPOTENCY_REQUESTS.inc(result="conflito")
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A requisição original com esta Idempotency-Key ainda não terminou; tente de novo.",
+    )
+
+
+def _repetir(gravada: RespostaGravada, fingerprint: str) -> Response:
+    if gravada.fingerprint != fingerprint:
+        raise _outro_corpo()
+    IDEMPOTENCY_REQUESTS.inc(result="repetida")
+    return Response(
+        gravada.corpo,
+        status_code=gravada.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def idempotent(request: Request, db, idempotency_key: Optional[str], executar, status_code: int, limite_corpo: Optional[int] = IDEMPOTENCY_MAX_BODY_BYTES):
+    """
+    Executa executar(db) (uma corrotina que chama o CRUD pela DatabaseSession
+    recebida) no máximo uma vez por Idempotency-Key e rota; sem chave, só executa.
+
+    O retorno de executar() vira a resposta com status_code; as retentativas recebem a
+    resposta gravada. limite_corpo=None aceita corpos de qualquer tamanho (rotas que
+    leem o corpo inteiro de qualquer forma).
+    """
+    if idempotency_key is None:
+        return await executar(db)
+
+    rota = f"{request.method} {request.url.path}"
+    fingerprint = hashlib.blake2b(await _corpo(request, limite_corpo), digest_size=16).hexdigest()
+    chave = (rota, idempotency_key)
+
+    gravada = _respostas.get(chave)
+    if gravada is not MISS:
+        return _repetir(gravada, fingerprint)
+
+    inflight = _inflight.get(chave)
+    if inflight is not None:
+        IDEMPOTENCY_REQUESTS.inc(result="aguardou")
+        gravada, _ = await asyncio.shield(inflight)
+        return _repetir(gravada, fingerprint)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[chave] = future
+    try:
+        gravada, resposta = await _executar_uma_vez(db, idempotency_key, rota, fingerprint, executar, status_code)
+        future.set_result((gravada, resposta is None))
+    except asyncio.CancelledError:
+        # A reserva no banco fica até IDEMPOTENCY_LOCK_TIMEOUT; quem espera aqui tenta de novo
+        future.set_exception(_em_andamento())
+        future.exception()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # marca como recuperada se ninguém estiver aguardando
+        raise
+    finally:
+        if _inflight.get(chave) is future:
+            del _inflight[chave]
+
+    if resposta is None:
+        return _repetir(gravada, fingerprint)
+    return resposta
+
+
+async def _executar_uma_vez(db, idempotency_key: str, rota: str, fingerprint: str, executar, status_code: int):
+    """
+    (gravada, resposta): executa se conseguir reservar a chave, senão espera a resposta
+    gravada. resposta é a Response original (com os cabeçalhos), ou None na repetição.
+    """
+    chave = (rota, idempotency_key)
+    prazo = time.monotonic() + IDEMPOTENCY_WAIT
+    espera = 0.05
+    while True:
+        reservou, linha = await db.run(reservar_chave, chave=idempotency_key, rota=rota, fingerprint=fingerprint)
+        if reservou:
+            break
+        if linha is not None:
+            if linha.fingerprint != fingerprint:
+                raise _outro_corpo()
+            if linha.status_code is not None:
+                _respostas.set(chave, linha)
+                return linha, None
+        # Em andamento em outro processo (ou recém-liberada): consulta de novo em seguida
+        if time.monotonic() >= prazo:
+            raise _em_andamento()
+        if espera == 0.05:
+            IDEMPOTENCY_REQUESTS.inc(result="aguardou")
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, 0.5)
+
+    try:
+        with adiar_invalidacoes() as invalidacoes:
+            await db.run(travar_chave, chave=idempotency_key, rota=rota)
+            resultado = await executar(SessaoNaTransacao(db))
+            resposta = resultado if isinstance(resultado, Response) else ModelResponse(resultado, status_code=status_code)
+            gravada = RespostaGravada(fingerprint, resposta.status_code, bytes(resposta.body))
+            if 200 <= resposta.status_code < 300:
+                # Comita o que o CRUD escreveu junto com a resposta
+                await db.run(gravar_resposta, chave=idempotency_key, rota=rota, resposta=gravada)
+    except Exception:
+        await db.run(liberar_chave, chave=idempotency_key, rota=rota)
+        raise
+
+    if not 200 <= resposta.status_code < 300:
+        await db.run(liberar_chave, chave=idempotency_key, rota=rota)
+        return gravada, resposta
+
+    # O CRUD invalidou o cache antes do commit: uma leitura no meio pode ter gravado o
+    # valor antigo de volta
+    await repetir_invalidacoes(invalidacoes)
+    _respostas.set(chave, gravada)
+    IDEMPOTENCY_REQUESTS.inc(result="executada")
+    return gravada, resposta
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, Request, status
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from app.storage import MEDIA_TYPES, get_storage, nome_arquivo
+
+
+# Processamento das imagens enviadas em POST /produto/{id}/imagem.
+#
+# Decodificar e redimensionar é CPU pura: roda em um pool de processos (IMAGE_WORKERS),
+# fora do event loop e sem disputar o GIL com as requisições. Cada processo valida a
+# imagem, gera as miniaturas e só então grava o original e as miniaturas no storage
+# (endereçado pelo sha256 do original), devolvendo só os metadados; as miniaturas que
+# já existem no storage não são geradas de novo.
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_THUMB_SIZES = [int(largura) for largura in os.getenv("IMAGE_THUMB_SIZES", "160,480").split(",") if largura.strip()]
+# AVIF só entra no padrão se o Pillow instalado tiver o encoder
+_THUMB_FORMATS_PADRAO = "webp,avif" if features.check("avif") else "webp"
+IMAGE_THUMB_FORMATS = [formato.strip().lower() for formato in os.getenv("IMAGE_THUMB_FORMATS", _THUMB_FORMATS_PADRAO).split(",") if formato.strip()]
+# Prefixo das URLs gravadas nas imagens (ex.: o endereço de uma CDN na frente da rota)
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/api/v1/produtos/imagens").rstrip("/")
+
+# Formatos aceitos no upload (nome do Pillow -> extensão do arquivo)
+IMAGE_FORMATS = {"JPEG": "jpeg", "PNG": "png", "GIF": "gif", "WEBP": "webp", "AVIF": "avif"}
+
+# Parâmetros do encoder de cada formato de miniatura
+THUMB_SAVE_OPTIONS = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60, "speed": 6},
+}
+
+
+IMAGE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "description": "Os bytes da imagem (JPEG, PNG, GIF, WebP ou AVIF), sem multipart.",
+        "content": {"image/*": {"schema": {"type": "string", "format": "binary"}}},
+    }
+}
+
+
+class ImagemInvalida(ValueError):
+    """Arquivo que não pôde ser decodificado ou que excede os limites (422)."""
+
+
+class FormatoNaoSuportado(ImagemInvalida):
+    """Arquivo que não é uma imagem em um dos IMAGE_FORMATS (415)."""
+
+
+def image_url(nome: str) -> str:
+    return f"{IMAGE_BASE_URL}/{nome}"
+
+
+def content_hash(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+
+async def ler_upload(request: Request) -> bytes:
+    """Lê o corpo da requisição, recusando (413) o que passar de IMAGE_MAX_BYTES sem lê-lo todo."""
+    content_type = request.headers.get("content-type", "")
+    if content_type and not content_type.startswith(("image/", "application/octet-stream")):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Envie os bytes da imagem com Content-Type image/*.",
+        )
+    muito_grande = HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"A imagem passa do limite de {IMAGE_MAX_BYTES} bytes.",
+    )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > IMAGE_MAX_BYTES:
+        raise muito_grande
+    dados = bytearray()
+    async for chunk in request.stream():
+        dados += chunk
+        if len(dados) > IMAGE_MAX_BYTES:
+            raise muito_grande
+    if not dados:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail="Corpo da requisição vazio.")
+    return bytes(dados)
+
+
+def _miniatura(imagem: Image.Image, largura: int, altura: int, formato: str) -> bytes:
+    reduzida = imagem.resize((largura, altura), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    buffer = io.BytesIO()
+    reduzida.save(buffer, format=formato.upper(), **THUMB_SAVE_OPTIONS.get(formato, {}))
+    return buffer.getvalue()
+
+
+def processar_imagem(dados: bytes, hash_: str) -> dict:
+    """
+    Valida a imagem, grava o original e as miniaturas e retorna os metadados (as
+    colunas de ProdutoImagemOrm). Roda nos processos do pool.
+    """
+    try:
+        imagem = Image.open(io.BytesIO(dados))
+    except UnidentifiedImageError as e:
+        raise FormatoNaoSuportado("O arquivo enviado não é uma imagem em um formato suportado.") from e
+    except Image.DecompressionBombError as e:
+        raise ImagemInvalida(f"A imagem tem mais de {IMAGE_MAX_PIXELS} pixels.") from e
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImagemInvalida("A imagem enviada está corrompida.") from e
+    ext = IMAGE_FORMATS.get(imagem.format)
+    if ext is None:
+        raise FormatoNaoSuportado(f"Formato de imagem não suportado: {imagem.format}.")
+    # Image.open só leu o cabeçalho: recusa as "bombas de descompressão" antes de decodificar
+    if imagem.width * imagem.height > IMAGE_MAX_PIXELS:
+        raise ImagemInvalida(f"A imagem tem mais de {IMAGE_MAX_PIXELS} pixels.")
+    try:
+        imagem.load()
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImagemInvalida("A imagem enviada está corrompida.") from e
+
+    storage = get_storage()
+    nome = nome_arquivo(hash_, ext)
+
+    # As miniaturas saem na orientação de exibição (EXIF); o original fica como veio
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.mode not in ("RGB", "RGBA"):
+        imagem = imagem.convert("RGBA" if "transparency" in imagem.info or imagem.mode in ("LA", "PA") else "RGB")
+
+    miniaturas = []
+    arquivos = []
+    # Sem ampliar: uma imagem menor que a miniatura só muda de formato
+    for largura in sorted({min(largura, imagem.width) for largura in IMAGE_THUMB_SIZES}):
+        altura = max(1, round(imagem.height * largura / imagem.width))
+        for formato in IMAGE_THUMB_FORMATS:
+            nome_miniatura = nome_arquivo(hash_, formato, largura)
+            if not storage.exists(nome_miniatura):
+                arquivos.append((nome_miniatura, _miniatura(imagem, largura, altura, formato), MEDIA_TYPES[formato]))
+            miniaturas.append({"largura": largura, "altura": altura, "formato": formato, "url": image_url(nome_miniatura)})
+
+    # Só grava depois que todas as miniaturas foram geradas: um encoder que falha não
+    # deixa no storage um original sem registro
+    storage.put(nome, dados, MEDIA_TYPES[ext])
+    for arquivo in arquivos:
+        storage.put(*arquivo)
+
+    return {
+        "url": image_url(nome),
+        "hash": hash_,
+        "content_type": MEDIA_TYPES[ext],
+        "largura": imagem.width,
+        "altura": imagem.height,
+        "tamanho": len(dados),
+        "miniaturas": miniaturas,
+    }
+
+
+_pool = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: os processos não herdam o event loop nem as conexões do servidor
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def processar_imagem_no_pool(dados: bytes, hash_: str) -> dict:
+    """processar_imagem em um processo do pool; os erros de validação viram 415/422."""
+    global _pool
+    pool = _get_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, processar_imagem, dados, hash_)
+    except BrokenProcessPool:
+        # Um processo morreu (ex.: sem memória): o pool não aceita mais tarefas, a
+        # próxima imagem abre outro
+        if _pool is pool:
+            _pool = None
+        raise
+    except FormatoNaoSuportado as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)) from e
+    except ImagemInvalida as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e)) from e
@@ -0,0 +1,145 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.metrics import Counter, Gauge, Histogram
+
+
+# Instrumentação das requisições HTTP e das consultas ao banco feitas por elas.
+#
+# MetricsMiddleware é um middleware ASGI puro (sem BaseHTTPMiddleware, que cria uma
+# task e filas por requisição): mede a latência até o último pedaço do corpo da
+# resposta, o tamanho da resposta e as requisições em andamento. As consultas são
+# contadas pelos eventos da engine e somadas na requisição corrente por meio de uma
+# ContextVar, que acompanha tanto o threadpool quanto o run_sync do modo assíncrono.
+
+# Buckets de tamanho de resposta, em bytes
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Buckets de consultas por requisição: a partir de ~10 costuma ser N+1
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Rótulo das requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições até o fim do corpo da resposta",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requisições em andamento",
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Tamanho do corpo das respostas",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Comandos SQL executados por requisição",
+    ["method", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Tempo gasto no banco (execução dos comandos) por requisição",
+    ["method", "route"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "Comandos SQL executados, por rota (background para os de fora de uma requisição)",
+    ["route"],
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "closed")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # Depois da resposta enviada (ex.: BackgroundTasks) as consultas não são da requisição
+        self.closed = False
+
+
+_request_stats: ContextVar = ContextVar("request_stats", default=None)
+
+
+def _route_label(scope) -> str:
+    """Modelo da rota (ex.: /api/v1/clientes/cliente/{cliente_id}) que atendeu a requisição."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        size = 0
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            stats.closed = True
+            method, route = scope["method"], _route_label(scope)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=method, route=route, status=status_code)
+            HTTP_RESPONSE_SIZE.observe(size, method=method, route=route)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, method=method, route=route)
+            DB_TIME_PER_REQUEST.observe(stats.db_seconds, method=method, route=route)
+            if stats.queries:
+                DB_QUERIES.inc(stats.queries, route=route)
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    # Fecha a medição aqui: tarefas em segundo plano rodam depois
+                    # do corpo e não contam na latência da requisição
+                    await send(message)
+                    finish()
+                    return
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _request_stats.reset(token)
+
+
+def register_query_metrics(engine):
+    """Conta os comandos SQL da engine e o tempo de cada um na requisição corrente."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        if stats is None or stats.closed:
+            DB_QUERIES.inc(route="background")
+            return
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - context._query_start
@@ -1,13 +1,20 @@
 from fastapi import FastAPI  
 from fastapi.middleware.cors import CORSMiddleware  
+from fastapi.responses import PlainTextResponse  
   
 from app import models  
-from app.database import engine  
-from app.routers import cliente_routes, pedido_routes, produto_routes
+from app.database import ReadReplicaMiddleware, engine  
+from app.instrumentation import MetricsMiddleware
+from app.metrics import render_metrics  
+from app.responses import ORJSONResponse
+from app.routers import cliente_routes, job_routes, pedido_routes, produto_routes, relatorio_routes
 
 models.Base.metadata.create_all(bind=engine)  
   
-app = FastAPI()  
+app = FastAPI(default_response_class=ORJSONResponse)  
+
+# Leituras (GET) em réplicas, quando DATABASE_REPLICA_URLS está configurada
+app.add_middleware(ReadReplicaMiddleware)
   
 origins = [  
     "http://localhost:8000",  
@@ -19,12 +26,20 @@ app.add_middleware(
     allow_credentials=True,  
     allow_methods=["*"],  
     allow_headers=["*"],  
+    # Para o navegador entregar ao código do cliente o ETag (If-None-Match / If-Match)
+    # e a marca das respostas repetidas por Idempotency-Key, e o Location dos jobs
+    expose_headers=["ETag", "Idempotency-Replayed", "Location"],
 )  
+
+# Registrado por último para ser o mais externo: mede também o tempo do CORS
+app.add_middleware(MetricsMiddleware)
   
   
 app.include_router(cliente_routes.router, tags=["Cliente"], prefix="/api/v1/clientes")
 app.include_router(produto_routes.router, tags=["Produto"], prefix="/api/v1/produtos")  
 app.include_router(pedido_routes.router, tags=["Pedido"], prefix="/api/v1/pedidos")  
+app.include_router(relatorio_routes.router, tags=["Relatório"], prefix="/api/v1/relatorios")
+app.include_router(job_routes.router, tags=["Job"], prefix="/api/v1/jobs")
 
 @app.get("/")  
 def root():  
@@ -33,3 +48,7 @@ def root():
 @app.get("/api/healthchecker")  
 def root():  
     return {"message": "API em funcionamento!!"}
+
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
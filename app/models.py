@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Float, Integer, String, Boolean, Date, ForeignKey, Enum, DateTime, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Float, Integer, String, Boolean, Date, ForeignKey, Enum, DateTime, Table, Index, DDL, JSON, LargeBinary, Text, event, text
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from app.database import Base
+from datetime import datetime, timezone
 import enum
 
 # Enum para status do pedido
@@ -12,20 +13,50 @@ class StatusPedidoEnum(str, enum.Enum):
     ENTREGUE = "entregue"
     CANCELADO = "cancelado"
 
+# Status dos jobs da fila (tabela jobs)
+class StatusJobEnum(str, enum.Enum):
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    ERRO = "erro"
+
+# Índice GiST com trigramas (pg_trgm) para a busca por substring: atende o ILIKE e a
+# ordenação pela distância (<->, KNN) do ranking; só existe no PostgreSQL
+def trigram_index(table: str, column: str) -> Index:
+    return Index(
+        f"ix_{table}_{column}_trgm",
+        column,
+        postgresql_using="gist",
+        postgresql_ops={column: "gist_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
 class ClienteOrm(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        trigram_index("clientes", "nome"),
+        trigram_index("clientes", "email"),
+        trigram_index("clientes", "cpf"),
+    )
 
     id = Column(Integer, autoincrement=True, primary_key=True, nullable=False)
     nome = Column(String(50), index=True, nullable=False)
     email = Column(String(50), unique=True, index=True, nullable=False)
     cpf = Column(String(14), unique=True, index=True, nullable=False)
     ativo = Column(Boolean, default=True)
+    # Incrementada a cada alteração: base do ETag e do If-Match (app/etag.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     pedidos = relationship("PedidoOrm", back_populates="cliente", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class ProdutoOrm(Base):
     __tablename__ = "produtos"
+    __table_args__ = (
+        trigram_index("produtos", "nome"),
+        trigram_index("produtos", "descricao"),
+        trigram_index("produtos", "cod_barras"),
+    )
 
     id = Column(Integer, autoincrement=True, primary_key=True, nullable=False)
     nome = Column(String(50), index=True, nullable=False)
@@ -35,43 +66,167 @@ class ProdutoOrm(Base):
     secao = Column(String(50), index=True, nullable=True)
     estoque = Column(Integer, default=0, nullable=False)
     data_validade = Column(Date, nullable=True)
+    # Também muda com a troca de imagens e com as reservas de estoque dos pedidos
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     imagens = relationship("ProdutoImagemOrm", back_populates="produto", cascade="all, delete-orphan")
-    pedidos = relationship("PedidoProdutoOrm", back_populates="produto", cascade="all, delete-orphan")
+    pedidos = relationship("PedidoProdutoOrm", back_populates="produto", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class ProdutoImagemOrm(Base):
     __tablename__ = "produto_imagens"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), index=True, nullable=False)
     url = Column(String(500), nullable=False)
+    # Só nas imagens enviadas por upload (as cadastradas por URL ficam nulas): sha256 do
+    # arquivo, que é também o nome dele no storage, e as miniaturas geradas
+    hash = Column(String(64), index=True, nullable=True)
+    content_type = Column(String(50), nullable=True)
+    largura = Column(Integer, nullable=True)
+    altura = Column(Integer, nullable=True)
+    tamanho = Column(Integer, nullable=True)
+    miniaturas = Column(JSON, nullable=True)
 
     produto = relationship("ProdutoOrm", back_populates="imagens")
 
 
 class PedidoOrm(Base):
     __tablename__ = "pedidos"
+    __table_args__ = (
+        # Também atende às buscas só por cliente_id (coluna à esquerda), inclusive o
+        # ON DELETE CASCADE a partir de clientes, então cliente_id não tem índice próprio
+        Index("ix_pedidos_cliente_id_d_pedido", "cliente_id", "d_pedido"),
+        Index("ix_pedidos_status_d_pedido", "status", "d_pedido"),
+        # Filtro de sobreposição de período (periodo_fim >= início AND periodo_inicio <= fim):
+        # o intervalo em periodo_fim restringe a varredura e periodo_inicio é checado no índice
+        Index("ix_pedidos_periodo_fim_periodo_inicio", "periodo_fim", "periodo_inicio"),
+    )
 
     id = Column(Integer, autoincrement=True, primary_key=True, nullable=False)
     cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
     
-    d_pedido = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # O default no Python grava a data com a mesma precisão usada nos parâmetros das
+    # consultas (no SQLite, CURRENT_TIMESTAMP descarta os microssegundos e quebra a
+    # comparação do cursor de paginação); o server_default continua valendo para
+    # inserções feitas fora da aplicação.
+    d_pedido = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now(), index=True, nullable=False)
     status = Column(Enum(StatusPedidoEnum), default=StatusPedidoEnum.PENDENTE, nullable=False)
     periodo_inicio = Column(Date, nullable=True)
     periodo_fim = Column(Date, nullable=True)
+    # Também muda com a troca das linhas do pedido
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Desnormalizados a partir das linhas (soma de quantidade * preco_unitario e das
+    # quantidades), mantidos por toda escrita que cria, troca ou remove linhas: as
+    # listagens mostram o total sem ler as linhas nem os produtos
+    total = Column(Float, nullable=False, default=0, server_default="0")
+    itens = Column(Integer, nullable=False, default=0, server_default="0")
 
     cliente = relationship("ClienteOrm", back_populates="pedidos")
-    produtos = relationship("PedidoProdutoOrm", back_populates="pedido", cascade="all, delete-orphan")
+    # As linhas são removidas pelo ON DELETE CASCADE do banco, sem carregá-las antes
+    produtos = relationship("PedidoProdutoOrm", back_populates="pedido", cascade="all, delete-orphan", passive_deletes=True)
+
+    # O SQLite grava DateTime sem o fuso: converter para UTC evita perder o deslocamento
+    # (e o dia do pedido nos relatórios)
+    @validates("d_pedido")
+    def _d_pedido_utc(self, key, value):
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.astimezone(timezone.utc)
+        return value
 
 
 class PedidoProdutoOrm(Base):
     __tablename__ = "pedido_produtos"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    pedido_id = Column(Integer, ForeignKey("pedidos.id"), nullable=False)
-    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    pedido_id = Column(Integer, ForeignKey("pedidos.id", ondelete="CASCADE"), index=True, nullable=False)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), index=True, nullable=False)
     quantidade = Column(Integer, nullable=False, default=1)
+    # Preço do produto no momento do pedido: mudanças posteriores de preço não
+    # alteram o total do pedido nem a receita dos relatórios
+    preco_unitario = Column(Float, nullable=False, default=0, server_default="0")
 
     pedido = relationship("PedidoOrm", back_populates="produtos")
     produto = relationship("ProdutoOrm", back_populates="pedidos")
+
+
+# Agregados dos relatórios (/api/v1/relatorios), mantidos incrementalmente pelas
+# escritas de pedidos (app/crud/relatorios.py) e reconstruídos por
+# scripts/rebuild_relatorios.py. Pedidos cancelados não entram nas vendas.
+class RelatorioVendasDiaOrm(Base):
+    __tablename__ = "relatorio_vendas_dia"
+
+    dia = Column(Date, primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    itens = Column(Integer, nullable=False, default=0)
+    receita = Column(Float, nullable=False, default=0)
+
+
+class RelatorioVendasProdutoOrm(Base):
+    __tablename__ = "relatorio_vendas_produto"
+
+    produto_id = Column(Integer, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0, index=True)
+    receita = Column(Float, nullable=False, default=0, index=True)
+
+
+class RelatorioPedidosStatusOrm(Base):
+    __tablename__ = "relatorio_pedidos_status"
+
+    status = Column(String(20), primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+
+
+# Respostas das escritas com Idempotency-Key (app/idempotency.py). Enquanto a
+# requisição original está em andamento status_code é NULL e expira_em é o prazo da
+# reserva; depois, a resposta fica gravada até expira_em.
+class ChaveIdempotenciaOrm(Base):
+    __tablename__ = "chaves_idempotencia"
+
+    chave = Column(String(255), primary_key=True)
+    rota = Column(String(200), primary_key=True)
+    fingerprint = Column(String(32), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    corpo = Column(LargeBinary, nullable=True)
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# Fila de jobs das operações pesadas (app/crud/job_crud.py), executados pelos
+# processos de app/worker.py. status guarda o valor de StatusJobEnum.
+JOB_ATIVO = "status IN ('pendente', 'executando')"
+
+
+class JobOrm(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # O worker pega o job pendente de menor id
+        Index("ix_jobs_status_id", "status", "id"),
+        Index("ix_jobs_chave", "chave"),
+        # No máximo um job ativo por chave (ex.: uma remoção por cliente)
+        Index("uq_jobs_chave_ativo", "chave", unique=True, postgresql_where=text(JOB_ATIVO), sqlite_where=text(JOB_ATIVO)),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tipo = Column(String(50), nullable=False)
+    chave = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False, default=StatusJobEnum.PENDENTE.value)
+    parametros = Column(JSON, nullable=False, default=dict)
+    progresso = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    detail = Column(Text, nullable=True)
+    tentativas = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100), nullable=True)
+    criado_em = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    iniciado_em = Column(DateTime(timezone=True), nullable=True)
+    # Também é o heartbeat: um job executando sem atualização há JOBS_TIMEOUT volta para a fila
+    atualizado_em = Column(DateTime(timezone=True), nullable=True)
+    concluido_em = Column(DateTime(timezone=True), nullable=True)
+
+
+# Os índices de trigramas dependem da extensão pg_trgm
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,83 @@
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metrics import Counter, Gauge, Histogram
+
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Tempo para obter uma conexão do pool",
+    ["pool"],
+)
+POOL_CHECKOUT_WAITS = Counter(
+    "db_pool_checkout_waits_total",
+    "Checkouts que encontraram o pool esgotado e precisaram esperar uma conexão",
+    ["pool"],
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts que excederam pool_timeout",
+    ["pool"],
+)
+POOL_CONNECTIONS_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Conexões emprestadas pelo pool no momento",
+    ["pool"],
+)
+POOL_CONNECTIONS_IDLE = Gauge(
+    "db_pool_connections_idle",
+    "Conexões ociosas disponíveis no pool",
+    ["pool"],
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Conexões abertas além de pool_size (negativo enquanto o pool não está cheio)",
+    ["pool"],
+)
+
+
+class _InstrumentedPoolMixin:
+    """Mede a latência de checkout e conta as esperas e timeouts do pool."""
+
+    metrics_label = "primary"
+
+    def _do_get(self):
+        label = self.metrics_label
+        # Sem conexão ociosa e sem overflow disponível: o checkout vai esperar
+        if self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow:
+            POOL_CHECKOUT_WAITS.inc(pool=label)
+
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(pool=label)
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, pool=label)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.metrics_label = self.metrics_label
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Publica os gauges do pool da engine (lidos no momento da coleta)
+def register_pool_metrics(engine, label: str = "primary"):
+    pool = engine.pool
+    if not isinstance(pool, _InstrumentedPoolMixin):
+        return
+    pool.metrics_label = label
+    POOL_CONNECTIONS_IN_USE.set_function(lambda: engine.pool.checkedout(), pool=label)
+    POOL_CONNECTIONS_IDLE.set_function(lambda: engine.pool.checkedin(), pool=label)
+    POOL_OVERFLOW.set_function(lambda: engine.pool.overflow(), pool=label)
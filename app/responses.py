@@ -0,0 +1,62 @@
+import functools
+import inspect
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+# Serialização das respostas.
+#
+# As funções CRUD já devolvem o *ResponseModel construído (e validado). Nas rotas com
+# ModelRoute esse modelo vira JSON direto pelo serializador do Pydantic (em Rust),
+# sem a segunda validação do response_model= nem a passagem por jsonable_encoder.
+# O que ainda passa pelo caminho padrão do FastAPI (rotas que retornam dicts) é
+# serializado com orjson, a classe de resposta padrão da aplicação.
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ModelResponse(Response):
+    """Resposta JSON de um modelo Pydantic já validado, serializado sem revalidação."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return to_json(content)
+        return super().render(content)
+
+
+class ModelRoute(APIRoute):
+    """
+    Rota cujo endpoint assíncrono retorna um BaseModel pronto: o retorno é entregue
+    como ModelResponse com o status_code da rota. O response_model continua
+    documentando a resposta no OpenAPI.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router recria as rotas com o endpoint já embrulhado
+        if inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "serializes_models", False):
+            endpoint = _serialize_models(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _serialize_models(endpoint, status_code: int):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, BaseModel):
+            return ModelResponse(result, status_code=status_code)
+        return result
+
+    wrapper.serializes_models = True
+    return wrapper
@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session  
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, Header, Request, status, Query
   
+import app.schemas.bulk_schema as bulk_schemas
 import app.schemas.cliente_schema as schemas
+from app.crud.bulk import BULK_REQUEST_BODY, run_bulk
 from app.crud.cliente_crud import (  
+    cliente_cache,
     create_cliente_crud,  
+    create_clientes_bulk_crud,
     delete_cliente_crud,  
+    get_cliente_remocao_crud,
+    get_clientes_by_ids_crud,
     get_clientes_crud,  
     get_cliente_crud,  
     update_cliente_crud,  
 )
-from app.database import get_db  
+from app.crud.projection import parse_projection, projection_etag
+from app.database import DatabaseSession, get_primary_session, get_session
+from app.etag import etag_response
+from app.idempotency import idempotent
+from app.responses import ModelRoute  
   
-router = APIRouter()  
+router = APIRouter(route_class=ModelRoute)  
   
   
 @router.post(  
@@ -19,13 +30,38 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,  
     response_model=schemas.ClienteResponseModel,  
 )  
-def create_cliente(  
-    cliente: schemas.ClienteCreateModel, db: Session = Depends(get_db)  
+async def create_cliente(  
+    cliente: schemas.ClienteCreateModel, db: DatabaseSession = Depends(get_session)  
 ) -> schemas.ClienteResponseModel:  
     """  
     Criar um novo cliente.  
     """  
-    return create_cliente_crud(payload=cliente, db=db)  
+    return await db.run(create_cliente_crud, payload=cliente)  
+
+
+@router.post(
+    "/cliente/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=bulk_schemas.BulkResponseModel,
+    openapi_extra=BULK_REQUEST_BODY,
+)
+async def create_clientes_bulk(
+    request: Request,
+    db: DatabaseSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255, description="Chave única da operação; uma retentativa com a mesma chave recebe a resposta original em vez de executar de novo"),
+) -> bulk_schemas.BulkResponseModel:
+    """
+    Criar clientes em lote, a partir de um array JSON ou de um stream NDJSON.
+    Cada item é reportado como criado, conflito ou erro, sem abortar o lote. Com
+    Idempotency-Key, uma retentativa do mesmo lote recebe o resultado original.
+    """
+    return await idempotent(
+        request,
+        db,
+        idempotency_key,
+        lambda db: run_bulk(db, request, schemas.ClienteCreateModel, create_clientes_bulk_crud),
+        status.HTTP_200_OK,
+    )
   
   
 @router.get(  
@@ -33,13 +69,18 @@ def create_cliente(
     status_code=status.HTTP_200_OK,  
     response_model=schemas.ClienteResponseModel,  
 )  
-def get_cliente(  
-    cliente_id: str, db: Session = Depends(get_db)  
+async def get_cliente(  
+    cliente_id: str,  
+    db: DatabaseSession = Depends(get_primary_session),  
+    if_none_match: Optional[str] = Header(None, description="ETag da versão que o cliente já tem; se ainda for a atual, a resposta é 304 sem corpo"),  
 ) -> schemas.ClienteResponseModel:  
     """  
-    Buscar cliente pelo ID.  
+    Buscar cliente pelo ID (com ETag; If-None-Match responde 304 se nada mudou).  
     """  
-    return get_cliente_crud(cliente_id=cliente_id, db=db)  
+    result = await cliente_cache.get_or_load(  
+        cliente_id, lambda: db.run(get_cliente_crud, cliente_id=cliente_id)  
+    )  
+    return etag_response(result, if_none_match)  
   
   
 @router.patch(  
@@ -47,15 +88,18 @@ def get_cliente(
     status_code=status.HTTP_202_ACCEPTED,  
     response_model=schemas.ClienteResponseModel,  
 )  
-def update_cliente(  
+async def update_cliente(  
     cliente_id: str,  
     cliente: schemas.ClienteUpdateModel,  
-    db: Session = Depends(get_db),  
+    db: DatabaseSession = Depends(get_session),  
+    if_match: Optional[str] = Header(None, description="ETag da versão que o cliente alterou; se o registro mudou desde então, a resposta é 412"),  
 ) -> schemas.ClienteResponseModel:  
     """  
-    Atualizar cliente pelo ID.  
+    Atualizar cliente pelo ID. Com If-Match, só atualiza se o cliente não mudou desde
+    a versão informada (controle de concorrência otimista).
     """  
-    return update_cliente_crud(cliente_id=cliente_id, payload=cliente, db=db)  
+    result = await db.run(update_cliente_crud, cliente_id=cliente_id, payload=cliente, if_match=if_match)  
+    return etag_response(result, status_code=status.HTTP_202_ACCEPTED)  
   
   
 @router.delete(  
@@ -63,28 +107,74 @@ def update_cliente(
     status_code=status.HTTP_202_ACCEPTED,  
     response_model=schemas.ClienteDeleteModel,  
 )  
-def delete_cliente(  
-    cliente_id: str, db: Session = Depends(get_db)  
+async def delete_cliente(  
+    cliente_id: str,
+    db: DatabaseSession = Depends(get_session),
 ) -> schemas.ClienteDeleteModel:  
     """  
-    Deletar cliente pelo ID.  
+    Deletar cliente pelo ID, junto com seus pedidos.
+    Clientes com muitos pedidos são removidos em segundo plano por um job (executado
+    por app.worker); o progresso fica em GET /cliente/{cliente_id}/remocao.
     """  
-    return delete_cliente_crud(cliente_id=cliente_id, db=db)  
+    return await db.run(delete_cliente_crud, cliente_id=cliente_id)
+
+
+@router.get(
+    "/cliente/{cliente_id}/remocao",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ClienteRemocaoResponseModel,
+)
+async def get_cliente_remocao(
+    cliente_id: str, db: DatabaseSession = Depends(get_session)
+) -> schemas.ClienteRemocaoResponseModel:
+    """
+    Acompanhar a remoção em segundo plano de um cliente (pedidos removidos / total).
+    """
+    return await db.run(get_cliente_remocao_crud, cliente_id=cliente_id)
   
 
+@router.post(
+    "/cliente/batch-get",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ClienteBatchResponseModel,
+)
+async def batch_get_clientes(
+    payload: schemas.ClienteBatchGetModel, db: DatabaseSession = Depends(get_session)
+) -> schemas.ClienteBatchResponseModel:
+    """
+    Buscar vários clientes pelo ID (até 1000) em uma única consulta, na ordem
+    pedida; os IDs inexistentes vêm em missing.
+    """
+    return await db.run(get_clientes_by_ids_crud, ids=payload.ids)
+
+
 # Paginação
 
 @router.get(
     "/cliente",
     status_code=status.HTTP_200_OK,
-    response_model=schemas.ClienteListResponseModel,
+    response_model=Union[schemas.ClienteListResponseModel, schemas.ClienteBatchResponseModel],
 )
-def get_clientes(
-    db: Session = Depends(get_db),
+async def get_clientes(
+    db: DatabaseSession = Depends(get_session),
     skip: int = Query(0, ge=0, description="Número de itens para pular"),
     limit: int = Query(10, gt=0, le=100, description="Número máximo de itens a serem retornados"),
-) -> schemas.ClienteListResponseModel:
+    cursor: Optional[str] = Query(None, description="Cursor opaco da próxima página (next_cursor da resposta anterior); quando informado, skip é ignorado"),
+    order_by: str = Query("id", pattern=r"^-?(id|nome)$", description="Coluna de ordenação (id, nome); prefixo '-' para ordem decrescente"),
+    page: int = Query(1, ge=1, description="Página (usada quando skip não é informado)"),
+    search: str = Query("", max_length=100, description="Busca por nome, e-mail ou CPF, ordenada por relevância"),
+    ids: Optional[str] = Query(None, pattern=r"^\d+(,\d+){0,99}$", description="IDs separados por vírgula (até 100); quando informado, devolve esses clientes na ordem pedida e ignora a paginação e a busca"),
+    fields: Optional[str] = Query(None, pattern=r"^\w+(,\w+)*$", description="Só estes campos de cada cliente, separados por vírgula (ex.: id,nome,email); id e version vêm sempre"),
+    if_none_match: Optional[str] = Header(None, description="ETag da versão que o cliente já tem; se ainda for a atual, a resposta é 304 sem corpo"),
+) -> Union[schemas.ClienteListResponseModel, schemas.ClienteBatchResponseModel]:
     """
-    Listar todos os clientes (com paginação).
+    Listar todos os clientes (com paginação por offset ou por cursor), ou buscar
+    vários pelo ID com ids=1,2,3. Com fields, só esses campos são lidos do banco e
+    devolvidos.
     """
-    return get_clientes_crud(db=db, skip=skip, limit=limit)
\ No newline at end of file
+    projecao = parse_projection(fields, None, schemas.ClienteModel)
+    if ids is not None:
+        result = await db.run(get_clientes_by_ids_crud, ids=[int(id_) for id_ in ids.split(",")], projecao=projecao)
+        return etag_response(result, if_none_match, variant=projection_etag(projecao))
+    result = await db.run(get_clientes_crud, skip=skip, limit=limit, cursor=cursor, order_by=order_by, page=page, search=search, projecao=projecao)
+    return etag_response(result, if_none_match, variant=projection_etag(projecao))
@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, status, Query
+
+import app.schemas.job_schema as schemas
+from app.crud.job_crud import get_job_crud, get_jobs_crud
+from app.database import DatabaseSession, get_session
+from app.responses import ModelRoute
+
+router = APIRouter(route_class=ModelRoute)
+
+
+@router.get(
+    "/job/{job_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.JobResponseModel,
+)
+async def get_job(
+    job_id: int, db: DatabaseSession = Depends(get_session)
+) -> schemas.JobResponseModel:
+    """
+    Acompanhar um job: status, progresso / total e, ao terminar, o resultado ou o erro.
+    """
+    return await db.run(get_job_crud, job_id=job_id)
+
+
+@router.get(
+    "/job",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.JobListResponseModel,
+)
+async def get_jobs(
+    db: DatabaseSession = Depends(get_session),
+    limit: int = Query(10, gt=0, le=100, description="Número máximo de itens a serem retornados"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco da próxima página (next_cursor da resposta anterior)"),
+    status_job: Optional[List[schemas.JobStatus]] = Query(None, alias="status", description="Filtra pelo status do job (pode ser repetido)"),
+    tipo: Optional[str] = Query(None, max_length=50, description="Filtra pelo tipo do job"),
+) -> schemas.JobListResponseModel:
+    """
+    Listar os jobs, dos mais recentes para os mais antigos.
+    """
+    return await db.run(get_jobs_crud, limit=limit, cursor=cursor, status_job=status_job, tipo=tipo)
@@ -1,17 +1,29 @@
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session  
+from datetime import date, datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, Request, status, Query
+from fastapi.responses import StreamingResponse
   
+import app.schemas.bulk_schema as bulk_schemas
 import app.schemas.pedido_schema as schemas
+from app.crud.bulk import BULK_REQUEST_BODY, run_bulk
 from app.crud.pedido_crud import (  
     create_pedido_crud,  
+    create_pedidos_bulk_crud,
     delete_pedido_crud,  
+    export_pedidos_crud,
     get_pedidos_crud,  
     get_pedido_crud,  
     update_pedido_crud,  
+    PEDIDO_RELATIONS,
 )
-from app.database import get_db  
+from app.crud.projection import parse_projection, projection_etag
+from app.database import DatabaseSession, get_session
+from app.etag import etag_response
+from app.idempotency import idempotent
+from app.responses import ModelRoute  
   
-router = APIRouter()  
+router = APIRouter(route_class=ModelRoute)  
   
   
 @router.post(  
@@ -19,13 +31,48 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,  
     response_model=schemas.PedidoResponseModel,  
 )  
-def create_pedido(  
-    pedido: schemas.PedidoCreateModel, db: Session = Depends(get_db)  
+async def create_pedido(  
+    pedido: schemas.PedidoCreateModel,
+    request: Request,
+    db: DatabaseSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255, description="Chave única da operação; uma retentativa com a mesma chave recebe a resposta original em vez de executar de novo"),
 ) -> schemas.PedidoResponseModel:  
     """  
-    Criar um novo pedido.  
+    Criar um novo pedido. Com Idempotency-Key, uma retentativa (ex.: após um timeout)
+    recebe a resposta do pedido já criado em vez de criar outro.
     """  
-    return create_pedido_crud(payload=pedido, db=db)  
+    return await idempotent(
+        request,
+        db,
+        idempotency_key,
+        lambda db: db.run(create_pedido_crud, payload=pedido),
+        status.HTTP_201_CREATED,
+    )  
+
+
+@router.post(
+    "/pedido/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=bulk_schemas.BulkResponseModel,
+    openapi_extra=BULK_REQUEST_BODY,
+)
+async def create_pedidos_bulk(
+    request: Request,
+    db: DatabaseSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255, description="Chave única da operação; uma retentativa com a mesma chave recebe a resposta original em vez de executar de novo"),
+) -> bulk_schemas.BulkResponseModel:
+    """
+    Criar pedidos em lote, a partir de um array JSON ou de um stream NDJSON.
+    Cada item é reportado como criado, conflito ou erro, sem abortar o lote. Com
+    Idempotency-Key, uma retentativa do mesmo lote recebe o resultado original.
+    """
+    return await idempotent(
+        request,
+        db,
+        idempotency_key,
+        lambda db: run_bulk(db, request, schemas.PedidoCreateModel, create_pedidos_bulk_crud),
+        status.HTTP_200_OK,
+    )
   
   
 @router.get(  
@@ -33,13 +80,16 @@ def create_pedido(
     status_code=status.HTTP_200_OK,  
     response_model=schemas.PedidoResponseModel,  
 )  
-def get_pedido(  
-    pedido_id: str, db: Session = Depends(get_db)  
+async def get_pedido(  
+    pedido_id: str,  
+    db: DatabaseSession = Depends(get_session),  
+    if_none_match: Optional[str] = Header(None, description="ETag da versão que o cliente já tem; se ainda for a atual, a resposta é 304 sem corpo"),  
 ) -> schemas.PedidoResponseModel:  
     """  
-    Buscar pedido pelo ID.  
+    Buscar pedido pelo ID (com ETag; If-None-Match responde 304 se nada mudou).  
     """  
-    return get_pedido_crud(pedido_id=pedido_id, db=db)  
+    result = await db.run(get_pedido_crud, pedido_id=pedido_id)  
+    return etag_response(result, if_none_match)  
   
   
 @router.patch(  
@@ -47,15 +97,18 @@ def get_pedido(
     status_code=status.HTTP_202_ACCEPTED,  
     response_model=schemas.PedidoResponseModel,  
 )  
-def update_pedido(  
+async def update_pedido(  
     pedido_id: str,  
     pedido: schemas.PedidoUpdateModel,  
-    db: Session = Depends(get_db),  
+    db: DatabaseSession = Depends(get_session),  
+    if_match: Optional[str] = Header(None, description="ETag da versão que o cliente alterou; se o registro mudou desde então, a resposta é 412"),  
 ) -> schemas.PedidoResponseModel:  
     """  
-    Atualizar pedido pelo ID.  
+    Atualizar pedido pelo ID. Com If-Match, só atualiza se o pedido não mudou desde
+    a versão informada (controle de concorrência otimista).
     """  
-    return update_pedido_crud(pedido_id=pedido_id, payload=pedido, db=db)  
+    result = await db.run(update_pedido_crud, pedido_id=pedido_id, payload=pedido, if_match=if_match)  
+    return etag_response(result, status_code=status.HTTP_202_ACCEPTED)  
   
   
 @router.delete(  
@@ -63,13 +116,13 @@ def update_pedido(
     status_code=status.HTTP_202_ACCEPTED,  
     response_model=schemas.PedidoDeleteModel,  
 )  
-def delete_pedido(  
-    pedido_id: str, db: Session = Depends(get_db)  
+async def delete_pedido(  
+    pedido_id: str, db: DatabaseSession = Depends(get_session)  
 ) -> schemas.PedidoDeleteModel:  
     """  
     Deletar pedido pelo ID.  
     """  
-    return delete_pedido_crud(pedido_id=pedido_id, db=db)  
+    return await db.run(delete_pedido_crud, pedido_id=pedido_id)  
   
 
 # Paginação
@@ -79,12 +132,56 @@ def delete_pedido(
     status_code=status.HTTP_200_OK,
     response_model=schemas.PedidoListResponseModel,
 )
-def get_pedidos(
-    db: Session = Depends(get_db),
+async def get_pedidos(
+    db: DatabaseSession = Depends(get_session),
     skip: int = Query(0, ge=0, description="Número de itens para pular"),
     limit: int = Query(10, gt=0, le=100, description="Número máximo de itens a serem retornados"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco da próxima página (next_cursor da resposta anterior); quando informado, skip é ignorado"),
+    order_by: str = Query("id", pattern=r"^-?(id|d_pedido)$", description="Coluna de ordenação (id, d_pedido); prefixo '-' para ordem decrescente"),
+    cliente_id: Optional[int] = Query(None, description="Só os pedidos deste cliente"),
+    status_pedido: Optional[List[schemas.StatusPedidoEnum]] = Query(None, alias="status", description="Só os pedidos com um destes status (repita o parâmetro: status=pendente&status=processando)"),
+    d_pedido_de: Optional[datetime] = Query(None, description="Pedidos feitos a partir desta data/hora (inclusive; sem fuso = UTC)"),
+    d_pedido_ate: Optional[datetime] = Query(None, description="Pedidos feitos antes desta data/hora (exclusive; sem fuso = UTC)"),
+    periodo_inicio: Optional[date] = Query(None, description="Pedidos cujo período termina nesta data ou depois (sobreposição com periodo_inicio..periodo_fim)"),
+    periodo_fim: Optional[date] = Query(None, description="Pedidos cujo período começa nesta data ou antes (sobreposição com periodo_inicio..periodo_fim)"),
+    fields: Optional[str] = Query(None, pattern=r"^\w+(,\w+)*$", description="Só estes campos de cada pedido, separados por vírgula (ex.: id,status,total); id e version vêm sempre"),
+    include: Optional[str] = Query(None, pattern=r"^(\w+(,\w+)*)?$", description="Relacionamentos incluídos em cada pedido (produtos); com fields ou include, só os listados aqui vêm"),
+    if_none_match: Optional[str] = Header(None, description="ETag da versão que o cliente já tem; se ainda for a atual, a resposta é 304 sem corpo"),
 ) -> schemas.PedidoListResponseModel:
     """
-    Listar todos os pedidos (com paginação).
+    Listar os pedidos (com paginação por offset ou por cursor), filtrando por cliente,
+    status, intervalo de d_pedido e sobreposição de período. Com fields/include, só os
+    campos e relacionamentos pedidos são lidos do banco e devolvidos.
+    """
+    projecao = parse_projection(fields, include, schemas.PedidoModel, tuple(PEDIDO_RELATIONS))
+    result = await db.run(
+        get_pedidos_crud,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        cliente_id=cliente_id,
+        status_pedido=status_pedido,
+        d_pedido_de=d_pedido_de,
+        d_pedido_ate=d_pedido_ate,
+        periodo_inicio=periodo_inicio,
+        periodo_fim=periodo_fim,
+        projecao=projecao,
+    )
+    return etag_response(result, if_none_match, variant=projection_etag(projecao))
+
+
+# Exportação
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def export_pedidos(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="Formato do arquivo: ndjson ou csv"),
+) -> StreamingResponse:
+    """
+    Exportar o histórico completo de pedidos, com seus produtos em stream (NDJSON ou CSV).
     """
-    return get_pedidos_crud(db=db, skip=skip, limit=limit)
\ No newline at end of file
+    return export_pedidos_crud(export_format=export_format)
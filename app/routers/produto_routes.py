@@ -1,17 +1,38 @@
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session  
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, Header, Path, Request, status, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
   
+import app.schemas.bulk_schema as bulk_schemas
+import app.schemas.job_schema as job_schemas
 import app.schemas.produto_schema as schemas
+from app.crud.bulk import BULK_REQUEST_BODY, collect_bulk_payloads, run_bulk
+from app.crud.job_crud import job_aceito
 from app.crud.produto_crud import (  
+    produto_cache,
     create_produto_crud,  
+    create_produto_imagem_crud,
+    create_produtos_bulk_crud,
+    create_produtos_importacao_crud,
     delete_produto_crud,  
+    export_produtos_crud,
+    get_imagem_por_hash_crud,
+    get_produtos_by_ids_crud,
     get_produtos_crud,  
     get_produto_crud,  
     update_produto_crud,  
+    PRODUTO_RELATIONS,
 )
-from app.database import get_db  
+from app.crud.projection import parse_projection, projection_etag
+from app.database import DatabaseSession, get_primary_session, get_session
+from app.etag import etag_response
+from app.idempotency import idempotent
+from app.imagens import IMAGE_REQUEST_BODY, content_hash, ler_upload, processar_imagem_no_pool
+from app.responses import ModelResponse, ModelRoute  
+from app.storage import NOME_ARQUIVO, get_storage
   
-router = APIRouter()  
+router = APIRouter(route_class=ModelRoute)  
   
   
 @router.post(  
@@ -19,13 +40,62 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,  
     response_model=schemas.ProdutoResponseModel,  
 )  
-def create_produto(  
-    produto: schemas.ProdutoCreateModel, db: Session = Depends(get_db)  
+async def create_produto(  
+    produto: schemas.ProdutoCreateModel, db: DatabaseSession = Depends(get_session)  
 ) -> schemas.ProdutoResponseModel:  
     """  
     Criar um novo produto.  
     """  
-    return create_produto_crud(payload=produto, db=db)  
+    return await db.run(create_produto_crud, payload=produto)  
+
+
+@router.post(
+    "/produto/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=bulk_schemas.BulkResponseModel,
+    openapi_extra=BULK_REQUEST_BODY,
+)
+async def create_produtos_bulk(
+    request: Request,
+    db: DatabaseSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255, description="Chave única da operação; uma retentativa com a mesma chave recebe a resposta original em vez de executar de novo"),
+) -> bulk_schemas.BulkResponseModel:
+    """
+    Criar produtos em lote, a partir de um array JSON ou de um stream NDJSON.
+    Cada item é reportado como criado, conflito ou erro, sem abortar o lote. Com
+    Idempotency-Key, uma retentativa do mesmo lote recebe o resultado original.
+    """
+    return await idempotent(
+        request,
+        db,
+        idempotency_key,
+        lambda db: run_bulk(db, request, schemas.ProdutoCreateModel, create_produtos_bulk_crud),
+        status.HTTP_200_OK,
+    )
+
+
+@router.post(
+    "/produto/importacao",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=job_schemas.JobResponseModel,
+    openapi_extra=BULK_REQUEST_BODY,
+)
+async def importar_produtos(
+    request: Request,
+    db: DatabaseSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255, description="Chave única da operação; uma retentativa com a mesma chave recebe a resposta original em vez de executar de novo"),
+) -> job_schemas.JobResponseModel:
+    """
+    Importar um catálogo grande (array JSON ou stream NDJSON) em segundo plano.
+    Responde 202 com o job; o progresso e o resultado (criados, conflitos, erros)
+    ficam em GET /api/v1/jobs/job/{id}.
+    """
+    async def enfileirar(db):
+        parametros = await collect_bulk_payloads(request, schemas.ProdutoCreateModel)
+        return job_aceito(await db.run(create_produtos_importacao_crud, parametros=parametros))
+
+    # O corpo inteiro vai para os parâmetros do job de qualquer forma: sem limite para a chave
+    return await idempotent(request, db, idempotency_key, enfileirar, status.HTTP_202_ACCEPTED, limite_corpo=None)
   
   
 @router.get(  
@@ -33,13 +103,18 @@ def create_produto(
     status_code=status.HTTP_200_OK,  
     response_model=schemas.ProdutoResponseModel,  
 )  
-def get_produto(  
-    produto_id: str, db: Session = Depends(get_db)  
+async def get_produto(  
+    produto_id: str,  
+    db: DatabaseSession = Depends(get_primary_session),  
+    if_none_match: Optional[str] = Header(None, description="ETag da versão que o cliente já tem; se ainda for a atual, a resposta é 304 sem corpo"),  
 ) -> schemas.ProdutoResponseModel:  
     """  
-    Buscar produto pelo ID.  
+    Buscar produto pelo ID (com ETag; If-None-Match responde 304 se nada mudou).  
     """  
-    return get_produto_crud(produto_id=produto_id, db=db)  
+    result = await produto_cache.get_or_load(  
+        produto_id, lambda: db.run(get_produto_crud, produto_id=produto_id)  
+    )  
+    return etag_response(result, if_none_match)  
   
   
 @router.patch(  
@@ -47,15 +122,18 @@ def get_produto(
     status_code=status.HTTP_202_ACCEPTED,  
     response_model=schemas.ProdutoResponseModel,  
 )  
-def update_produto(  
+async def update_produto(  
     produto_id: str,  
     produto: schemas.ProdutoUpdateModel,  
-    db: Session = Depends(get_db),  
+    db: DatabaseSession = Depends(get_session),  
+    if_match: Optional[str] = Header(None, description="ETag da versão que o cliente alterou; se o registro mudou desde então, a resposta é 412"),  
 ) -> schemas.ProdutoResponseModel:  
     """  
-    Atualizar produto pelo ID.  
+    Atualizar produto pelo ID. Com If-Match, só atualiza se o produto não mudou desde
+    a versão informada (controle de concorrência otimista).
     """  
-    return update_produto_crud(produto_id=produto_id, payload=produto, db=db)  
+    result = await db.run(update_produto_crud, produto_id=produto_id, payload=produto, if_match=if_match)  
+    return etag_response(result, status_code=status.HTTP_202_ACCEPTED)  
   
   
 @router.delete(  
@@ -63,28 +141,123 @@ def update_produto(
     status_code=status.HTTP_202_ACCEPTED,  
     response_model=schemas.ProdutoDeleteModel,  
 )  
-def delete_produto(  
-    produto_id: str, db: Session = Depends(get_db)  
+async def delete_produto(  
+    produto_id: str, db: DatabaseSession = Depends(get_session)  
 ) -> schemas.ProdutoDeleteModel:  
     """  
     Deletar produto pelo ID.  
     """  
-    return delete_produto_crud(produto_id=produto_id, db=db)  
+    return await db.run(delete_produto_crud, produto_id=produto_id)  
   
 
+@router.post(
+    "/produto/batch-get",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ProdutoBatchResponseModel,
+)
+async def batch_get_produtos(
+    payload: schemas.ProdutoBatchGetModel, db: DatabaseSession = Depends(get_session)
+) -> schemas.ProdutoBatchResponseModel:
+    """
+    Buscar vários produtos pelo ID (até 1000) em uma única consulta, na ordem
+    pedida; os IDs inexistentes vêm em missing.
+    """
+    return await db.run(get_produtos_by_ids_crud, ids=payload.ids)
+
+
+# Imagens
+
+@router.post(
+    "/produto/{produto_id}/imagem",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.ProdutoImagemResponseModel,
+    openapi_extra=IMAGE_REQUEST_BODY,
+)
+async def upload_produto_imagem(
+    produto_id: str, request: Request, db: DatabaseSession = Depends(get_session)
+) -> schemas.ProdutoImagemResponseModel:
+    """
+    Enviar uma imagem do produto (os bytes no corpo, Content-Type image/*). O arquivo é
+    guardado pelo hash do conteúdo, com miniaturas em WebP/AVIF; um arquivo já enviado
+    antes (para qualquer produto) não é processado de novo.
+    """
+    dados = await ler_upload(request)
+    hash_ = await run_in_threadpool(content_hash, dados)
+    metadados, no_produto = await db.run(get_imagem_por_hash_crud, produto_id=produto_id, hash_=hash_)
+    if no_produto:
+        result = schemas.ProdutoImagemResponseModel(
+            status=schemas.Status.Success,
+            message="A imagem já está no produto.",
+            data=schemas.ProdutoImagemModel.model_validate(metadados),
+        )
+        return ModelResponse(result, status_code=status.HTTP_200_OK)
+    if metadados is None:
+        metadados = await processar_imagem_no_pool(dados, hash_)
+    return await db.run(create_produto_imagem_crud, produto_id=produto_id, metadados=metadados)
+
+
+@router.get(
+    "/imagens/{nome}",
+    status_code=status.HTTP_200_OK,
+    response_class=Response,
+)
+async def get_imagem(
+    nome: str = Path(..., pattern=NOME_ARQUIVO.pattern, description="<sha256>.<ext> (original) ou <sha256>_<largura>.<formato> (miniatura)"),
+    if_none_match: Optional[str] = Header(None),
+    range_: Optional[str] = Header(None, alias="Range", description="Trecho do arquivo (ex.: bytes=0-1023); a resposta é 206"),
+    if_range: Optional[str] = Header(None),
+) -> Response:
+    """
+    Baixar uma imagem ou miniatura. O conteúdo de um nome nunca muda, então a resposta
+    pode ficar em cache por um ano (Cache-Control immutable); aceita Range.
+    """
+    return await get_storage().response(nome, if_none_match, range_header=range_, if_range=if_range)
+
+
 # Paginação
 
 @router.get(
     "/produto",
     status_code=status.HTTP_200_OK,
-    response_model=schemas.ProdutoListResponseModel,
+    response_model=Union[schemas.ProdutoListResponseModel, schemas.ProdutoBatchResponseModel],
 )
-def get_produtos(
-    db: Session = Depends(get_db),
+async def get_produtos(
+    db: DatabaseSession = Depends(get_session),
     skip: int = Query(0, ge=0, description="Número de itens para pular"),
     limit: int = Query(10, gt=0, le=100, description="Número máximo de itens a serem retornados"),
-) -> schemas.ProdutoListResponseModel:
+    cursor: Optional[str] = Query(None, description="Cursor opaco da próxima página (next_cursor da resposta anterior); quando informado, skip é ignorado"),
+    order_by: str = Query("id", pattern=r"^-?(id|nome)$", description="Coluna de ordenação (id, nome); prefixo '-' para ordem decrescente"),
+    page: int = Query(1, ge=1, description="Página (usada quando skip não é informado)"),
+    search: str = Query("", max_length=100, description="Busca por nome, descrição ou código de barras, ordenada por relevância"),
+    ids: Optional[str] = Query(None, pattern=r"^\d+(,\d+){0,99}$", description="IDs separados por vírgula (até 100); quando informado, devolve esses produtos na ordem pedida e ignora a paginação e a busca"),
+    fields: Optional[str] = Query(None, pattern=r"^\w+(,\w+)*$", description="Só estes campos de cada produto, separados por vírgula (ex.: id,nome,preco); id e version vêm sempre"),
+    include: Optional[str] = Query(None, pattern=r"^(\w+(,\w+)*)?$", description="Relacionamentos incluídos em cada produto (imagens); com fields ou include, só os listados aqui vêm"),
+    if_none_match: Optional[str] = Header(None, description="ETag da versão que o cliente já tem; se ainda for a atual, a resposta é 304 sem corpo"),
+) -> Union[schemas.ProdutoListResponseModel, schemas.ProdutoBatchResponseModel]:
+    """
+    Listar todos os produtos (com paginação por offset ou por cursor), ou buscar
+    vários pelo ID com ids=1,2,3. Com fields/include, só os campos e relacionamentos
+    pedidos são lidos do banco e devolvidos.
+    """
+    projecao = parse_projection(fields, include, schemas.ProdutoModel, tuple(PRODUTO_RELATIONS))
+    if ids is not None:
+        result = await db.run(get_produtos_by_ids_crud, ids=[int(id_) for id_ in ids.split(",")], projecao=projecao)
+        return etag_response(result, if_none_match, variant=projection_etag(projecao))
+    result = await db.run(get_produtos_crud, skip=skip, limit=limit, cursor=cursor, order_by=order_by, page=page, search=search, projecao=projecao)
+    return etag_response(result, if_none_match, variant=projection_etag(projecao))
+
+
+# Exportação
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def export_produtos(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="Formato do arquivo: ndjson ou csv"),
+) -> StreamingResponse:
     """
-    Listar todos os produtos (com paginação).
+    Exportar o catálogo completo de produtos em stream (NDJSON ou CSV).
     """
-    return get_produtos_crud(db=db, skip=skip, limit=limit)
\ No newline at end of file
+    return export_produtos_crud(export_format=export_format)
@@ -0,0 +1,79 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status, Query
+
+import app.schemas.job_schema as job_schemas
+import app.schemas.relatorio_schema as schemas
+from app.crud.job_crud import job_aceito
+from app.crud.relatorio_crud import (
+    get_pedidos_por_status_crud,
+    get_produtos_mais_vendidos_crud,
+    get_vendas_por_dia_crud,
+    reconstruir_relatorios_crud,
+)
+from app.database import DatabaseSession, get_session
+from app.responses import ModelRoute
+
+router = APIRouter(route_class=ModelRoute)
+
+
+@router.get(
+    "/vendas-por-dia",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.VendasDiaResponseModel,
+)
+async def get_vendas_por_dia(
+    db: DatabaseSession = Depends(get_session),
+    inicio: Optional[date] = Query(None, description="Primeiro dia (inclusive)"),
+    fim: Optional[date] = Query(None, description="Último dia (inclusive)"),
+) -> schemas.VendasDiaResponseModel:
+    """
+    Receita, pedidos e itens vendidos por dia (pedidos cancelados não entram).
+    """
+    return await db.run(get_vendas_por_dia_crud, inicio=inicio, fim=fim)
+
+
+@router.get(
+    "/produtos-mais-vendidos",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.VendasProdutoResponseModel,
+)
+async def get_produtos_mais_vendidos(
+    db: DatabaseSession = Depends(get_session),
+    limit: int = Query(10, gt=0, le=100, description="Número de produtos no ranking"),
+    order_by: str = Query("quantidade", pattern=r"^(quantidade|receita)$", description="Critério do ranking (quantidade, receita)"),
+) -> schemas.VendasProdutoResponseModel:
+    """
+    Ranking dos produtos mais vendidos.
+    """
+    return await db.run(get_produtos_mais_vendidos_crud, limit=limit, order_by=order_by)
+
+
+@router.get(
+    "/pedidos-por-status",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.PedidosStatusResponseModel,
+)
+async def get_pedidos_por_status(
+    db: DatabaseSession = Depends(get_session),
+) -> schemas.PedidosStatusResponseModel:
+    """
+    Quantidade de pedidos em cada status.
+    """
+    return await db.run(get_pedidos_por_status_crud)
+
+
+@router.post(
+    "/reconstrucao",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=job_schemas.JobResponseModel,
+)
+async def reconstruir_relatorios(
+    db: DatabaseSession = Depends(get_session),
+) -> job_schemas.JobResponseModel:
+    """
+    Reconstruir os agregados a partir dos pedidos, em segundo plano. Responde 202
+    com o job (o mesmo, se já houver uma reconstrução na fila ou em andamento).
+    """
+    return job_aceito(await db.run(reconstruir_relatorios_crud))
@@ -0,0 +1,31 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class Status(Enum):
+    Success = "Successo"
+    Error = "Erro"
+
+
+class BulkItemStatus(str, Enum):
+    CRIADO = "criado"
+    CONFLITO = "conflito"
+    ERRO = "erro"
+
+
+class BulkItemResultModel(BaseModel):
+    index: int
+    status: BulkItemStatus
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    criados: int
+    conflitos: int
+    erros: int
+    data: List[BulkItemResultModel]
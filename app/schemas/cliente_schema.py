@@ -46,6 +46,13 @@ class ClienteUpdateModel(ClienteBaseModel):
 class ClienteModel(ClienteBaseModel):  
     id: int
     ativo: bool
+    version: int = Field(  
+        ...,  
+        json_schema_extra={  
+            "example": 1,  
+            "description": "Versão do registro; muda a cada alteração (ETag)",  
+        },  
+    )
     model_config = ConfigDict(from_attributes=True)  
   
   
@@ -59,9 +66,52 @@ class ClienteListResponseModel(BaseModel):
     status: Status = Status.Success  
     message: str  
     data: List[ClienteModel]  
+    next_cursor: Optional[str] = None  
+  
+  
+class ClienteBatchGetModel(BaseModel):  
+    ids: List[int] = Field(  
+        ...,  
+        min_length=1,  
+        max_length=1000,  
+        description="IDs dos clientes a buscar (até 1000)",  
+    )  
   
   
+class ClienteBatchResponseModel(BaseModel):  
+    status: Status = Status.Success  
+    message: str  
+    # Na ordem dos ids pedidos (sem repetições)  
+    data: List[ClienteModel]  
+    missing: List[int] = []  
+  
+  
+class ClienteRemocaoStatus(str, Enum):
+    pendente = "pendente"
+    executando = "executando"
+    concluida = "concluida"
+    erro = "erro"
+
+
+class ClienteRemocaoModel(BaseModel):
+    cliente_id: int
+    # Job da remoção (GET /api/v1/jobs/job/{job_id})
+    job_id: int
+    status: ClienteRemocaoStatus
+    total_pedidos: int
+    pedidos_removidos: int = 0
+    detail: Optional[str] = None
+
+
+class ClienteRemocaoResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    data: ClienteRemocaoModel
+
+
 class ClienteDeleteModel(BaseModel):  
     id: int  
     status: Status = Status.Success  
-    message: str  
\ No newline at end of file
+    message: str  
+    # Preenchido quando o cliente tem pedidos demais para a remoção síncrona
+    remocao: Optional[ClienteRemocaoModel] = None
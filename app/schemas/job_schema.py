@@ -0,0 +1,46 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class Status(Enum):
+    Success = "Successo"
+    Error = "Erro"
+
+
+class JobStatus(str, Enum):
+    pendente = "pendente"
+    executando = "executando"
+    concluido = "concluido"
+    erro = "erro"
+
+
+class JobModel(BaseModel):
+    id: int
+    tipo: str = Field(..., description="Operação executada (remocao_cliente, importacao_produtos, reconstrucao_relatorios)")
+    status: JobStatus
+    progresso: int = Field(0, description="Unidades de trabalho concluídas (pedidos removidos, produtos importados...)")
+    total: Optional[int] = Field(None, description="Total de unidades de trabalho, quando conhecido")
+    resultado: Optional[Any] = Field(None, description="Resultado da operação, quando concluída")
+    detail: Optional[str] = Field(None, description="Mensagem do erro, quando falhou")
+    tentativas: int = 0
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    data: JobModel
+
+
+class JobListResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    data: List[JobModel]
+    next_cursor: Optional[str] = None
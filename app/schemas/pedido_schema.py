@@ -35,6 +35,12 @@ class PedidoProdutoModel(PedidoProdutoBaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PedidoProdutoPrecoModel(PedidoProdutoBaseModel):
+    preco_unitario: float = Field(..., example=9.9, description="Preço unitário do produto no momento do pedido")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class PedidoBaseModel(BaseModel):
     cliente_id: int = Field(..., example=1, description="ID do cliente que fez o pedido")
     d_pedido: Optional[datetime] = Field(None, example="2025-05-26T14:30:00Z", description="Data e hora do pedido")
@@ -61,6 +67,10 @@ class PedidoUpdateModel(BaseModel):
 
 class PedidoModel(PedidoBaseModel):
     id: int
+    version: int = Field(..., example=1, description="Versão do registro; muda a cada alteração (ETag)")
+    produtos: List[PedidoProdutoPrecoModel] = []
+    total: float = Field(..., example=29.7, description="Soma de quantidade * preço unitário das linhas")
+    itens: int = Field(..., example=3, description="Soma das quantidades das linhas")
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -77,6 +87,7 @@ class PedidoListResponseModel(BaseModel):
     status: Status = Status.Success
     message: str
     data: List[PedidoModel]
+    next_cursor: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -8,10 +8,26 @@ class Status(Enum):
     Success = "Successo"  
     Error = "Erro"  
   
-class ProdutoImagemModel(BaseModel):
+class ProdutoImagemCreateModel(BaseModel):
     url: str
     model_config = ConfigDict(from_attributes=True)  
 
+
+class MiniaturaModel(BaseModel):
+    largura: int = Field(..., example=160, description="Largura da miniatura em pixels")
+    altura: int = Field(..., example=120, description="Altura da miniatura em pixels")
+    formato: str = Field(..., example="webp", description="Formato da miniatura (webp, avif)")
+    url: str
+
+
+class ProdutoImagemModel(ProdutoImagemCreateModel):
+    # Preenchidos só nas imagens enviadas por upload (POST /produto/{id}/imagem)
+    content_type: Optional[str] = None
+    largura: Optional[int] = None
+    altura: Optional[int] = None
+    tamanho: Optional[int] = Field(default=None, description="Tamanho do arquivo original em bytes")
+    miniaturas: Optional[List[MiniaturaModel]] = None
+
 class ProdutoBaseModel(BaseModel):  
     nome: Optional[str] = Field(  
         default=None,
@@ -52,7 +68,7 @@ class ProdutoBaseModel(BaseModel):
         example="2025-12-31",
         description="Data de validade do produto",
     )
-    imagens: Optional[List[ProdutoImagemModel]] = []
+    imagens: Optional[List[ProdutoImagemCreateModel]] = []
     model_config = ConfigDict(from_attributes=True)  
   
   
@@ -66,6 +82,8 @@ class ProdutoUpdateModel(ProdutoBaseModel):
   
 class ProdutoModel(ProdutoBaseModel):  
     id: int
+    imagens: Optional[List[ProdutoImagemModel]] = []
+    version: int = Field(..., example=1, description="Versão do registro; muda a cada alteração (ETag)")
     model_config = ConfigDict(from_attributes=True)  
   
   
@@ -79,6 +97,30 @@ class ProdutoListResponseModel(BaseModel):
     status: Status = Status.Success  
     message: str  
     data: List[ProdutoModel]  
+    next_cursor: Optional[str] = None  
+  
+  
+class ProdutoImagemResponseModel(BaseModel):  
+    status: Status = Status.Success  
+    message: str  
+    data: ProdutoImagemModel  
+  
+  
+class ProdutoBatchGetModel(BaseModel):  
+    ids: List[int] = Field(  
+        ...,  
+        min_length=1,  
+        max_length=1000,  
+        description="IDs dos produtos a buscar (até 1000)",  
+    )  
+  
+  
+class ProdutoBatchResponseModel(BaseModel):  
+    status: Status = Status.Success  
+    message: str  
+    # Na ordem dos ids pedidos (sem repetições)  
+    data: List[ProdutoModel]  
+    missing: List[int] = []  
   
   
 class ProdutoDeleteModel(BaseModel):  
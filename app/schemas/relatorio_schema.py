@@ -0,0 +1,53 @@
+from datetime import date
+from enum import Enum
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class Status(Enum):
+    Success = "Successo"
+    Error = "Erro"
+
+
+class VendasDiaModel(BaseModel):
+    dia: date = Field(..., description="Dia (UTC) dos pedidos")
+    pedidos: int = Field(..., description="Pedidos não cancelados do dia")
+    itens: int = Field(..., description="Unidades vendidas no dia")
+    receita: float = Field(..., description="Soma de quantidade * preço das linhas")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VendasProdutoModel(BaseModel):
+    produto_id: int
+    nome: str
+    quantidade: int
+    receita: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PedidosStatusModel(BaseModel):
+    status: str
+    pedidos: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VendasDiaResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    data: List[VendasDiaModel]
+
+
+class VendasProdutoResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    data: List[VendasProdutoModel]
+
+
+class PedidosStatusResponseModel(BaseModel):
+    status: Status = Status.Success
+    message: str
+    data: List[PedidosStatusModel]
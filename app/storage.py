@@ -0,0 +1,200 @@
+import os
+import re
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.etag import not_modified
+
+
+# Armazenamento dos arquivos de imagem (originais e miniaturas), endereçado pelo
+# conteúdo: o nome de cada arquivo é o sha256 da imagem original (mais a largura e o
+# formato, nas miniaturas), então o mesmo arquivo enviado duas vezes é gravado uma vez
+# só e um nome nunca muda de conteúdo. Por isso as respostas podem ser cacheadas pelo
+# navegador e por CDNs sem revalidação (Cache-Control immutable).
+#
+# STORAGE_BACKEND escolhe onde os arquivos ficam:
+# - local (padrão): em STORAGE_DIR, em subdiretórios pelos 2 primeiros caracteres do hash;
+# - s3: no bucket STORAGE_S3_BUCKET de qualquer serviço compatível com S3 em
+#   STORAGE_S3_ENDPOINT_URL (AWS, MinIO, um stand-in local...).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+STORAGE_DIR = os.getenv("STORAGE_DIR", "media")
+STORAGE_S3_BUCKET = os.getenv("STORAGE_S3_BUCKET", "imagens")
+STORAGE_S3_ENDPOINT_URL = os.getenv("STORAGE_S3_ENDPOINT_URL") or None
+
+# Um ano: o conteúdo de um nome nunca muda
+STORAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# <sha256>.<extensão> (original) ou <sha256>_<largura>.<formato> (miniatura)
+NOME_ARQUIVO = re.compile(r"^(?P<hash>[0-9a-f]{64})(_(?P<largura>\d{1,5}))?\.(?P<ext>jpeg|png|gif|webp|avif)$")
+
+MEDIA_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+
+def nome_arquivo(hash_: str, ext: str, largura: Optional[int] = None) -> str:
+    return f"{hash_}_{largura}.{ext}" if largura is not None else f"{hash_}.{ext}"
+
+
+def _chave(nome: str) -> str:
+    return f"{nome[:2]}/{nome}"
+
+
+def _cabecalhos(nome: str) -> dict:
+    # O ETag é o próprio nome: o conteúdo é fixo
+    return {"Cache-Control": STORAGE_CACHE_CONTROL, "ETag": f'"{nome}"'}
+
+
+def _nao_encontrado() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Imagem não encontrada.")
+
+
+class LocalStorage:
+    """Arquivos em um diretório local (ou um volume compartilhado entre as instâncias)."""
+
+    def __init__(self, directory: str = STORAGE_DIR):
+        self.directory = directory
+
+    def path(self, nome: str) -> str:
+        return os.path.join(self.directory, _chave(nome))
+
+    def exists(self, nome: str) -> bool:
+        return os.path.exists(self.path(nome))
+
+    def put(self, nome: str, dados: bytes, content_type: str) -> bool:
+        """Grava o arquivo, se ainda não existir. Retorna se gravou."""
+        path = self.path(nome)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Grava em um temporário e renomeia: quem lê nunca vê um arquivo pela metade
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return True
+
+    async def response(
+        self, nome: str, if_none_match: Optional[str] = None, range_header: Optional[str] = None, if_range: Optional[str] = None
+    ) -> Response:
+        """O arquivo com os cabeçalhos de cache; Range e If-Range são tratados pelo FileResponse."""
+        headers = _cabecalhos(nome)
+        if not_modified(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        path = self.path(nome)
+        try:
+            stat_result = await run_in_threadpool(os.stat, path)
+        except FileNotFoundError:
+            raise _nao_encontrado()
+        return FileResponse(path, media_type=MEDIA_TYPES[nome.rsplit(".", 1)[1]], headers=headers, stat_result=stat_result)
+
+
+class S3Storage:
+    """Objetos em um bucket S3 (ou compatível)."""
+
+    def __init__(self, client, bucket: str = STORAGE_S3_BUCKET):
+        self.client = client
+        self.bucket = bucket
+
+    def exists(self, nome: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=_chave(nome))
+        except Exception as e:
+            if _codigo_erro(e) in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put(self, nome: str, dados: bytes, content_type: str) -> bool:
+        if self.exists(nome):
+            return False
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=_chave(nome),
+            Body=dados,
+            ContentType=content_type,
+            CacheControl=STORAGE_CACHE_CONTROL,
+        )
+        return True
+
+    def _get(self, nome: str, range_header: Optional[str]):
+        kwargs = {"Bucket": self.bucket, "Key": _chave(nome)}
+        if range_header:
+            kwargs["Range"] = range_header
+        return self.client.get_object(**kwargs)
+
+    async def response(
+        self, nome: str, if_none_match: Optional[str] = None, range_header: Optional[str] = None, if_range: Optional[str] = None
+    ) -> Response:
+        """Repassa o Range ao S3 e o objeto (ou o trecho pedido) ao cliente em stream."""
+        headers = _cabecalhos(nome)
+        if not_modified(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if if_range is not None and if_range.strip() != headers["ETag"]:
+            # If-Range de outra versão: manda o arquivo inteiro
+            range_header = None
+        try:
+            objeto = await run_in_threadpool(self._get, nome, range_header)
+        except Exception as e:
+            codigo = _codigo_erro(e)
+            if codigo in ("404", "NoSuchKey", "NotFound"):
+                raise _nao_encontrado()
+            if codigo == "InvalidRange":
+                return Response(status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE)
+            raise
+
+        headers["Accept-Ranges"] = "bytes"
+        headers["Content-Length"] = str(objeto["ContentLength"])
+        status_code = status.HTTP_200_OK
+        if objeto.get("ContentRange"):
+            headers["Content-Range"] = objeto["ContentRange"]
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+        body = objeto["Body"]
+
+        def chunks():
+            try:
+                yield from body.iter_chunks(64 * 1024)
+            finally:
+                body.close()
+
+        return StreamingResponse(chunks(), status_code=status_code, media_type=MEDIA_TYPES[nome.rsplit(".", 1)[1]], headers=headers)
+
+
+def _codigo_erro(e: Exception) -> Optional[str]:
+    # botocore.exceptions.ClientError, sem importar o botocore
+    return getattr(e, "response", {}).get("Error", {}).get("Code")
+
+
+def _s3_client():
+    import boto3  # dependência opcional, só necessária com STORAGE_BACKEND=s3
+
+    return boto3.client("s3", endpoint_url=STORAGE_S3_ENDPOINT_URL)
+
+
+def build_storage():
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(_s3_client())
+    return LocalStorage()
+
+
+_storage = None
+
+
+def get_storage():
+    """O storage configurado, criado no primeiro uso (em cada processo)."""
+    global _storage
+    if _storage is None:
+        _storage = build_storage()
+    return _storage
@@ -0,0 +1,242 @@
+"""
+Worker da fila de jobs (tabela jobs, app/crud/job_crud.py).
+
+Sobe um pool de processos; cada processo pega um job por vez com SELECT ... FOR
+UPDATE SKIP LOCKED, executa o handler do tipo do job e grava o resultado. O número
+de processos limita quantas operações pesadas rodam ao mesmo tempo, qualquer que
+seja o tamanho da fila. Só precisa do banco: rode quantos workers quiser, em uma ou
+em várias máquinas.
+
+Uso:
+    python -m app.worker                  # JOBS_WORKERS processos, até Ctrl+C / SIGTERM
+    python -m app.worker --processos 4
+    python -m app.worker --ate-esvaziar   # sai quando não houver mais jobs pendentes
+
+Ctrl+C ou SIGTERM: cada processo termina o job em andamento e sai.
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, func, or_, select, update
+
+import app.models as models
+from app.cache import CACHE_BACKEND
+from app.database import SessionLocal, engine
+
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+# Um job em execução sem heartbeat há JOBS_TIMEOUT segundos é de um worker que morreu
+# e volta para a fila, até JOBS_MAX_TENTATIVAS execuções; depois disso vira erro
+JOBS_TIMEOUT = float(os.getenv("JOBS_TIMEOUT", "600"))
+JOBS_MAX_TENTATIVAS = int(os.getenv("JOBS_MAX_TENTATIVAS", "3"))
+
+# Módulos que registram handlers com @job_handler
+HANDLER_MODULES = (
+    "app.crud.cliente_crud",
+    "app.crud.produto_crud",
+    "app.crud.relatorio_crud",
+)
+
+PENDENTE = models.StatusJobEnum.PENDENTE.value
+EXECUTANDO = models.StatusJobEnum.EXECUTANDO.value
+CONCLUIDO = models.StatusJobEnum.CONCLUIDO.value
+ERRO = models.StatusJobEnum.ERRO.value
+
+JobPego = namedtuple("JobPego", ["id", "tipo", "parametros", "tentativas"])
+
+# Sinal de parada compartilhado pelo processo principal com os processos do pool
+_parar = None
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _do_worker(job_id: int, worker: str):
+    jobs = models.JobOrm
+    return jobs.id == job_id, jobs.worker == worker, jobs.status == EXECUTANDO
+
+
+def pegar_job(db, worker: str):
+    """
+    Marca como executando, em nome de worker, o job disponível mais antigo (pendente,
+    ou em execução sem heartbeat há JOBS_TIMEOUT) e o retorna; None se não houver.
+
+    No PostgreSQL o SKIP LOCKED faz cada worker pular a linha que outro está pegando;
+    no SQLite (sem SKIP LOCKED) a condição repetida no UPDATE garante que só um
+    worker fica com o job.
+    """
+    jobs = models.JobOrm
+    while True:
+        agora = _agora()
+        abandonado = and_(jobs.status == EXECUTANDO, jobs.atualizado_em < agora - timedelta(seconds=JOBS_TIMEOUT))
+        disponivel = or_(jobs.status == PENDENTE, abandonado)
+        candidato = db.execute(
+            select(jobs.id, jobs.status, jobs.tentativas)
+            .where(disponivel)
+            .order_by(jobs.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if candidato is None:
+            db.commit()
+            return None
+
+        if candidato.status == EXECUTANDO and candidato.tentativas >= JOBS_MAX_TENTATIVAS:
+            db.execute(
+                update(jobs)
+                .where(jobs.id == candidato.id, abandonado)
+                .values(status=ERRO, detail="O worker parou durante todas as tentativas de execução.", concluido_em=agora)
+            )
+            db.commit()
+            continue
+
+        pego = db.execute(
+            update(jobs)
+            .where(jobs.id == candidato.id, disponivel)
+            .values(
+                status=EXECUTANDO,
+                worker=worker,
+                tentativas=jobs.tentativas + 1,
+                iniciado_em=func.coalesce(jobs.iniciado_em, agora),
+                atualizado_em=agora,
+            )
+            .returning(jobs.id, jobs.tipo, jobs.parametros, jobs.tentativas)
+        ).first()
+        db.commit()
+        if pego is not None:
+            return JobPego(*pego)
+
+
+def registrar_progresso(job_id: int, worker: str, feito: int = None, total: int = None):
+    """Grava o progresso (e o heartbeat) em uma transação própria."""
+    valores = {"atualizado_em": _agora()}
+    if feito is not None:
+        valores["progresso"] = feito
+    if total is not None:
+        valores["total"] = total
+    with SessionLocal() as db:
+        db.execute(update(models.JobOrm).where(*_do_worker(job_id, worker)).values(**valores))
+        db.commit()
+
+
+def finalizar_job(job_id: int, worker: str, **valores):
+    """Grava o resultado, se o job ainda for deste worker (não foi devolvido à fila)."""
+    agora = _agora()
+    with SessionLocal() as db:
+        db.execute(
+            update(models.JobOrm)
+            .where(*_do_worker(job_id, worker))
+            .values(concluido_em=agora, atualizado_em=agora, **valores)
+        )
+        db.commit()
+
+
+def _heartbeat(job_id: int, worker: str, fim: threading.Event):
+    # Mantém o job como vivo enquanto o handler roda sem reportar progresso
+    while not fim.wait(JOBS_TIMEOUT / 3):
+        try:
+            registrar_progresso(job_id, worker)
+        except Exception:
+            pass
+
+
+def executar_job(job: JobPego, worker: str):
+    from app.crud.job_crud import JOB_HANDLERS
+
+    handler = JOB_HANDLERS.get(job.tipo)
+    if handler is None:
+        finalizar_job(job.id, worker, status=ERRO, detail=f"Tipo de job desconhecido: {job.tipo}")
+        return
+
+    fim = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job.id, worker, fim), daemon=True).start()
+    try:
+        with SessionLocal() as db:
+            resultado = handler(
+                db=db,
+                progresso=lambda feito, total=None: registrar_progresso(job.id, worker, feito, total),
+                **job.parametros,
+            )
+        finalizar_job(
+            job.id,
+            worker,
+            status=CONCLUIDO,
+            resultado=resultado,
+            progresso=func.coalesce(models.JobOrm.total, models.JobOrm.progresso),
+        )
+    except Exception as e:
+        finalizar_job(job.id, worker, status=ERRO, detail=str(e) or type(e).__name__)
+    finally:
+        fim.set()
+
+
+def _iniciar_processo(parar):
+    global _parar
+    _parar = parar
+    # Só o processo principal trata Ctrl+C e SIGTERM: o job em andamento termina antes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def executar_worker(ate_esvaziar: bool = False) -> int:
+    """Loop de um processo do pool: pega e executa jobs até a parada. Retorna quantos executou."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    executados = 0
+    while not _parar.is_set():
+        with SessionLocal() as db:
+            job = pegar_job(db, worker)
+        if job is None:
+            if ate_esvaziar:
+                break
+            _parar.wait(JOBS_POLL_INTERVAL)
+            continue
+        executar_job(job, worker)
+        executados += 1
+    return executados
+
+
+def run(processos: int, ate_esvaziar: bool) -> int:
+    models.Base.metadata.create_all(bind=engine)
+    # spawn: cada processo abre as próprias conexões, sem herdar as do pai
+    contexto = multiprocessing.get_context("spawn")
+    parar = contexto.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+
+    inicio = time.perf_counter()
+    print(f"worker: {processos} processo(s)")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto, initializer=_iniciar_processo, initargs=(parar,)) as pool:
+        futures = [pool.submit(executar_worker, ate_esvaziar) for _ in range(processos)]
+        while True:
+            try:
+                wait(futures)
+                break
+            except KeyboardInterrupt:
+                print("worker: parando após os jobs em andamento...")
+                parar.set()
+    executados = sum(future.result() for future in futures)
+    print(f"worker: {executados} job(s) executado(s) em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=JOBS_WORKERS, help="processos do pool (jobs executados ao mesmo tempo)")
+    parser.add_argument("--ate-esvaziar", action="store_true", help="sai quando não houver mais jobs pendentes")
+    args = parser.parse_args()
+    if CACHE_BACKEND == "memory":
+        # As invalidações do worker não chegariam ao cache em memória da API
+        parser.error("CACHE_BACKEND=memory é local a cada processo; use redis (o mesmo da API) ou none")
+    sys.exit(run(args.processos, args.ate_esvaziar))
@@ -0,0 +1,94 @@
+"""
+Benchmark de concorrência do checkout (create_pedido_crud com reserva de estoque).
+
+Cria um cliente e alguns produtos com estoque limitado e dispara checkouts em
+paralelo, cada um com a sua sessão. Ao final confere que nenhum produto foi vendido
+além do estoque (estoque final >= 0 e igual ao inicial menos o reservado pelos
+pedidos criados) e mede a vazão.
+
+Uso:
+    DB_POOL_SIZE=50 DB_MAX_OVERFLOW=150 python -m bench.checkout_bench --parallel 200 --checkouts 2000
+
+Rode contra o PostgreSQL para medir a disputa real pelas linhas de produtos; no
+SQLite as escritas são serializadas pelo lock do arquivo.
+"""
+import argparse
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+import app.models as models
+import app.schemas.pedido_schema as schemas
+from app.crud.pedido_crud import create_pedido_crud
+from app.database import SessionLocal, engine
+
+
+def preparar(produtos: int, estoque: int):
+    models.Base.metadata.create_all(bind=engine)
+    marca = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        cliente = models.ClienteOrm(nome="Bench", email=f"bench-{marca}@exemplo.com", cpf=marca)
+        itens = [
+            models.ProdutoOrm(nome=f"bench {i}", descricao="bench", preco=10.0, cod_barras=f"{marca}{i:05d}", estoque=estoque)
+            for i in range(produtos)
+        ]
+        db.add(cliente)
+        db.add_all(itens)
+        db.commit()
+        return cliente.id, [p.id for p in itens]
+
+
+def checkout(cliente_id: int, produto_ids: list):
+    # Cada pedido leva 1 a 3 produtos em ordem aleatória, para exercitar a ordem de locks
+    escolhidos = random.sample(produto_ids, k=min(len(produto_ids), random.randint(1, 3)))
+    payload = schemas.PedidoCreateModel(
+        cliente_id=cliente_id,
+        produtos=[{"produto_id": p, "quantidade": random.randint(1, 3)} for p in escolhidos],
+    )
+    with SessionLocal() as db:
+        try:
+            create_pedido_crud(payload=payload, db=db)
+            return "criado", payload.produtos
+        except HTTPException as e:
+            return ("sem_estoque" if e.status_code == 409 else f"erro_{e.status_code}"), []
+
+
+def run(parallel: int, checkouts: int, produtos: int, estoque: int):
+    cliente_id, produto_ids = preparar(produtos, estoque)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        resultados = list(pool.map(lambda _: checkout(cliente_id, produto_ids), range(checkouts)))
+    duracao = time.perf_counter() - inicio
+
+    contagem = Counter(status for status, _ in resultados)
+    reservado = Counter()
+    for _, linhas in resultados:
+        for linha in linhas:
+            reservado[linha.produto_id] += linha.quantidade
+
+    with SessionLocal() as db:
+        finais = dict(db.execute(
+            select(models.ProdutoOrm.id, models.ProdutoOrm.estoque).where(models.ProdutoOrm.id.in_(produto_ids))
+        ).all())
+
+    oversell = [p for p in produto_ids if finais[p] < 0 or finais[p] != estoque - reservado[p]]
+    print(f"checkouts: {checkouts} em {duracao:.2f}s ({checkouts / duracao:.0f}/s) com {parallel} em paralelo")
+    print(f"resultados: {dict(contagem)}")
+    print(f"estoque final: {finais}")
+    print("OK: nenhum oversell" if not oversell else f"FALHA: estoque inconsistente nos produtos {oversell}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parallel", type=int, default=200, help="checkouts simultâneos")
+    parser.add_argument("--checkouts", type=int, default=1000, help="total de checkouts")
+    parser.add_argument("--produtos", type=int, default=5, help="produtos disputados")
+    parser.add_argument("--estoque", type=int, default=300, help="estoque inicial de cada produto")
+    args = parser.parse_args()
+    run(args.parallel, args.checkouts, args.produtos, args.estoque)
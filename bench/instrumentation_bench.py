@@ -0,0 +1,84 @@
+"""
+Custo da instrumentação por requisição (MetricsMiddleware e eventos da engine).
+
+Chama um app ASGI mínimo diretamente, sem servidor HTTP, com e sem o
+MetricsMiddleware, e executa consultas triviais em um SQLite em memória com e sem
+os eventos de register_query_metrics. A meta é < 50 µs por requisição.
+
+Uso:
+    python -m bench.instrumentation_bench --requests 20000 --queries 3
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.instrumentation import MetricsMiddleware, RequestStats, _request_stats, register_query_metrics
+
+
+class _Route:
+    path = "/api/v1/produtos/produto/{produto_id}"
+
+
+async def app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"status":"Successo"}'})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def medir_requisicoes(asgi_app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/produtos/produto/1", "headers": []}
+    await asgi_app(dict(scope), receive, send)
+    inicio = time.perf_counter()
+    for _ in range(requests):
+        await asgi_app(dict(scope), receive, send)
+    return (time.perf_counter() - inicio) / requests * 1e6
+
+
+def medir_consultas(instrumentada: bool, queries: int) -> float:
+    engine = create_engine("sqlite://")
+    if instrumentada:
+        register_query_metrics(engine)
+    # As consultas contam para uma requisição em andamento, como dentro do middleware
+    token = _request_stats.set(RequestStats())
+    with engine.connect() as conn:
+        stmt = text("SELECT 1")
+        conn.execute(stmt)
+        inicio = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(stmt)
+        duracao = time.perf_counter() - inicio
+    _request_stats.reset(token)
+    return duracao / queries * 1e6
+
+
+def run(requests: int, queries: int):
+    sem = asyncio.run(medir_requisicoes(app, requests))
+    com = asyncio.run(medir_requisicoes(MetricsMiddleware(app), requests))
+    consulta_sem = medir_consultas(False, requests)
+    consulta_com = medir_consultas(True, requests)
+
+    middleware = com - sem
+    por_consulta = consulta_com - consulta_sem
+    total = middleware + queries * por_consulta
+    print(f"requisição: {sem:.1f} µs sem middleware, {com:.1f} µs com ({middleware:.1f} µs de overhead)")
+    print(f"consulta:   {consulta_sem:.1f} µs sem eventos, {consulta_com:.1f} µs com ({por_consulta:.1f} µs de overhead)")
+    print(f"overhead por requisição com {queries} consulta(s): {total:.1f} µs")
+    print("OK: abaixo de 50 µs" if total < 50 else "FALHA: acima de 50 µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="requisições (e consultas) medidas")
+    parser.add_argument("--queries", type=int, default=3, help="consultas por requisição no total estimado")
+    args = parser.parse_args()
+    run(args.requests, args.queries)
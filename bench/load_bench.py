@@ -0,0 +1,447 @@
+"""
+Benchmark de carga de todas as rotas de clientes, produtos, pedidos e relatórios.
+
+Dispara requisições com uma mistura ponderada de operações (--mix), mantendo
+--concurrency requisições simultâneas por --duration segundos, e reporta p50/p95/p99
+e vazão por operação. Os resultados são gravados em JSON para comparar execuções.
+
+Por padrão a aplicação roda no próprio processo (httpx + ASGITransport, sem servidor
+HTTP), sobre o banco de DATABASE_URL; com --url as requisições vão para um servidor
+já em execução. Popule o banco antes com bench.seed.
+
+Uso:
+    python -m bench.seed --escala 100k
+    python -m bench.load_bench --mix leitura --concurrency 32 --duration 30
+    python -m bench.load_bench --url http://localhost:8000 --mix misto --output bench/results/misto.json
+    python -m bench.load_bench --compare bench/results/antes.json bench/results/depois.json
+
+Misturas: leitura (~95% GETs), misto (~80/20) e escrita (~50/50); --exports acrescenta
+as exportações completas de produtos e pedidos.
+"""
+import argparse
+import asyncio
+import contextlib
+import copy
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+API = "/api/v1"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Peso de cada operação em cada mistura
+MIXES = {
+    "leitura": {
+        "get_produto": 25, "list_produtos": 10, "list_produtos_cursor": 5, "list_produtos_grid": 5, "search_produtos": 8,
+        "get_produtos_ids": 4, "batch_get_produtos": 2,
+        "get_cliente": 12, "list_clientes": 5, "search_clientes": 4, "batch_get_clientes": 2,
+        "get_pedido": 12, "list_pedidos": 8, "list_pedidos_cursor": 4, "list_pedidos_grid": 3,
+        "vendas_por_dia": 1, "produtos_mais_vendidos": 1, "pedidos_por_status": 1,
+        "create_pedido": 3, "update_pedido": 1,
+    },
+    "misto": {
+        "get_produto": 18, "list_produtos": 8, "list_produtos_cursor": 4, "list_produtos_grid": 4, "search_produtos": 6,
+        "get_produtos_ids": 3, "batch_get_produtos": 1,
+        "get_cliente": 10, "list_clientes": 4, "search_clientes": 3, "batch_get_clientes": 1,
+        "get_pedido": 10, "list_pedidos": 6, "list_pedidos_cursor": 3, "list_pedidos_grid": 2,
+        "vendas_por_dia": 1, "produtos_mais_vendidos": 1, "pedidos_por_status": 1,
+        "create_cliente": 2, "update_cliente": 2, "delete_cliente": 1,
+        "create_produto": 2, "update_produto": 2, "delete_produto": 1,
+        "create_pedido": 8, "retry_pedido": 1, "update_pedido": 4, "delete_pedido": 1,
+        "bulk_clientes": 1, "bulk_produtos": 1, "bulk_pedidos": 1,
+    },
+    "escrita": {
+        "get_produto": 12, "list_produtos": 4, "search_produtos": 3,
+        "get_cliente": 8, "list_clientes": 3,
+        "get_pedido": 12, "list_pedidos": 8,
+        "create_cliente": 5, "update_cliente": 5, "delete_cliente": 2,
+        "create_produto": 5, "update_produto": 5, "delete_produto": 2,
+        "create_pedido": 16, "retry_pedido": 2, "update_pedido": 6, "delete_pedido": 2,
+        "bulk_clientes": 1, "bulk_produtos": 1, "bulk_pedidos": 1,
+    },
+}
+
+# Exportações leem a tabela inteira; só entram na mistura com --exports
+EXPORTS = {"export_produtos": 1, "export_pedidos": 1}
+
+PALAVRAS = ["arroz", "feijao", "cafe", "leite", "dona maria", "premium", "embalagem 2kg"]
+
+
+class Workload:
+    """Operações do benchmark; cada uma faz uma requisição e retorna a resposta."""
+
+    def __init__(self, client: httpx.AsyncClient, max_ids: dict, rng: random.Random):
+        self.client = client
+        self.max_ids = max_ids
+        self.rng = rng
+        # Só os registros criados pelo benchmark são alterados de forma destrutiva
+        self.criados = {"cliente": deque(maxlen=10_000), "produto": deque(maxlen=10_000), "pedido": deque(maxlen=10_000)}
+        # (payload, Idempotency-Key) dos últimos pedidos criados, para simular retentativas
+        self.pedidos_enviados = deque(maxlen=1000)
+
+    def com_cliente(self, client: httpx.AsyncClient):
+        """
+        A mesma carga (e os mesmos registros criados) por outro cliente HTTP. Cada
+        usuário simulado tem os próprios cookies: o de read-your-writes de uma escrita
+        não manda as leituras de todos os outros para o primário.
+        """
+        outra = copy.copy(self)
+        outra.client = client
+        return outra
+
+    def _id(self, tipo: str) -> int:
+        return self.rng.randint(1, max(1, self.max_ids[tipo]))
+
+    def _criado(self, tipo: str):
+        criados = self.criados[tipo]
+        return criados.popleft() if criados else None
+
+    def _guardar(self, tipo: str, response):
+        if response.status_code == 201:
+            self.criados[tipo].append(response.json()["data"]["id"])
+
+    # Leituras
+
+    async def get_produto(self):
+        return await self.client.get(f"{API}/produtos/produto/{self._id('produto')}")
+
+    async def list_produtos(self):
+        return await self.client.get(f"{API}/produtos/produto", params={"limit": 100, "page": self.rng.randint(1, 20)})
+
+    async def list_produtos_grid(self):
+        # Projeção de uma grade: só as colunas exibidas, sem as imagens
+        return await self.client.get(f"{API}/produtos/produto", params={"limit": 100, "page": self.rng.randint(1, 20), "fields": "id,nome,preco"})
+
+    async def list_produtos_cursor(self):
+        response = await self.client.get(f"{API}/produtos/produto", params={"limit": 50, "order_by": "nome"})
+        cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+        if cursor:
+            response = await self.client.get(f"{API}/produtos/produto", params={"limit": 50, "order_by": "nome", "cursor": cursor})
+        return response
+
+    async def search_produtos(self):
+        return await self.client.get(f"{API}/produtos/produto", params={"limit": 20, "search": self.rng.choice(PALAVRAS)})
+
+    async def get_produtos_ids(self):
+        # Como um carrinho: até 20 produtos de uma vez
+        ids = ",".join(str(self._id("produto")) for _ in range(self.rng.randint(1, 20)))
+        return await self.client.get(f"{API}/produtos/produto", params={"ids": ids})
+
+    async def batch_get_produtos(self):
+        return await self.client.post(f"{API}/produtos/produto/batch-get", json={"ids": [self._id("produto") for _ in range(200)]})
+
+    async def get_cliente(self):
+        return await self.client.get(f"{API}/clientes/cliente/{self._id('cliente')}")
+
+    async def list_clientes(self):
+        return await self.client.get(f"{API}/clientes/cliente", params={"limit": 100, "page": self.rng.randint(1, 20)})
+
+    async def search_clientes(self):
+        return await self.client.get(f"{API}/clientes/cliente", params={"limit": 20, "search": self.rng.choice(["Silva", "Ana", "exemplo.com"])})
+
+    async def batch_get_clientes(self):
+        return await self.client.post(f"{API}/clientes/cliente/batch-get", json={"ids": [self._id("cliente") for _ in range(200)]})
+
+    async def get_pedido(self):
+        return await self.client.get(f"{API}/pedidos/pedido/{self._id('pedido')}")
+
+    async def list_pedidos(self):
+        return await self.client.get(f"{API}/pedidos/pedido", params={"limit": 100, "skip": self.rng.randint(0, 1000)})
+
+    async def list_pedidos_grid(self):
+        return await self.client.get(f"{API}/pedidos/pedido", params={"limit": 100, "skip": self.rng.randint(0, 1000), "fields": "id,d_pedido,status,total"})
+
+    async def list_pedidos_cursor(self):
+        return await self.client.get(f"{API}/pedidos/pedido", params={"limit": 100, "order_by": "-d_pedido"})
+
+    async def vendas_por_dia(self):
+        return await self.client.get(f"{API}/relatorios/vendas-por-dia")
+
+    async def produtos_mais_vendidos(self):
+        return await self.client.get(f"{API}/relatorios/produtos-mais-vendidos", params={"order_by": self.rng.choice(["quantidade", "receita"])})
+
+    async def pedidos_por_status(self):
+        return await self.client.get(f"{API}/relatorios/pedidos-por-status")
+
+    # Escritas
+
+    def _novo_cliente(self) -> dict:
+        marca = uuid.uuid4().hex[:12]
+        return {"nome": f"Bench {marca}", "email": f"bench-{marca}@exemplo.com", "cpf": marca}
+
+    def _novo_produto(self) -> dict:
+        marca = uuid.uuid4().int % 10**13
+        return {
+            "nome": f"bench {marca}",
+            "descricao": "Produto criado pelo benchmark",
+            "preco": round(self.rng.uniform(1, 100), 2),
+            "cod_barras": f"{marca:013d}",
+            "estoque": 1_000_000,
+            "imagens": [{"url": f"https://cdn.exemplo.com/bench/{marca}.webp"}],
+        }
+
+    async def create_cliente(self):
+        response = await self.client.post(f"{API}/clientes/cliente", json=self._novo_cliente())
+        self._guardar("cliente", response)
+        return response
+
+    async def update_cliente(self):
+        cliente_id = self._criado("cliente") or self._id("cliente")
+        response = await self.client.patch(f"{API}/clientes/cliente/{cliente_id}", json={"ativo": self.rng.random() > 0.5})
+        if cliente_id > self.max_ids["cliente"]:
+            self.criados["cliente"].append(cliente_id)
+        return response
+
+    async def delete_cliente(self):
+        cliente_id = self._criado("cliente")
+        if cliente_id is None:
+            return await self.create_cliente()
+        return await self.client.delete(f"{API}/clientes/cliente/{cliente_id}")
+
+    async def create_produto(self):
+        response = await self.client.post(f"{API}/produtos/produto", json=self._novo_produto())
+        self._guardar("produto", response)
+        return response
+
+    async def update_produto(self):
+        produto_id = self._criado("produto") or self._id("produto")
+        response = await self.client.patch(f"{API}/produtos/produto/{produto_id}", json={"preco": round(self.rng.uniform(1, 100), 2)})
+        if produto_id > self.max_ids["produto"]:
+            self.criados["produto"].append(produto_id)
+        return response
+
+    async def delete_produto(self):
+        produto_id = self._criado("produto")
+        if produto_id is None:
+            return await self.create_produto()
+        return await self.client.delete(f"{API}/produtos/produto/{produto_id}")
+
+    async def create_pedido(self):
+        payload = {
+            "cliente_id": self._id("cliente"),
+            "produtos": [
+                {"produto_id": self._id("produto"), "quantidade": self.rng.randint(1, 3)}
+                for _ in range(self.rng.randint(1, 4))
+            ],
+        }
+        chave = str(uuid.uuid4())
+        response = await self.client.post(f"{API}/pedidos/pedido", json=payload, headers={"Idempotency-Key": chave})
+        self._guardar("pedido", response)
+        self.pedidos_enviados.append((payload, chave))
+        return response
+
+    async def retry_pedido(self):
+        # Retentativa de um POST já feito (ex.: após um timeout): recebe a resposta gravada
+        if not self.pedidos_enviados:
+            return await self.create_pedido()
+        payload, chave = self.rng.choice(self.pedidos_enviados)
+        return await self.client.post(f"{API}/pedidos/pedido", json=payload, headers={"Idempotency-Key": chave})
+
+    async def update_pedido(self):
+        pedido_id = self._criado("pedido")
+        if pedido_id is None:
+            return await self.create_pedido()
+        response = await self.client.patch(
+            f"{API}/pedidos/pedido/{pedido_id}",
+            json={"status": self.rng.choice(["processando", "enviado", "entregue"])},
+        )
+        self.criados["pedido"].append(pedido_id)
+        return response
+
+    async def delete_pedido(self):
+        pedido_id = self._criado("pedido")
+        if pedido_id is None:
+            return await self.create_pedido()
+        return await self.client.delete(f"{API}/pedidos/pedido/{pedido_id}")
+
+    async def bulk_clientes(self):
+        return await self.client.post(f"{API}/clientes/cliente/bulk", json=[self._novo_cliente() for _ in range(100)])
+
+    async def bulk_produtos(self):
+        return await self.client.post(f"{API}/produtos/produto/bulk", json=[self._novo_produto() for _ in range(100)])
+
+    async def bulk_pedidos(self):
+        pedidos = [
+            {"cliente_id": self._id("cliente"), "produtos": [{"produto_id": self._id("produto"), "quantidade": 1}]}
+            for _ in range(100)
+        ]
+        return await self.client.post(f"{API}/pedidos/pedido/bulk", json=pedidos)
+
+    # Exportações (o corpo inteiro é lido, como faria um cliente real)
+
+    async def export_produtos(self):
+        return await self.client.get(f"{API}/produtos/export", params={"format": self.rng.choice(["ndjson", "csv"])})
+
+    async def export_pedidos(self):
+        return await self.client.get(f"{API}/pedidos/export", params={"format": self.rng.choice(["ndjson", "csv"])})
+
+
+async def maiores_ids(client: httpx.AsyncClient) -> dict:
+    """Maior id de cada recurso, pela própria API (funciona também com --url)."""
+    ids = {}
+    for tipo, path in (("cliente", "clientes/cliente"), ("produto", "produtos/produto"), ("pedido", "pedidos/pedido")):
+        response = await client.get(f"{API}/{path}", params={"limit": 1, "order_by": "-id"})
+        response.raise_for_status()
+        data = response.json()["data"]
+        ids[tipo] = data[0]["id"] if data else 0
+    return ids
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumo(latencias: list, erros: int, duracao: float) -> dict:
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "vazao_rps": round(len(latencias) / duracao, 1),
+        "media_ms": round(statistics.fmean(latencias), 3) if latencias else 0.0,
+        "p50_ms": round(percentil(latencias, 0.50), 3),
+        "p95_ms": round(percentil(latencias, 0.95), 3),
+        "p99_ms": round(percentil(latencias, 0.99), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def executar(args) -> dict:
+    if args.url:
+        def novo_cliente():
+            return httpx.AsyncClient(base_url=args.url, timeout=60)
+        banco = None
+    else:
+        from app.database import engine
+        from app.main import app
+
+        def novo_cliente():
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        banco = engine.dialect.name
+
+    async with contextlib.AsyncExitStack() as stack:
+        client = await stack.enter_async_context(novo_cliente())
+        # Um cliente (com os próprios cookies) por requisição simultânea
+        clientes = [await stack.enter_async_context(novo_cliente()) for _ in range(args.concurrency)]
+        max_ids = await maiores_ids(client)
+        if not all(max_ids.values()):
+            raise SystemExit(f"Banco sem dados suficientes ({max_ids}); rode antes: python -m bench.seed")
+
+        rng = random.Random(args.seed)
+        workload = Workload(client, max_ids, rng)
+        mix = MIXES[args.mix] | (EXPORTS if args.exports else {})
+        operacoes, pesos = list(mix), list(mix.values())
+        latencias = {op: [] for op in operacoes}
+        erros = {op: 0 for op in operacoes}
+
+        async def worker(cliente: httpx.AsyncClient, fim: float, medir: bool):
+            usuario = workload.com_cliente(cliente)
+            while time.perf_counter() < fim:
+                op = rng.choices(operacoes, pesos)[0]
+                inicio = time.perf_counter()
+                try:
+                    response = await getattr(usuario, op)()
+                    # 4xx também conta: ids sorteados podem ter sido apagados por execuções anteriores
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if not medir:
+                    continue
+                latencias[op].append((time.perf_counter() - inicio) * 1000)
+                if not ok:
+                    erros[op] += 1
+
+        if args.warmup:
+            fim = time.perf_counter() + args.warmup
+            await asyncio.gather(*(worker(cliente, fim, False) for cliente in clientes))
+
+        inicio = time.perf_counter()
+        fim = inicio + args.duration
+        await asyncio.gather(*(worker(cliente, fim, True) for cliente in clientes))
+        duracao = time.perf_counter() - inicio
+
+    todas = [latencia for valores in latencias.values() for latencia in valores]
+    return {
+        "meta": {
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "alvo": args.url or "in-process",
+            "banco": banco,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "exports": args.exports,
+            "seed": args.seed,
+            "maiores_ids": max_ids,
+        },
+        "total": resumo(todas, sum(erros.values()), duracao),
+        "operacoes": {op: resumo(latencias[op], erros[op], duracao) for op in operacoes if latencias[op]},
+    }
+
+
+def imprimir(resultado: dict):
+    print(f"{'operação':<24} {'req':>7} {'erros':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    linhas = list(resultado["operacoes"].items()) + [("TOTAL", resultado["total"])]
+    for op, r in linhas:
+        print(f"{op:<24} {r['requisicoes']:>7} {r['erros']:>6} {r['vazao_rps']:>8.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+def comparar(antes_path: str, depois_path: str):
+    antes = json.loads(Path(antes_path).read_text())
+    depois = json.loads(Path(depois_path).read_text())
+    print(f"antes: {antes['meta']['commit']} ({antes['meta']['data']})  depois: {depois['meta']['commit']} ({depois['meta']['data']})")
+    print(f"{'operação':<24} {'p50 antes':>10} {'p50 depois':>11} {'p99 antes':>10} {'p99 depois':>11} {'Δ p99':>8} {'Δ req/s':>8}")
+    operacoes = [op for op in depois["operacoes"] if op in antes["operacoes"]]
+    for op in operacoes + ["TOTAL"]:
+        a = antes["total"] if op == "TOTAL" else antes["operacoes"][op]
+        d = depois["total"] if op == "TOTAL" else depois["operacoes"][op]
+        delta_p99 = (d["p99_ms"] / a["p99_ms"] - 1) * 100 if a["p99_ms"] else 0.0
+        delta_rps = (d["vazao_rps"] / a["vazao_rps"] - 1) * 100 if a["vazao_rps"] else 0.0
+        print(f"{op:<24} {a['p50_ms']:>10.2f} {d['p50_ms']:>11.2f} {a['p99_ms']:>10.2f} {d['p99_ms']:>11.2f} {delta_p99:>+7.1f}% {delta_rps:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor já em execução (ex.: http://localhost:8000); padrão: app no processo")
+    parser.add_argument("--mix", choices=MIXES, default="misto", help="mistura de operações")
+    parser.add_argument("--concurrency", type=int, default=16, help="requisições simultâneas")
+    parser.add_argument("--duration", type=float, default=30, help="segundos de medição")
+    parser.add_argument("--warmup", type=float, default=3, help="segundos de aquecimento (não medidos)")
+    parser.add_argument("--exports", action="store_true", help="inclui as exportações completas na mistura")
+    parser.add_argument("--seed", type=int, default=42, help="semente da escolha de operações e ids")
+    parser.add_argument("--output", help="arquivo JSON de resultado (padrão: bench/results/<data>-<mix>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois resultados JSON e sai")
+    args = parser.parse_args()
+
+    if args.compare:
+        comparar(*args.compare)
+        return
+
+    resultado = asyncio.run(executar(args))
+    imprimir(resultado)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{args.mix}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"resultado gravado em {output}")
+
+
+if __name__ == "__main__":
+    main()
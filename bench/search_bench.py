@@ -0,0 +1,71 @@
+"""
+Benchmark da busca de produtos (get_produtos_crud com search).
+
+Popula a tabela de produtos do banco apontado por DATABASE_URL e mede a latência da
+busca para alguns termos típicos (nome, trecho da descrição e código de barras).
+
+Uso:
+    python -m bench.search_bench --rows 1000000 --repeat 50
+
+No PostgreSQL a busca usa os índices GiST de trigramas (filtro e ranking KNN) e a meta é p99 < 10 ms com
+1M de linhas; no SQLite o LIKE percorre a tabela inteira e serve só como referência.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import func, insert
+
+import app.models as models
+from app.crud.produto_crud import get_produtos_crud
+from app.database import SessionLocal, engine
+
+PALAVRAS = ["arroz", "feijao", "macarrao", "cafe", "acucar", "leite", "oleo", "farinha", "sabao", "biscoito"]
+MARCAS = ["dona maria", "bom gosto", "da fazenda", "premium", "popular", "tradicional"]
+
+
+def seed_produtos(rows: int, batch_size: int = 10_000):
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        existentes = conn.execute(func.count(models.ProdutoOrm.id).select()).scalar()
+        for start in range(existentes, rows, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, rows)):
+                palavra = PALAVRAS[i % len(PALAVRAS)]
+                marca = MARCAS[i % len(MARCAS)]
+                batch.append({
+                    "nome": f"{palavra} {marca} {i}",
+                    "descricao": f"{palavra.title()} {marca.title()} embalagem {i % 5 + 1}kg",
+                    "preco": round(random.uniform(1, 100), 2),
+                    "cod_barras": f"{7890000000000 + i}",
+                    "estoque": random.randint(0, 500),
+                })
+            conn.execute(insert(models.ProdutoOrm), batch)
+
+
+def run(rows: int, repeat: int):
+    seed_produtos(rows)
+    termos = ["arroz", "dona maria", "embalagem 3kg", str(7890000000000 + rows // 2), "inexistente"]
+
+    with SessionLocal() as db:
+        for termo in termos:
+            tempos = []
+            for _ in range(repeat):
+                inicio = time.perf_counter()
+                resposta = get_produtos_crud(db=db, limit=20, search=termo)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            tempos.sort()
+            p99 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))]
+            print(
+                f"{termo!r:>20}: p50={statistics.median(tempos):7.2f} ms  "
+                f"p99={p99:7.2f} ms  resultados={len(resposta.data)}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="quantidade de produtos na tabela")
+    parser.add_argument("--repeat", type=int, default=20, help="repetições por termo")
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
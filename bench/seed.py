@@ -0,0 +1,242 @@
+"""
+Gerador de dados para os benchmarks: clientes, produtos (com imagens) e pedidos (com
+linhas) no banco de DATABASE_URL, em qualquer escala (de 10 mil a 10 milhões de linhas).
+
+Os dados são determinísticos para a mesma --seed e são acrescentados aos existentes
+(ids, CPFs, e-mails e códigos de barras continuam a partir do maior id). No
+PostgreSQL com psycopg2 as linhas são carregadas com COPY; nos demais bancos, com
+INSERTs multi-valores em lotes. Ao final os agregados dos relatórios são
+reconstruídos para ficarem consistentes com os pedidos gerados.
+
+Uso:
+    python -m bench.seed --escala 100k
+    python -m bench.seed --clientes 50000 --produtos 20000 --pedidos 1000000 --linhas 3
+
+Escalas (pedidos; clientes e produtos na proporção 1:10 e 1:50 dos pedidos):
+    10k, 100k, 1m, 10m
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+
+import app.models as models
+from app.crud.relatorios import reconstruir_relatorios
+from app.database import SessionLocal, engine
+
+ESCALAS = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+PALAVRAS = ["arroz", "feijao", "macarrao", "cafe", "acucar", "leite", "oleo", "farinha", "sabao", "biscoito"]
+MARCAS = ["dona maria", "bom gosto", "da fazenda", "premium", "popular", "tradicional"]
+SECOES = ["mercearia", "bebidas", "limpeza", "padaria", "hortifruti", None]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Hugo", "Isabela", "João"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Ribeiro"]
+
+# Distribuição de status dos pedidos gerados
+STATUS_PESOS = {
+    models.StatusPedidoEnum.ENTREGUE: 55,
+    models.StatusPedidoEnum.ENVIADO: 15,
+    models.StatusPedidoEnum.PROCESSANDO: 10,
+    models.StatusPedidoEnum.PENDENTE: 12,
+    models.StatusPedidoEnum.CANCELADO: 8,
+}
+
+
+def proximo_id(conn, orm) -> int:
+    return (conn.execute(select(func.max(orm.id))).scalar() or 0) + 1
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, models.StatusPedidoEnum):
+        return value.name
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def carregar(conn, orm, rows: list):
+    """Insere um lote: COPY no PostgreSQL com psycopg2, INSERT multi-valores nos demais."""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["\\N" if (v := _copy_value(row[c])) is None else v for c in columns])
+        buffer.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        cursor.copy_expert(
+            f"COPY {orm.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+        return
+    conn.execute(insert(orm), rows)
+
+
+def em_lotes(gerador, tamanho: int):
+    lote = []
+    for item in gerador:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gerar_clientes(rng, inicio: int, quantidade: int):
+    for i in range(inicio, inicio + quantidade):
+        yield {
+            "id": i,
+            "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {i}",
+            "email": f"cliente{i}@exemplo.com",
+            "cpf": f"{i:011d}",
+            "ativo": rng.random() > 0.05,
+        }
+
+
+def gerar_produtos(rng, inicio: int, quantidade: int):
+    hoje = date.today()
+    for i in range(inicio, inicio + quantidade):
+        palavra, marca = rng.choice(PALAVRAS), rng.choice(MARCAS)
+        yield {
+            "id": i,
+            "nome": f"{palavra} {marca} {i}"[:50],
+            "descricao": f"{palavra.title()} {marca.title()} embalagem {i % 5 + 1}kg",
+            "preco": round(rng.uniform(1, 100), 2),
+            "cod_barras": f"{7890000000000 + i}",
+            "secao": rng.choice(SECOES),
+            # Estoque alto: os benchmarks de escrita não devem esbarrar em 409
+            "estoque": 1_000_000,
+            "data_validade": hoje + timedelta(days=rng.randint(30, 720)),
+        }
+
+
+def gerar_imagens(produtos: list):
+    for produto in produtos:
+        yield {"produto_id": produto["id"], "url": f"https://cdn.exemplo.com/produtos/{produto['id']}.webp"}
+
+
+def gerar_pedidos(rng, inicio: int, quantidade: int, clientes: range, precos: dict, linhas: int):
+    """
+    Gera (pedido, [linhas]) com datas espalhadas pelos últimos 365 dias; precos é
+    {produto_id: preço} dos produtos que podem entrar nas linhas.
+    """
+    agora = datetime.now(timezone.utc)
+    status, pesos = list(STATUS_PESOS), list(STATUS_PESOS.values())
+    produtos = list(precos)
+    for i in range(inicio, inicio + quantidade):
+        linhas_pedido = []
+        for _ in range(rng.randint(1, 2 * linhas - 1)):
+            produto_id = rng.choice(produtos)
+            linhas_pedido.append({"pedido_id": i, "produto_id": produto_id, "quantidade": rng.randint(1, 5), "preco_unitario": precos[produto_id]})
+        pedido = {
+            "id": i,
+            "cliente_id": rng.choice(clientes),
+            "d_pedido": agora - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+            "status": rng.choices(status, pesos)[0],
+            "periodo_inicio": None,
+            "periodo_fim": None,
+            "total": round(sum(linha["quantidade"] * linha["preco_unitario"] for linha in linhas_pedido), 2),
+            "itens": sum(linha["quantidade"] for linha in linhas_pedido),
+        }
+        yield pedido, linhas_pedido
+
+
+def ajustar_sequencias(conn):
+    """No PostgreSQL, avança as sequências além dos ids inseridos explicitamente."""
+    if conn.dialect.name != "postgresql":
+        return
+    for orm in (models.ClienteOrm, models.ProdutoOrm, models.PedidoOrm):
+        table = orm.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+def run(clientes: int, produtos: int, pedidos: int, linhas: int, batch_size: int, seed: int, relatorios: bool):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    inicio_total = time.perf_counter()
+
+    with engine.begin() as conn:
+        cliente_inicio = proximo_id(conn, models.ClienteOrm)
+        produto_inicio = proximo_id(conn, models.ProdutoOrm)
+        pedido_inicio = proximo_id(conn, models.PedidoOrm)
+
+    def etapa(nome, total, fn):
+        inicio = time.perf_counter()
+        fn()
+        duracao = time.perf_counter() - inicio
+        print(f"{nome}: {total} em {duracao:.1f}s ({total / max(duracao, 1e-9):.0f}/s)")
+
+    def clientes_():
+        for lote in em_lotes(gerar_clientes(rng, cliente_inicio, clientes), batch_size):
+            with engine.begin() as conn:
+                carregar(conn, models.ClienteOrm, lote)
+
+    def produtos_():
+        for lote in em_lotes(gerar_produtos(rng, produto_inicio, produtos), batch_size):
+            with engine.begin() as conn:
+                carregar(conn, models.ProdutoOrm, lote)
+                carregar(conn, models.ProdutoImagemOrm, list(gerar_imagens(lote)))
+
+    def pedidos_():
+        # Pedidos de qualquer cliente/produto existente, inclusive os de execuções anteriores
+        ids_clientes = range(1, cliente_inicio + clientes)
+        with engine.connect() as conn:
+            precos = dict(conn.execute(select(models.ProdutoOrm.id, models.ProdutoOrm.preco).order_by(models.ProdutoOrm.id)).all())
+        gerador = gerar_pedidos(rng, pedido_inicio, pedidos, ids_clientes, precos, linhas)
+        for lote in em_lotes(gerador, batch_size):
+            with engine.begin() as conn:
+                carregar(conn, models.PedidoOrm, [pedido for pedido, _ in lote])
+                carregar(conn, models.PedidoProdutoOrm, [item for _, itens in lote for item in itens])
+
+    etapa("clientes", clientes, clientes_)
+    etapa("produtos", produtos, produtos_)
+    if pedidos and (cliente_inicio + clientes == 1 or produto_inicio + produtos == 1):
+        raise SystemExit("Não há clientes ou produtos para gerar pedidos.")
+    etapa("pedidos", pedidos, pedidos_)
+
+    with engine.begin() as conn:
+        ajustar_sequencias(conn)
+
+    if relatorios:
+        def relatorios_():
+            with SessionLocal() as db:
+                reconstruir_relatorios(db, batch_size=batch_size)
+                db.commit()
+
+        etapa("relatórios (pedidos lidos)", pedido_inicio - 1 + pedidos, relatorios_)
+
+    print(f"total: {time.perf_counter() - inicio_total:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=ESCALAS, help="tamanho pronto (número de pedidos)")
+    parser.add_argument("--clientes", type=int, help="clientes a gerar")
+    parser.add_argument("--produtos", type=int, help="produtos a gerar")
+    parser.add_argument("--pedidos", type=int, help="pedidos a gerar")
+    parser.add_argument("--linhas", type=int, default=3, help="média de linhas por pedido")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="linhas por lote/transação")
+    parser.add_argument("--seed", type=int, default=42, help="semente do gerador aleatório")
+    parser.add_argument("--sem-relatorios", action="store_true", help="não reconstrói os agregados dos relatórios")
+    args = parser.parse_args()
+
+    pedidos = args.pedidos if args.pedidos is not None else ESCALAS[args.escala or "10k"]
+    clientes = args.clientes if args.clientes is not None else max(1, pedidos // 10)
+    produtos = args.produtos if args.produtos is not None else max(1, pedidos // 50)
+    run(clientes, produtos, pedidos, args.linhas, args.batch_size, args.seed, not args.sem_relatorios)
@@ -0,0 +1,144 @@
+"""
+Micro-benchmark da serialização das respostas, por endpoint.
+
+Monta os *ResponseModel que as funções CRUD devolvem (listas de 100 itens e um item
+único) e mede, sem banco e sem HTTP, o custo de transformá-los no corpo da resposta:
+
+- dict + json: valida de novo pelo response_model, gera um dict e usa json.dumps
+  (o caminho do FastAPI antes da serialização direta pelo Pydantic);
+- dump_json: valida de novo e serializa com o Pydantic (caminho atual do FastAPI
+  para rotas com response_model e a classe de resposta padrão);
+- orjson: valida de novo, gera um dict e usa ORJSONResponse (rotas sem ModelRoute);
+- ModelResponse: serializa o modelo já validado, como as rotas com ModelRoute.
+
+Uso:
+    python -m bench.serialization_bench --items 100 --repeat 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import app.schemas.cliente_schema as cliente_schemas
+import app.schemas.pedido_schema as pedido_schemas
+import app.schemas.produto_schema as produto_schemas
+import app.schemas.relatorio_schema as relatorio_schemas
+from app.responses import ModelResponse, ORJSONResponse
+
+
+def produto(i: int) -> dict:
+    return {
+        "id": i,
+        "nome": f"arroz tipo 1 marca {i}",
+        "descricao": "Arroz branco tipo 1, embalagem de 5kg",
+        "preco": 24.9 + i % 10,
+        "cod_barras": f"{7890000000000 + i}",
+        "secao": "mercearia",
+        "estoque": 100 + i,
+        "data_validade": date(2027, 1, 1) + timedelta(days=i % 300),
+        "imagens": [{"id": i, "produto_id": i, "url": f"https://cdn.exemplo.com/produtos/{i}.webp"}],
+        "version": 1,
+    }
+
+
+def endpoints(items: int) -> dict:
+    """{nome do endpoint: (response_model, modelo devolvido pelo CRUD)}"""
+    agora = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    produtos = produto_schemas.ProdutoListResponseModel(
+        message="ok", data=[produto_schemas.ProdutoModel.model_validate(produto(i)) for i in range(items)]
+    )
+    clientes = cliente_schemas.ClienteListResponseModel(
+        message="ok",
+        data=[
+            cliente_schemas.ClienteModel(id=i, nome=f"Cliente {i}", email=f"cliente{i}@exemplo.com", cpf=f"{i:011d}", ativo=True, version=1)
+            for i in range(items)
+        ],
+    )
+    pedidos = pedido_schemas.PedidoListResponseModel(
+        message="ok",
+        data=[
+            pedido_schemas.PedidoModel(
+                id=i,
+                cliente_id=i % 50,
+                d_pedido=agora + timedelta(minutes=i),
+                status="pendente",
+                version=1,
+                produtos=[{"produto_id": i + j, "quantidade": j + 1, "preco_unitario": 9.9} for j in range(5)],
+                total=148.5,
+                itens=15,
+            )
+            for i in range(items)
+        ],
+    )
+    vendas = relatorio_schemas.VendasDiaResponseModel(
+        message="ok",
+        data=[
+            {"dia": date(2025, 1, 1) + timedelta(days=i), "pedidos": i, "itens": 3 * i, "receita": 99.9 * i}
+            for i in range(365)
+        ],
+    )
+    return {
+        f"GET /produtos/produto ({items} itens)": (produto_schemas.ProdutoListResponseModel, produtos),
+        "GET /produtos/produto/{id}": (
+            produto_schemas.ProdutoResponseModel,
+            produto_schemas.ProdutoResponseModel(message="ok", data=produto(1)),
+        ),
+        f"GET /clientes/cliente ({items} itens)": (cliente_schemas.ClienteListResponseModel, clientes),
+        f"GET /pedidos/pedido ({items} itens)": (pedido_schemas.PedidoListResponseModel, pedidos),
+        "GET /relatorios/vendas-por-dia (365 dias)": (relatorio_schemas.VendasDiaResponseModel, vendas),
+    }
+
+
+async def estrategias(response_model, content) -> dict:
+    field = create_model_field(name="response", type_=response_model, mode="serialization")
+
+    async def dict_json():
+        data = await serialize_response(field=field, response_content=content)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    async def dump_json():
+        return await serialize_response(field=field, response_content=content, dump_json=True)
+
+    async def orjson_response():
+        return ORJSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    async def model_response():
+        return ModelResponse(content).body
+
+    return {
+        "dict + json": dict_json,
+        "dump_json": dump_json,
+        "orjson": orjson_response,
+        "ModelResponse": model_response,
+    }
+
+
+async def medir(fn, repeat: int) -> float:
+    await fn()  # aquecimento
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - inicio) / repeat * 1e6
+
+
+async def run(items: int, repeat: int):
+    for endpoint, (response_model, content) in endpoints(items).items():
+        resultados = {}
+        for nome, fn in (await estrategias(response_model, content)).items():
+            resultados[nome] = await medir(fn, repeat)
+        base = resultados["dict + json"]
+        print(endpoint)
+        for nome, micros in resultados.items():
+            print(f"  {nome:<14} {micros:9.1f} µs  ({base / micros:4.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="itens nas respostas de listagem")
+    parser.add_argument("--repeat", type=int, default=2000, help="serializações medidas por estratégia")
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.repeat))
@@ -0,0 +1,194 @@
+"""
+Verifica se as consultas da aplicação têm índice para os filtros e joins que fazem.
+
+Duas checagens:
+1. Estática: toda chave estrangeira de app.models precisa de um índice cuja primeira
+   coluna seja ela (joins, carregamento de relacionamentos e ON DELETE CASCADE).
+2. Planos reais: roda EXPLAIN das consultas representativas das rotas no banco de
+   DATABASE_URL e aponta as que varrem a tabela inteira e, nas listagens cuja ordem
+   vem de um índice, as que ordenam o resultado inteiro.
+
+No PostgreSQL o EXPLAIN roda com enable_seqscan desligado, para que o planejador use
+um índice sempre que existir um aplicável, mesmo com tabelas pequenas.
+
+Uso:
+    python -m scripts.index_advisor
+
+Termina com código 1 se encontrar algum problema. As mesmas checagens rodam nos testes
+(tests/test_indices.py).
+"""
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import PrimaryKeyConstraint, UniqueConstraint, select, text
+
+import app.models as models
+from app.crud.pedido_crud import filtros_pedidos
+from app.database import engine
+
+
+def listagem_pedidos(order_by: str, **filtros):
+    """Uma página de GET /pedidos/pedido com estes filtros, como a rota monta."""
+    pedido = models.PedidoOrm
+    column = getattr(pedido, order_by.lstrip("-"))
+    ordem = [column.desc() if order_by.startswith("-") else column.asc()]
+    if column is not pedido.id:
+        ordem.append(pedido.id.desc() if order_by.startswith("-") else pedido.id.asc())
+    return select(pedido).where(*filtros_pedidos(**filtros)).order_by(*ordem).limit(11)
+
+
+# Consultas cujo plano depende das estatísticas da tabela: sem elas (e com LIMIT) o
+# SQLite prefere percorrer a tabela na ordem do id, então só são checadas no PostgreSQL
+SO_POSTGRESQL = {"pedidos com período sobreposto"}
+
+# Listagens em que o índice composto entrega as linhas já na ordem de order_by: o plano
+# não pode ordenar o resultado inteiro antes do LIMIT (ordenar só o desempate por id
+# entre pedidos da mesma data, como o Incremental Sort do PostgreSQL, é aceito)
+ORDENADAS_PELO_INDICE = {
+    "pedidos de um cliente em um mês",
+    "pedidos pendentes de um cliente em um mês",
+    "pedidos por data (cursor)",
+    "job disponível mais antigo (worker)",
+}
+
+
+def consultas_representativas():
+    """(descrição, statement) das consultas feitas pelas rotas."""
+    agora = datetime.now(timezone.utc)
+    mes = agora - timedelta(days=30)
+    hoje = agora.date()
+    pedido, linha, imagem = models.PedidoOrm, models.PedidoProdutoOrm, models.ProdutoImagemOrm
+    produto, cliente, job = models.ProdutoOrm, models.ClienteOrm, models.JobOrm
+    return [
+        ("produto por código de barras", select(produto.id).where(produto.cod_barras == "7891234567895")),
+        ("cliente por CPF", select(cliente.id).where(cliente.cpf == "000.000.000-00")),
+        ("cliente por e-mail", select(cliente.id).where(cliente.email == "exemplo@email.com")),
+        ("imagens dos produtos (selectinload)", select(imagem).where(imagem.produto_id.in_([1, 2, 3]))),
+        ("imagem já enviada com o mesmo conteúdo (upload)", select(imagem.id).where(imagem.hash == "0" * 64).order_by(imagem.id).limit(1)),
+        ("linhas dos pedidos (selectinload)", select(linha).where(linha.pedido_id.in_([1, 2, 3]))),
+        ("linhas que usam um produto (delete de produto)", select(linha.id).where(linha.produto_id == 1)),
+        ("pedidos de um cliente (delete de cliente)", select(pedido.id).where(pedido.cliente_id == 1)),
+        # Combinações comuns dos filtros de GET /pedidos/pedido
+        ("pedidos de um cliente em um mês", listagem_pedidos("-d_pedido", cliente_id=1, d_pedido_de=mes, d_pedido_ate=agora)),
+        (
+            "pedidos pendentes de um cliente em um mês",
+            listagem_pedidos("-d_pedido", cliente_id=1, status_pedido=["pendente"], d_pedido_de=mes, d_pedido_ate=agora),
+        ),
+        (
+            "pedidos por status (vários) e data",
+            listagem_pedidos("-d_pedido", status_pedido=["pendente", "processando"], d_pedido_de=mes),
+        ),
+        ("pedidos por data (cursor)", listagem_pedidos("d_pedido", d_pedido_de=agora)),
+        ("pedidos com período sobreposto", listagem_pedidos("id", periodo_inicio=hoje, periodo_fim=hoje + timedelta(days=30))),
+        ("job disponível mais antigo (worker)", select(job.id).where(job.status == "pendente").order_by(job.id).limit(1)),
+        ("remoção de um cliente (job por chave)", select(job.id).where(job.chave == "remocao_cliente:1").order_by(job.id.desc()).limit(1)),
+    ]
+
+
+def chaves_sem_indice():
+    """FKs cuja coluna não é a primeira de nenhum índice, PK ou UNIQUE da tabela."""
+    problemas = []
+    for table in models.Base.metadata.sorted_tables:
+        cobertas = [index.columns for index in table.indexes]
+        cobertas += [c.columns for c in table.constraints if isinstance(c, (PrimaryKeyConstraint, UniqueConstraint))]
+        primeiras = {tuple(columns)[0].name for columns in cobertas if len(columns)}
+        for fk in table.foreign_keys:
+            if fk.parent.name not in primeiras:
+                problemas.append(f"{table.name}.{fk.parent.name} -> {fk.target_fullname}")
+    return problemas
+
+
+def plano(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        return [row[0] for row in conn.execute(text(f"EXPLAIN {sql}"))]
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    raise SystemExit(f"Dialeto sem suporte no advisor: {conn.dialect.name}")
+
+
+def varreduras(linhas: list) -> list:
+    """Passos do plano que leem a tabela inteira."""
+    achados = []
+    for linha in linhas:
+        # PostgreSQL: "Seq Scan on pedidos"; SQLite: "SCAN pedidos" (sem índice)
+        if re.search(r"Seq Scan on (\w+)", linha) or re.match(r"\s*SCAN (\w+)(?!.*USING (COVERING )?INDEX)", linha):
+            achados.append(linha.strip())
+    return achados
+
+
+# Índice (ou índices alternativos) que cada listagem de pedidos precisa usar: sem isso
+# o plano poderia aproveitar outro índice (ex.: só o de d_pedido, filtrando o resto) e um
+# índice composto que deixou de ser usado passaria despercebido
+INDICES_ESPERADOS = {
+    "pedidos de um cliente em um mês": ("ix_pedidos_cliente_id_d_pedido",),
+    "pedidos pendentes de um cliente em um mês": ("ix_pedidos_cliente_id_d_pedido", "ix_pedidos_status_d_pedido"),
+    "pedidos por status (vários) e data": ("ix_pedidos_status_d_pedido",),
+    "pedidos por data (cursor)": ("ix_pedidos_d_pedido",),
+    "pedidos com período sobreposto": ("ix_pedidos_periodo_fim_periodo_inicio",),
+}
+
+
+def ordenacoes(linhas: list) -> list:
+    """Passos do plano que ordenam todas as linhas lidas."""
+    achados = []
+    for linha in linhas:
+        # PostgreSQL: "Sort" (não "Incremental Sort"); SQLite: "USE TEMP B-TREE FOR ORDER BY"
+        # (não "... FOR RIGHT PART OF ORDER BY")
+        if re.match(r"\s*(->\s*)?Sort\b", linha) or re.search(r"USE TEMP B-TREE FOR ORDER BY", linha):
+            achados.append(linha.strip())
+    return achados
+
+
+def problemas_do_plano(descricao: str, linhas: list) -> list:
+    """
+    Varreduras do plano de uma consulta, as ordenações nas ORDENADAS_PELO_INDICE e o
+    índice esperado (INDICES_ESPERADOS) que o plano não usou.
+    """
+    achados = varreduras(linhas)
+    if descricao in ORDENADAS_PELO_INDICE:
+        achados += ordenacoes(linhas)
+    esperados = INDICES_ESPERADOS.get(descricao)
+    if esperados and not any(re.search(rf"\b{nome}\b", linha) for nome in esperados for linha in linhas):
+        achados.append(f"não usa {' nem '.join(esperados)}")
+    return achados
+
+
+def preparar(conn):
+    """Ajustes da conexão usada nos EXPLAIN."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SET enable_seqscan = off"))
+
+
+def main() -> int:
+    models.Base.metadata.create_all(bind=engine)
+    problemas = 0
+
+    print("Chaves estrangeiras sem índice:")
+    fks = chaves_sem_indice()
+    for fk in fks:
+        print(f"  SEM ÍNDICE  {fk}")
+    if not fks:
+        print("  nenhuma")
+    problemas += len(fks)
+
+    print("\nPlanos das consultas:")
+    with engine.connect() as conn:
+        preparar(conn)
+        for descricao, stmt in consultas_representativas():
+            if descricao in SO_POSTGRESQL and conn.dialect.name != "postgresql":
+                print(f"  ignorada    {descricao} (só no PostgreSQL)")
+                continue
+            achados = problemas_do_plano(descricao, plano(conn, stmt))
+            if achados:
+                problemas += 1
+                print(f"  SEM ÍNDICE  {descricao}: {'; '.join(achados)}")
+            else:
+                print(f"  ok          {descricao}")
+
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
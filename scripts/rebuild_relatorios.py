@@ -0,0 +1,78 @@
+"""
+Reconstrói as tabelas de agregados dos relatórios (relatorio_*) a partir dos pedidos.
+
+Use depois da migração que cria as tabelas (backfill) ou para corrigir um desvio.
+A reconstrução roda em uma única transação: os relatórios continuam respondendo
+com os valores antigos até o commit.
+
+Uso:
+    python -m scripts.rebuild_relatorios
+    python -m scripts.rebuild_relatorios --verificar   # só compara, sem gravar
+
+Com --verificar termina com código 1 se os agregados gravados divergirem dos pedidos.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import select
+
+import app.models as models
+from app.crud.relatorios import reconstruir_relatorios
+from app.database import SessionLocal, engine
+
+TABELAS = (
+    (models.RelatorioVendasDiaOrm, "dia", ("pedidos", "itens", "receita")),
+    (models.RelatorioVendasProdutoOrm, "produto_id", ("quantidade", "receita")),
+    (models.RelatorioPedidosStatusOrm, "status", ("pedidos",)),
+)
+
+
+def conteudo(db) -> dict:
+    """{tabela: {chave: valores}} sem as linhas zeradas."""
+    tabelas = {}
+    for orm, key, columns in TABELAS:
+        rows = db.execute(select(getattr(orm, key), *(getattr(orm, c) for c in columns)))
+        tabelas[orm.__tablename__] = {
+            row[0]: tuple(round(v, 2) for v in row[1:]) for row in rows if any(row[1:])
+        }
+    return tabelas
+
+
+def diferencas(atual: dict, esperado: dict) -> list:
+    linhas = []
+    for tabela in esperado:
+        for chave in sorted(set(atual[tabela]) | set(esperado[tabela]), key=str):
+            if atual[tabela].get(chave) != esperado[tabela].get(chave):
+                linhas.append(f"{tabela}[{chave}]: gravado {atual[tabela].get(chave)}, esperado {esperado[tabela].get(chave)}")
+    return linhas
+
+
+def run(verificar: bool, batch_size: int) -> int:
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        atual = conteudo(db) if verificar else None
+
+        inicio = time.perf_counter()
+        variacao = reconstruir_relatorios(db, batch_size=batch_size)
+        duracao = time.perf_counter() - inicio
+
+        if verificar:
+            divergencias = diferencas(atual, conteudo(db))
+            db.rollback()
+            for linha in divergencias:
+                print(linha)
+            print("OK: agregados consistentes" if not divergencias else f"FALHA: {len(divergencias)} divergência(s)")
+            return 1 if divergencias else 0
+
+        db.commit()
+        print(f"relatórios reconstruídos em {duracao:.2f}s: {len(variacao.dias)} dia(s), {len(variacao.produtos)} produto(s)")
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verificar", action="store_true", help="compara os agregados gravados com os pedidos, sem gravar")
+    parser.add_argument("--batch-size", type=int, default=1000, help="pedidos lidos por lote")
+    args = parser.parse_args()
+    sys.exit(run(args.verificar, args.batch_size))
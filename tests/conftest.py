@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+
+# A aplicação lê a configuração ao ser importada: o banco dos testes é definido antes.
+# TEST_DATABASE_URL aponta para um PostgreSQL descartável (os testes de plano e de
+# concorrência específicos dele só rodam assim); sem ela, um SQLite temporário.
+_tmp = tempfile.mkdtemp(prefix="demo-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_tmp}/test.db"
+os.environ.setdefault("STORAGE_DIR", os.path.join(_tmp, "media"))
+os.environ["CACHE_BACKEND"] = "memory"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.idempotency as idempotency
+import app.worker as worker
+from app import models
+from app.cache import LRUTTLCache
+from app.crud.cliente_crud import cliente_cache
+from app.crud.produto_crud import produto_cache
+from app.database import SessionLocal, engine
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def banco_limpo():
+    """Cada teste começa com as tabelas vazias (e os ids de volta a 1) e os caches vazios."""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    for cache in (produto_cache, cliente_cache):
+        cache.backend = LRUTTLCache()
+    idempotency._respostas = LRUTTLCache()
+    yield
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def dados(client):
+    """Um cliente e dois produtos (estoque 5 e 3) criados pela API."""
+    cliente = client.post("/api/v1/clientes/cliente", json={"nome": "Ana", "email": "ana@exemplo.com", "cpf": "111.111.111-11"})
+    produtos = [
+        client.post("/api/v1/produtos/produto", json={"nome": "Arroz", "descricao": "Arroz branco", "preco": 10.5, "cod_barras": "7891234567895", "estoque": 5, "imagens": [{"url": "http://x/1.jpg"}]}),
+        client.post("/api/v1/produtos/produto", json={"nome": "Feijão", "descricao": "Feijão preto", "preco": 8, "cod_barras": "7891234567896", "estoque": 3}),
+    ]
+    assert cliente.status_code == 201 and all(r.status_code == 201 for r in produtos)
+    return {"cliente": cliente.json()["data"], "produtos": [r.json()["data"] for r in produtos]}
+
+
+@pytest.fixture
+def rodar_worker(monkeypatch):
+    """Executa no próprio processo, como um processo do pool do app.worker, os jobs pendentes."""
+    monkeypatch.setattr(worker, "_parar", threading.Event())
+    return lambda: worker.executar_worker(ate_esvaziar=True)
@@ -0,0 +1,23 @@
+from app.database import assert_max_queries
+
+
+def test_ids_na_ordem_pedida_com_ausentes(client, dados):
+    r = client.get("/api/v1/produtos/produto?ids=2,9,1,2")
+    assert r.status_code == 200
+    assert [p["id"] for p in r.json()["data"]] == [2, 1]
+    assert r.json()["missing"] == [9]
+
+    r = client.post("/api/v1/clientes/cliente/batch-get", json={"ids": [7, 1]})
+    assert [c["nome"] for c in r.json()["data"]] == ["Ana"]
+    assert r.json()["missing"] == [7]
+
+
+def test_batch_get_em_uma_consulta(client, dados):
+    with assert_max_queries(2):
+        r = client.post("/api/v1/produtos/produto/batch-get", json={"ids": [1, 2]})
+    assert [len(p["imagens"]) for p in r.json()["data"]] == [1, 0]
+
+
+def test_limite_de_ids(client):
+    assert client.get("/api/v1/produtos/produto?ids=" + ",".join(map(str, range(1, 102)))).status_code == 422
+    assert client.post("/api/v1/produtos/produto/batch-get", json={"ids": []}).status_code == 422
@@ -0,0 +1,53 @@
+import json
+
+from sqlalchemy import func, select
+
+import app.models as models
+
+
+def test_lote_de_clientes_reporta_cada_item(client, db):
+    lote = [
+        {"nome": "Ana", "email": "ana@exemplo.com", "cpf": "1"},
+        {"nome": "Bia", "email": "ana@exemplo.com", "cpf": "2"},
+        {"nome": "Caio"},
+        {"nome": "Duda", "email": "duda@exemplo.com", "cpf": "4"},
+    ]
+    r = client.post("/api/v1/clientes/cliente/bulk", json=lote)
+    assert r.status_code == 200
+    corpo = r.json()
+    assert (corpo["criados"], corpo["conflitos"], corpo["erros"]) == (2, 1, 1)
+    assert [item["status"] for item in corpo["data"]] == ["criado", "conflito", "erro", "criado"]
+
+    # O e-mail já existe no banco: conflito, sem abortar o resto
+    r = client.post("/api/v1/clientes/cliente/bulk", json=[lote[0], {"nome": "Eva", "email": "eva@exemplo.com", "cpf": "5"}])
+    assert [item["status"] for item in r.json()["data"]] == ["conflito", "criado"]
+    assert db.scalar(select(func.count()).select_from(models.ClienteOrm)) == 3
+
+
+def test_lote_de_produtos_em_ndjson(client):
+    linhas = [
+        {"nome": f"Produto {i}", "descricao": "d", "preco": 1, "cod_barras": f"{i:013d}", "estoque": 1}
+        for i in range(5)
+    ]
+    corpo = "\n".join(json.dumps(linha) for linha in linhas) + "\n{nao e json}\n"
+    r = client.post("/api/v1/produtos/produto/bulk", content=corpo, headers={"Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200
+    assert (r.json()["criados"], r.json()["erros"]) == (5, 1)
+    assert [item["index"] for item in r.json()["data"]] == list(range(6))
+    assert len(client.get("/api/v1/produtos/produto?limit=100").json()["data"]) == 5
+
+
+def test_lote_de_pedidos_reserva_estoque(client, dados):
+    lote = [
+        {"cliente_id": 1, "produtos": [{"produto_id": 1, "quantidade": 3}]},
+        {"cliente_id": 1, "produtos": [{"produto_id": 1, "quantidade": 3}]},
+        {"cliente_id": 99, "produtos": [{"produto_id": 2, "quantidade": 1}]},
+    ]
+    r = client.post("/api/v1/pedidos/pedido/bulk", json=lote)
+    assert [item["status"] for item in r.json()["data"]][0] == "criado"
+    assert r.json()["criados"] == 1
+    assert client.get("/api/v1/produtos/produto/1").json()["data"]["estoque"] == 2
+
+
+def test_corpo_que_nao_e_lista(client):
+    assert client.post("/api/v1/clientes/cliente/bulk", json={"nome": "Ana"}).status_code == 400
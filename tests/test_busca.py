@@ -0,0 +1,44 @@
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import app.crud.search as search
+import app.models as models
+
+
+def criar_produtos(client):
+    for i, nome in enumerate(["Arroz integral", "Feijão com arroz", "Arroz branco", "Macarrão"]):
+        r = client.post("/api/v1/produtos/produto", json={
+            "nome": nome, "descricao": "d", "preco": 1, "cod_barras": f"{7891000000000 + i}", "estoque": 1,
+        })
+        assert r.status_code == 201
+
+
+def nomes(client, url):
+    r = client.get(url)
+    assert r.status_code == 200, r.text
+    return [produto["nome"] for produto in r.json()["data"]]
+
+
+def test_busca_ordena_por_relevancia_e_pagina(client):
+    criar_produtos(client)
+    assert nomes(client, "/api/v1/produtos/produto?search=arroz") == ["Arroz integral", "Arroz branco", "Feijão com arroz"]
+    assert nomes(client, "/api/v1/produtos/produto?search=arroz&limit=2&page=2") == ["Feijão com arroz"]
+    # O código de barras exato vai para o topo
+    assert nomes(client, "/api/v1/produtos/produto?search=7891000000003")[0] == "Macarrão"
+
+
+def test_busca_com_cursor(client):
+    assert client.get("/api/v1/produtos/produto?search=arroz&cursor=x").status_code == 400
+
+
+def test_ranking_postgresql_ordena_so_os_candidatos_knn(monkeypatch):
+    # Cada coluna contribui no máximo `depth` candidatos, na ordem do índice GiST (<->)
+    monkeypatch.setattr(search, "_dialect_name", lambda db: "postgresql")
+    colunas = [models.ProdutoOrm.nome, models.ProdutoOrm.descricao, models.ProdutoOrm.cod_barras]
+    query = search.apply_search(Session().query(models.ProdutoOrm.id), None, " arroz ", colunas, [models.ProdutoOrm.cod_barras], depth=31)
+    sql = " ".join(str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})).split())
+
+    for coluna in ("nome", "descricao", "cod_barras"):
+        assert f"ORDER BY produtos.{coluna} <-> 'arroz' LIMIT 31" in sql
+    assert "similarity" not in sql
+    assert sql.endswith("least(produtos.nome <-> 'arroz', produtos.descricao <-> 'arroz', produtos.cod_barras <-> 'arroz')")
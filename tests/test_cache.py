@@ -0,0 +1,163 @@
+import asyncio
+
+from pydantic import BaseModel
+
+from app.cache import CACHE_REQUESTS, MISS, LRUTTLCache, ReadThroughCache, RedisCache, aplicar_remocoes, remocoes_fora_da_loop
+from app.database import assert_max_queries
+
+
+class Item(BaseModel):
+    id: int
+    nome: str
+
+
+class RedisEmMemoria:
+    """Substituto do redis.Redis (get/set(ex=, nx=)/delete), compartilhado pelos "processos"."""
+
+    def __init__(self):
+        self.dados = {}
+
+    def get(self, key):
+        return self.dados.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.dados:
+            return None
+        self.dados[key] = value
+        return True
+
+    def delete(self, key):
+        self.dados.pop(key, None)
+
+
+def test_misses_concorrentes_fazem_uma_carga():
+    cache = ReadThroughCache("item", Item, backend=LRUTTLCache())
+    cargas = []
+
+    async def loader():
+        cargas.append(1)
+        await asyncio.sleep(0.01)
+        return Item(id=1, nome="a")
+
+    async def cenario():
+        return await asyncio.gather(*(cache.get_or_load("1", loader) for _ in range(10)))
+
+    assert [item.nome for item in asyncio.run(cenario())] == ["a"] * 10
+    assert len(cargas) == 1
+    assert cache.backend.get(1) == Item(id=1, nome="a")
+
+
+def test_escrita_durante_a_carga_nao_grava_o_valor_antigo():
+    cache = ReadThroughCache("item", Item, backend=LRUTTLCache())
+
+    async def cenario():
+        leu = asyncio.Event()
+
+        async def loader():
+            leu.set()
+            await asyncio.sleep(0.01)
+            return Item(id=1, nome="antigo")
+
+        carga = asyncio.create_task(cache.get_or_load(1, loader))
+        await leu.wait()
+        cache.invalidate(1)
+        assert (await carga).nome == "antigo"
+
+    asyncio.run(cenario())
+    assert cache.backend.get(1) is MISS
+    assert cache._inflight == {}
+
+
+def test_invalidacoes_nao_acumulam_estado():
+    cache = ReadThroughCache("item", Item, backend=LRUTTLCache(maxsize=10))
+
+    async def cenario():
+        for i in range(1000):
+            await cache.get_or_load(i, lambda: asyncio.sleep(0, Item(id=i, nome="x")))
+            cache.invalidate(i)
+
+    asyncio.run(cenario())
+    assert cache._inflight == {}
+    assert len(cache.backend._data) == 0
+
+
+def test_redis_invalida_para_todos_os_processos():
+    servidor = RedisEmMemoria()
+    api_1 = ReadThroughCache("item", Item, backend=RedisCache(servidor, Item, prefix="item"))
+    api_2 = ReadThroughCache("item", Item, backend=RedisCache(servidor, Item, prefix="item"))
+    valor = {"nome": "antigo"}
+
+    async def loader():
+        return Item(id=1, **valor)
+
+    async def ler(cache):
+        return (await cache.get_or_load(1, loader)).nome
+
+    assert asyncio.run(ler(api_1)) == "antigo"
+    valor["nome"] = "novo"
+    assert asyncio.run(ler(api_2)) == "antigo"
+    # A escrita feita em um processo invalida a chave lida pelo outro
+    api_1.invalidate(1)
+    assert asyncio.run(ler(api_2)) == "novo"
+
+
+def test_carga_de_outro_processo_nao_sobrescreve_a_invalidacao():
+    servidor = RedisEmMemoria()
+    api_1 = ReadThroughCache("item", Item, backend=RedisCache(servidor, Item, prefix="item"))
+    api_2 = ReadThroughCache("item", Item, backend=RedisCache(servidor, Item, prefix="item"))
+
+    async def cenario():
+        leu = asyncio.Event()
+
+        async def loader():
+            leu.set()
+            await asyncio.sleep(0.01)
+            return Item(id=1, nome="antigo")
+
+        # O processo 1 lê antes da escrita; o 2 comita e invalida antes da gravação do 1
+        carga = asyncio.create_task(api_1.get_or_load(1, loader))
+        await leu.wait()
+        api_2.invalidate(1)
+        assert (await carga).nome == "antigo"
+        return await api_2.get_or_load(1, lambda: asyncio.sleep(0, Item(id=1, nome="novo")))
+
+    assert asyncio.run(cenario()).nome == "novo"
+    assert api_1.backend.get(1) is MISS
+
+
+def test_remocao_bloqueante_sai_da_event_loop():
+    servidor = RedisEmMemoria()
+    cache = ReadThroughCache("item", Item, backend=RedisCache(servidor, Item, prefix="item"))
+    cache.backend.set(1, Item(id=1, nome="antigo"))
+
+    async def cenario():
+        with remocoes_fora_da_loop() as remocoes:
+            cache.invalidate(1)
+        # Nada foi enviado ao Redis de dentro da loop
+        assert cache.backend.get(1).nome == "antigo"
+        await aplicar_remocoes(remocoes)
+
+    asyncio.run(cenario())
+    assert cache.backend.get(1) is MISS
+
+
+def test_get_por_id_le_do_cache_e_a_escrita_invalida(client, dados):
+    assert client.get("/api/v1/produtos/produto/1").json()["data"]["preco"] == 10.5
+    with assert_max_queries(0):
+        assert client.get("/api/v1/produtos/produto/1").status_code == 200
+    client.patch("/api/v1/produtos/produto/1", json={"preco": 12})
+    assert client.get("/api/v1/produtos/produto/1").json()["data"]["preco"] == 12
+
+    client.get("/api/v1/clientes/cliente/1")
+    with assert_max_queries(0):
+        assert client.get("/api/v1/clientes/cliente/1").status_code == 200
+    client.delete("/api/v1/clientes/cliente/1")
+    assert client.get("/api/v1/clientes/cliente/1").status_code == 404
+
+
+def test_cache_conta_hits_e_misses(client, dados):
+    hits, misses = CACHE_REQUESTS.value(cache="produto", result="hit"), CACHE_REQUESTS.value(cache="produto", result="miss")
+    client.get("/api/v1/produtos/produto/1")
+    client.get("/api/v1/produtos/produto/1")
+    assert CACHE_REQUESTS.value(cache="produto", result="miss") == misses + 1
+    assert CACHE_REQUESTS.value(cache="produto", result="hit") == hits + 1
\ No newline at end of file
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+import app.models as models
+from app.crud.cliente_crud import delete_cliente_crud
+from app.database import count_queries
+from tests.utils import criar_pedido
+
+
+def remover_com_pedidos(client, db, pedidos: int) -> int:
+    """Consultas de DELETE /cliente com `pedidos` pedidos de 2 linhas cada."""
+    r = client.post("/api/v1/clientes/cliente", json={"nome": "Bia", "email": f"bia{pedidos}@exemplo.com", "cpf": f"{pedidos:011d}"})
+    cliente_id = r.json()["data"]["id"]
+    for _ in range(pedidos):
+        assert criar_pedido(client, cliente_id, (1, 1), (2, 1)).status_code == 201
+    with count_queries() as contador:
+        assert client.delete(f"/api/v1/clientes/cliente/{cliente_id}").status_code == 202
+    db.rollback()
+    assert db.scalar(select(func.count()).select_from(models.PedidoOrm).where(models.PedidoOrm.cliente_id == cliente_id)) == 0
+    return contador.count
+
+
+def test_remocao_em_conjunto_nao_depende_do_numero_de_pedidos(client, dados, db):
+    client.patch("/api/v1/produtos/produto/1", json={"estoque": 100})
+    client.patch("/api/v1/produtos/produto/2", json={"estoque": 100})
+    assert remover_com_pedidos(client, db, 1) == remover_com_pedidos(client, db, 20)
+    assert db.scalar(select(func.count()).select_from(models.PedidoProdutoOrm)) == 0
+
+
+@pytest.mark.parametrize("cliente_id", ["9", "abc"])
+def test_remocao_de_cliente_inexistente(client, cliente_id):
+    assert client.delete(f"/api/v1/clientes/cliente/{cliente_id}").status_code == 404
+
+
+def test_remocao_de_cliente_inexistente_encerra_a_transacao(db):
+    with pytest.raises(HTTPException):
+        delete_cliente_crud(9, db)
+    assert not db.in_transaction()
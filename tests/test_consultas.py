@@ -0,0 +1,61 @@
+import pytest
+
+from app.database import assert_max_queries
+from tests.utils import criar_pedido
+
+
+# Consultas SQL por requisição em cada leitura, com páginas cheias (10 itens, cada um
+# com imagens ou linhas): um relacionamento carregado item a item (N+1) passa do limite.
+# Os limites são os do cache frio; cada item extra de uma página não pode somar consultas.
+LEITURAS = [
+    ("/api/v1/produtos/produto/1", 1),
+    ("/api/v1/produtos/produto", 2),
+    ("/api/v1/produtos/produto?include=imagens&fields=id,nome", 2),
+    ("/api/v1/produtos/produto?fields=id,nome,preco", 1),
+    ("/api/v1/produtos/produto?search=produto", 2),
+    ("/api/v1/produtos/produto?ids=1,2,3,4,5,6,7,8,9,10,11,12", 2),
+    ("/api/v1/clientes/cliente/1", 1),
+    ("/api/v1/clientes/cliente", 1),
+    ("/api/v1/clientes/cliente?search=cliente", 1),
+    ("/api/v1/clientes/cliente?ids=1,2,3,4,5,6,7,8,9,10,11,12", 1),
+    ("/api/v1/pedidos/pedido/1", 1),
+    ("/api/v1/pedidos/pedido", 2),
+    ("/api/v1/pedidos/pedido?cliente_id=1&status=pendente&order_by=-d_pedido", 2),
+    ("/api/v1/pedidos/pedido?fields=id,total", 1),
+    ("/api/v1/pedidos/pedido?include=produtos", 2),
+    ("/api/v1/relatorios/vendas-por-dia", 1),
+    ("/api/v1/relatorios/produtos-mais-vendidos", 1),
+    ("/api/v1/relatorios/pedidos-por-status", 1),
+    ("/api/v1/produtos/export", 1),
+    ("/api/v1/pedidos/export", 1),
+    ("/api/v1/pedidos/export?format=csv", 1),
+    ("/api/v1/jobs/job", 1),
+]
+
+
+@pytest.fixture
+def catalogo(client):
+    for i in range(12):
+        r = client.post("/api/v1/clientes/cliente", json={"nome": f"Cliente {i}", "email": f"c{i}@exemplo.com", "cpf": f"{i:011d}"})
+        assert r.status_code == 201
+        r = client.post("/api/v1/produtos/produto", json={
+            "nome": f"Produto {i}", "descricao": "d", "preco": 1 + i, "cod_barras": f"{i:013d}", "estoque": 100,
+            "imagens": [{"url": f"http://x/{i}-a.jpg"}, {"url": f"http://x/{i}-b.jpg"}],
+        })
+        assert r.status_code == 201
+    for i in range(12):
+        r = criar_pedido(client, 1 + i % 3, (1 + i, 1), (1 + (i + 1) % 12, 2), (1 + (i + 2) % 12, 1))
+        assert r.status_code == 201
+
+
+@pytest.mark.parametrize("url,limite", LEITURAS)
+def test_leituras_sem_n_mais_1(client, catalogo, url, limite):
+    with assert_max_queries(limite):
+        r = client.get(url)
+    assert r.status_code == 200, r.text
+
+
+def test_assert_max_queries_falha_acima_do_limite(client, catalogo):
+    with pytest.raises(AssertionError, match="Esperado no máximo 1 consulta"):
+        with assert_max_queries(1):
+            client.get("/api/v1/produtos/produto")
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.database as database
+from app.crud.produto_crud import get_produto_crud
+from app.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+
+def test_crud_sincrono_roda_sobre_a_async_session(client, dados):
+    # O mesmo CRUD das rotas, pelo run_sync da AsyncSession (modo DATABASE_ASYNC)
+    async def buscar():
+        async_engine = create_async_engine(database.async_database_url(database.SQLALCHEMY_DATABASE_URL))
+        try:
+            async with AsyncSession(async_engine) as session:
+                return await database.DatabaseSession(session).run(get_produto_crud, produto_id=1)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(buscar()).data.nome == "Arroz"
+
+
+def test_url_do_driver_assincrono():
+    assert database.async_database_url("postgresql://u:s@db/demo").drivername == "postgresql+asyncpg"
+    assert database.async_database_url("postgresql+psycopg2://u:s@db/demo").drivername == "postgresql+asyncpg"
+    assert database.async_database_url("sqlite:///x.db").drivername == "sqlite+aiosqlite"
+    with pytest.raises(ValueError):
+        database.async_database_url("mysql://u:s@db/demo")
+
+
+def test_opcoes_do_pool(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 3)
+    opcoes = database.engine_options("postgresql://u:s@db/demo")
+    assert opcoes["poolclass"] is InstrumentedQueuePool
+    assert (opcoes["pool_size"], opcoes["max_overflow"], opcoes["pool_pre_ping"]) == (7, 3, True)
+    assert database.engine_options("postgresql://u:s@db/demo", is_async=True)["poolclass"] is InstrumentedAsyncQueuePool
+    # SQLite em memória tem o próprio pool de conexão única
+    assert database.engine_options("sqlite://") == {}
+
+
+def test_pgbouncer_desliga_prepared_statements_do_asyncpg(monkeypatch):
+    monkeypatch.setattr(database, "DB_PGBOUNCER", True)
+    connect_args = database.engine_options("postgresql://u:s@db/demo", is_async=True)["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_name_func"]() != connect_args["prepared_statement_name_func"]()
+    assert "connect_args" not in database.engine_options("postgresql://u:s@db/demo")
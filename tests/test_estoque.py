@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import app.schemas.pedido_schema as pedido_schemas
+from app.crud.cliente_crud import delete_cliente_pedidos_lote_crud
+from app.crud.pedido_crud import create_pedido_crud
+from app.database import SessionLocal, count_queries
+from tests.utils import criar_pedido, estoque
+
+
+def test_pedido_reserva_e_remocao_devolve_estoque(client, dados):
+    assert estoque(client, 1) == 5
+    r = criar_pedido(client, 1, (1, 2), (1, 3), (2, 1))
+    assert r.status_code == 201
+    assert (estoque(client, 1), estoque(client, 2)) == (0, 2)
+
+    r = client.delete(f"/api/v1/pedidos/pedido/{r.json()['data']['id']}")
+    assert r.status_code == 202
+    # A leitura anterior ficou no cache: só vem o estoque devolvido se ele foi invalidado
+    assert (estoque(client, 1), estoque(client, 2)) == (5, 3)
+
+
+def test_remocao_de_pedido_cancelado_nao_devolve_de_novo(client, dados):
+    pedido_id = criar_pedido(client, 1, (1, 2)).json()["data"]["id"]
+    assert client.patch(f"/api/v1/pedidos/pedido/{pedido_id}", json={"status": "cancelado"}).status_code == 202
+    assert estoque(client, 1) == 5
+    assert client.delete(f"/api/v1/pedidos/pedido/{pedido_id}").status_code == 202
+    assert estoque(client, 1) == 5
+
+
+def test_remocao_de_pedido_inexistente(client, dados):
+    assert client.delete("/api/v1/pedidos/pedido/99").status_code == 404
+
+
+def test_sem_estoque_nao_cria_pedido(client, dados):
+    r = criar_pedido(client, 1, (1, 2), (2, 4))
+    assert r.status_code == 409
+    assert (estoque(client, 1), estoque(client, 2)) == (5, 3)
+
+
+def test_remocao_do_cliente_devolve_estoque(client, dados):
+    criar_pedido(client, 1, (1, 2), (2, 1))
+    criar_pedido(client, 1, (1, 1))
+    cancelado = criar_pedido(client, 1, (2, 2)).json()["data"]["id"]
+    client.patch(f"/api/v1/pedidos/pedido/{cancelado}", json={"status": "cancelado"})
+    assert (estoque(client, 1), estoque(client, 2)) == (2, 2)
+
+    assert client.delete("/api/v1/clientes/cliente/1").status_code == 202
+    assert client.get("/api/v1/pedidos/pedido").json()["data"] == []
+    assert (estoque(client, 1), estoque(client, 2)) == (5, 3)
+
+
+def test_remocao_em_lotes_devolve_estoque(client, dados, db):
+    for _ in range(3):
+        criar_pedido(client, 1, (1, 1), (2, 1))
+    assert (estoque(client, 1), estoque(client, 2)) == (2, 0)
+
+    assert delete_cliente_pedidos_lote_crud(1, 2, db) == 2
+    assert (estoque(client, 1), estoque(client, 2)) == (4, 2)
+    assert delete_cliente_pedidos_lote_crud(1, 2, db) == 1
+    assert (estoque(client, 1), estoque(client, 2)) == (5, 3)
+
+
+def test_checkouts_concorrentes_nao_vendem_alem_do_estoque(client, dados):
+    # 12 checkouts de 1 unidade disputando as 3 unidades do produto 2, cada um na sua
+    # sessão (e conexão): exatamente 3 passam, os demais recebem 409
+    payload = pedido_schemas.PedidoCreateModel(cliente_id=1, produtos=[{"produto_id": 2, "quantidade": 1}])
+    inicio = threading.Barrier(12)
+    resultados = []
+
+    def checkout():
+        with SessionLocal() as db:
+            inicio.wait()
+            try:
+                create_pedido_crud(payload, db)
+                resultados.append(201)
+            except HTTPException as e:
+                resultados.append(e.status_code)
+
+    threads = [threading.Thread(target=checkout) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(resultados) == [201] * 3 + [409] * 9
+    assert estoque(client, 2) == 0
+    assert len(client.get("/api/v1/pedidos/pedido").json()["data"]) == 3
+
+
+@pytest.mark.parametrize("status_inicial", ["pendente", "cancelado"])
+def test_reativar_ou_trocar_linhas_respeita_o_estoque(client, dados, status_inicial):
+    pedido_id = criar_pedido(client, 1, (2, 2), status=status_inicial).json()["data"]["id"]
+    r = client.patch(f"/api/v1/pedidos/pedido/{pedido_id}", json={"status": "pendente", "produtos": [{"produto_id": 2, "quantidade": 4}]})
+    assert r.status_code == 409
+    r = client.patch(f"/api/v1/pedidos/pedido/{pedido_id}", json={"status": "pendente", "produtos": [{"produto_id": 2, "quantidade": 3}]})
+    assert r.status_code == 202
+    assert estoque(client, 2) == 0
+
+
+def remover_produto_com_pedidos(client, pedidos: int) -> int:
+    """Consultas de DELETE /produto com `pedidos` pedidos de uma linha do produto."""
+    r = client.post("/api/v1/produtos/produto", json={"nome": "Milho", "descricao": "d", "preco": 2, "cod_barras": f"{pedidos:013d}", "estoque": pedidos})
+    produto_id = r.json()["data"]["id"]
+    pedido_id = criar_pedido(client, 1, (produto_id, 1), (2, 1)).json()["data"]["id"]
+    for _ in range(pedidos - 1):
+        assert criar_pedido(client, 1, (produto_id, 1)).status_code == 201
+    with count_queries() as contador:
+        assert client.delete(f"/api/v1/produtos/produto/{produto_id}").status_code == 202
+    # O pedido fica só com as linhas dos outros produtos, e o total sem as removidas
+    pedido = client.get(f"/api/v1/pedidos/pedido/{pedido_id}").json()["data"]
+    assert ([p["produto_id"] for p in pedido["produtos"]], pedido["total"]) == ([2], 8)
+    # Os pedidos afetados são travados antes de qualquer escrita
+    assert contador.statements[0].startswith("SELECT pedidos.id")
+    # As linhas não são carregadas na sessão para o cascade do ORM
+    assert not [sql for sql in contador.statements if sql.startswith("SELECT pedido_produtos.id")]
+    return contador.count
+
+
+def test_remocao_de_produto_apaga_as_linhas_em_conjunto(client, dados):
+    client.patch("/api/v1/produtos/produto/2", json={"estoque": 100})
+    assert remover_produto_com_pedidos(client, 1) == remover_produto_com_pedidos(client, 20)
+
+
+def test_remocao_de_produto_inexistente(client):
+    assert client.delete("/api/v1/produtos/produto/9").status_code == 404
@@ -0,0 +1,55 @@
+def test_get_condicional_responde_304(client, dados):
+    r = client.get("/api/v1/produtos/produto/1")
+    etag = r.headers["ETag"]
+    assert etag == '"1"'
+
+    r = client.get("/api/v1/produtos/produto/1", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert client.get("/api/v1/produtos/produto/1", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    client.patch("/api/v1/produtos/produto/1", json={"estoque": 9})
+    r = client.get("/api/v1/produtos/produto/1", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] == '"2"'
+
+
+def test_lista_condicional(client, dados):
+    etag = client.get("/api/v1/produtos/produto").headers["ETag"]
+    assert client.get("/api/v1/produtos/produto", headers={"If-None-Match": etag}).status_code == 304
+    # Outra projeção da mesma página é outra representação
+    assert client.get("/api/v1/produtos/produto?fields=id,nome", headers={"If-None-Match": etag}).status_code == 200
+    client.patch("/api/v1/produtos/produto/2", json={"nome": "Feijão carioca"})
+    assert client.get("/api/v1/produtos/produto", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_patch_com_if_match_desatualizado_responde_412(client, dados):
+    etag = client.get("/api/v1/produtos/produto/2").headers["ETag"]
+    r = client.patch("/api/v1/produtos/produto/2", json={"nome": "Feijão carioca"}, headers={"If-Match": etag})
+    assert r.status_code == 202
+    assert r.headers["ETag"] == '"2"'
+
+    # Outra requisição com a versão antiga não sobrescreve a alteração
+    r = client.patch("/api/v1/produtos/produto/2", json={"nome": "Feijão preto"}, headers={"If-Match": etag})
+    assert r.status_code == 412
+    assert client.get("/api/v1/produtos/produto/2").json()["data"]["nome"] == "Feijão carioca"
+
+    assert client.patch("/api/v1/produtos/produto/2", json={"nome": "Feijão preto"}, headers={"If-Match": "*"}).status_code == 202
+    assert client.patch("/api/v1/produtos/produto/2", json={"nome": "Feijão"}, headers={"If-Match": 'W/"3"'}).status_code == 412
+
+
+def test_cliente_com_if_match(client, dados):
+    etag = client.get("/api/v1/clientes/cliente/1").headers["ETag"]
+    cliente = {"nome": "Ana Maria", "email": "ana@exemplo.com", "cpf": "111.111.111-11", "ativo": True}
+    assert client.patch("/api/v1/clientes/cliente/1", json=cliente, headers={"If-Match": etag}).status_code == 202
+    assert client.patch("/api/v1/clientes/cliente/1", json={**cliente, "nome": "Ana"}, headers={"If-Match": etag}).status_code == 412
+    assert client.get("/api/v1/clientes/cliente/1").json()["data"]["nome"] == "Ana Maria"
+
+
+def test_pedido_com_if_match(client, dados):
+    pedido_id = client.post("/api/v1/pedidos/pedido", json={"cliente_id": 1, "produtos": [{"produto_id": 1, "quantidade": 1}]}).json()["data"]["id"]
+    r = client.patch(f"/api/v1/pedidos/pedido/{pedido_id}", json={"status": "cancelado"}, headers={"If-Match": '"9"'})
+    assert r.status_code == 412
+    assert client.get("/api/v1/produtos/produto/1").json()["data"]["estoque"] == 4
+
+
+def test_patch_de_inexistente(client):
+    assert client.patch("/api/v1/produtos/produto/9", json={"nome": "x"}, headers={"If-Match": '"1"'}).status_code == 404
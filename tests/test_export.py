@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+
+from tests.utils import criar_pedido
+
+
+def test_export_de_produtos(client, dados):
+    r = client.get("/api/v1/produtos/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert r.headers["content-disposition"] == 'attachment; filename="produtos.ndjson"'
+    linhas = [json.loads(linha) for linha in r.text.splitlines()]
+    assert [(p["id"], p["nome"], p["estoque"]) for p in linhas] == [(1, "Arroz", 5), (2, "Feijão", 3)]
+
+    r = client.get("/api/v1/produtos/export?format=csv")
+    linhas = list(csv.DictReader(io.StringIO(r.text)))
+    assert [(p["id"], p["cod_barras"]) for p in linhas] == [("1", "7891234567895"), ("2", "7891234567896")]
+
+
+def test_export_de_pedidos_com_as_linhas(client, dados):
+    criar_pedido(client, 1, (1, 2), (2, 1))
+    criar_pedido(client, 1, (2, 1))
+
+    r = client.get("/api/v1/pedidos/export")
+    pedidos = [json.loads(linha) for linha in r.text.splitlines()]
+    assert [(p["id"], p["total"], [(l["produto_id"], l["quantidade"]) for l in p["produtos"]]) for p in pedidos] == [
+        (1, 29, [(1, 2), (2, 1)]),
+        (2, 8, [(2, 1)]),
+    ]
+
+    r = client.get("/api/v1/pedidos/export?format=csv")
+    linhas = list(csv.DictReader(io.StringIO(r.text)))
+    assert [(l["id"], l["produto_id"], l["preco_unitario"]) for l in linhas] == [("1", "1", "10.5"), ("1", "2", "8.0"), ("2", "2", "8.0")]
+
+
+def test_formato_invalido(client):
+    assert client.get("/api/v1/produtos/export?format=xml").status_code == 422
+
+
+def test_ndjson_serializa_como_a_api(client, dados):
+    criar_pedido(client, 1, (1, 1), d_pedido="2026-01-10T10:00:00.250000Z", status="enviado")
+    exportado = json.loads(client.get("/api/v1/pedidos/export").text.splitlines()[0])
+    pedido = client.get("/api/v1/pedidos/pedido/1").json()["data"]
+    assert (exportado["d_pedido"], exportado["status"], exportado["total"]) == (pedido["d_pedido"], pedido["status"], pedido["total"])
@@ -0,0 +1,117 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+import app.idempotency as idempotency
+import app.models as models
+from app.main import app
+from tests.utils import estoque
+
+
+PEDIDO = {"cliente_id": 1, "produtos": [{"produto_id": 1, "quantidade": 2}]}
+
+
+def total_pedidos(db) -> int:
+    return db.scalar(select(func.count()).select_from(models.PedidoOrm))
+
+
+def test_retentativa_recebe_a_resposta_original(client, dados, db):
+    headers = {"Idempotency-Key": "pedido-1"}
+    primeira = client.post("/api/v1/pedidos/pedido", json=PEDIDO, headers=headers)
+    segunda = client.post("/api/v1/pedidos/pedido", json=PEDIDO, headers=headers)
+
+    assert primeira.status_code == segunda.status_code == 201
+    assert segunda.content == primeira.content
+    assert segunda.headers["Idempotency-Replayed"] == "true"
+    assert "Idempotency-Replayed" not in primeira.headers
+    assert total_pedidos(db) == 1
+    assert estoque(client, 1) == 3
+
+
+def test_mesma_chave_com_outro_corpo(client, dados):
+    headers = {"Idempotency-Key": "pedido-1"}
+    assert client.post("/api/v1/pedidos/pedido", json=PEDIDO, headers=headers).status_code == 201
+    outro = {**PEDIDO, "produtos": [{"produto_id": 2, "quantidade": 1}]}
+    assert client.post("/api/v1/pedidos/pedido", json=outro, headers=headers).status_code == 422
+
+
+def test_erro_nao_e_gravado(client, dados, db):
+    headers = {"Idempotency-Key": "pedido-1"}
+    sem_estoque = {**PEDIDO, "produtos": [{"produto_id": 1, "quantidade": 9}]}
+    assert client.post("/api/v1/pedidos/pedido", json=sem_estoque, headers=headers).status_code == 409
+    # O produto recebe estoque e a retentativa (mesmo corpo) executa de novo
+    client.patch("/api/v1/produtos/produto/1", json={"estoque": 9})
+    r = client.post("/api/v1/pedidos/pedido", json=sem_estoque, headers=headers)
+    assert r.status_code == 201
+    assert "Idempotency-Replayed" not in r.headers
+    assert total_pedidos(db) == 1
+
+
+class Queda(BaseException):
+    """O processo morre: nenhum except Exception roda."""
+
+
+def test_queda_antes_de_gravar_a_resposta_nao_duplica(client, dados, db, monkeypatch):
+    def cai(**kwargs):
+        raise Queda()
+
+    headers = {"Idempotency-Key": "pedido-1"}
+    with monkeypatch.context() as m:
+        m.setattr(idempotency, "gravar_resposta", cai)
+        # Outro "processo" (event loop), que não sobrevive à queda
+        with pytest.raises(Queda):
+            TestClient(app).post("/api/v1/pedidos/pedido", json=PEDIDO, headers=headers)
+
+    # O pedido foi escrito na transação da resposta, que não chegou a ser comitada
+    assert total_pedidos(db) == 0
+    assert estoque(client, 1) == 5
+    reserva = db.scalar(select(models.ChaveIdempotenciaOrm))
+    assert reserva is not None and reserva.status_code is None
+    db.rollback()
+
+    # Vencida a reserva, a retentativa executa uma única vez
+    db.execute(update(models.ChaveIdempotenciaOrm).values(expira_em=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    db.commit()
+    r = client.post("/api/v1/pedidos/pedido", json=PEDIDO, headers=headers)
+    assert r.status_code == 201
+    assert client.post("/api/v1/pedidos/pedido", json=PEDIDO, headers=headers).headers["Idempotency-Replayed"] == "true"
+    assert total_pedidos(db) == 1
+    assert estoque(client, 1) == 3
+
+
+def test_lote_com_chave(client, dados, db):
+    lote = [PEDIDO, PEDIDO, {**PEDIDO, "cliente_id": 99}]
+    headers = {"Idempotency-Key": "lote-1"}
+    primeira = client.post("/api/v1/pedidos/pedido/bulk", json=lote, headers=headers)
+    segunda = client.post("/api/v1/pedidos/pedido/bulk", json=lote, headers=headers)
+    assert primeira.status_code == 200
+    assert (primeira.json()["criados"], primeira.json()["erros"]) == (2, 1)
+    assert segunda.content == primeira.content
+    assert total_pedidos(db) == 2
+
+
+def test_lote_com_chave_acima_do_limite(client, dados, db, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_MAX_BODY_BYTES", 100)
+    monkeypatch.setattr(idempotency.idempotent, "__defaults__", (100,))
+    lote = [PEDIDO] * 3
+    r = client.post("/api/v1/pedidos/pedido/bulk", json=lote, headers={"Idempotency-Key": "lote-1"})
+    assert r.status_code == 413
+    assert total_pedidos(db) == 0
+
+
+def test_stream_ndjson_com_chave_exige_content_length(client, dados, db):
+    def linhas():
+        for _ in range(2):
+            yield (json.dumps(PEDIDO) + "\n").encode()
+
+    headers = {"Content-Type": "application/x-ndjson"}
+    r = client.post("/api/v1/pedidos/pedido/bulk", content=linhas(), headers={**headers, "Idempotency-Key": "lote-1"})
+    assert r.status_code == 411
+    assert total_pedidos(db) == 0
+
+    # Sem a chave, o stream continua sendo lido em lotes
+    r = client.post("/api/v1/pedidos/pedido/bulk", content=linhas(), headers=headers)
+    assert r.status_code == 200 and r.json()["criados"] == 2
@@ -0,0 +1,101 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import app.imagens as imagens
+
+
+@pytest.fixture(autouse=True)
+def pool_na_thread(monkeypatch):
+    # O mesmo processar_imagem, sem subir os processos do pool a cada teste
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(imagens, "_pool", pool)
+    yield
+    pool.shutdown()
+
+
+def png(largura=640, altura=320, cor=(200, 30, 30)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (largura, altura), cor).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def enviar(client, dados, produto_id=1, content_type="image/png"):
+    return client.post(f"/api/v1/produtos/produto/{produto_id}/imagem", content=dados, headers={"Content-Type": content_type})
+
+
+def test_upload_gera_miniaturas(client, dados):
+    r = enviar(client, png())
+    assert r.status_code == 201, r.text
+    imagem = r.json()["data"]
+    assert (imagem["largura"], imagem["altura"], imagem["content_type"]) == (640, 320, "image/png")
+    assert {(m["largura"], m["altura"], m["formato"]) for m in imagem["miniaturas"]} == {
+        (160, 80, "webp"), (160, 80, "avif"), (480, 240, "webp"), (480, 240, "avif"),
+    }
+    assert client.get("/api/v1/produtos/produto/1").json()["data"]["imagens"][-1]["url"] == imagem["url"]
+
+    original = client.get(imagem["url"])
+    assert original.status_code == 200 and original.content == png()
+    assert original.headers["cache-control"] == "public, max-age=31536000, immutable"
+    miniatura = client.get(imagem["miniaturas"][0]["url"])
+    assert Image.open(io.BytesIO(miniatura.content)).width in (160, 480)
+
+    parcial = client.get(imagem["url"], headers={"Range": "bytes=0-7"})
+    assert parcial.status_code == 206 and parcial.content == png()[:8]
+    assert client.get(imagem["url"], headers={"If-None-Match": original.headers["etag"]}).status_code == 304
+
+
+def test_mesmo_arquivo_nao_e_processado_de_novo(client, dados, monkeypatch):
+    primeira = enviar(client, png()).json()["data"]
+    # No mesmo produto: 200 com a imagem que já estava lá
+    r = enviar(client, png())
+    assert r.status_code == 200 and r.json()["data"]["url"] == primeira["url"]
+
+    def falha(*args):
+        raise AssertionError("a imagem já enviada foi processada de novo")
+
+    monkeypatch.setattr(imagens, "processar_imagem", falha)
+    r = enviar(client, png(), produto_id=2)
+    assert r.status_code == 201
+    assert r.json()["data"]["miniaturas"] == primeira["miniaturas"]
+
+
+def test_imagem_pequena_nao_e_ampliada(client, dados):
+    r = enviar(client, png(100, 50))
+    assert {(m["largura"], m["altura"]) for m in r.json()["data"]["miniaturas"]} == {(100, 50)}
+
+
+def test_uploads_recusados(client, dados, monkeypatch):
+    assert enviar(client, b"nao e imagem").status_code == 415
+    assert enviar(client, png(), content_type="text/plain").status_code == 415
+    assert enviar(client, png()[:60]).status_code == 422
+    assert enviar(client, png(), produto_id=9).status_code == 404
+    monkeypatch.setattr(imagens, "IMAGE_MAX_BYTES", 100)
+    assert enviar(client, png()).status_code == 413
+    assert client.get("/api/v1/produtos/imagens/" + "0" * 64 + ".png").status_code == 404
+
+
+def test_falha_na_miniatura_nao_grava_o_original(monkeypatch):
+    def sem_encoder(*args):
+        raise OSError("encoder indisponível")
+
+    monkeypatch.setattr(imagens, "_miniatura", sem_encoder)
+    dados_png = png(cor=(1, 2, 3))
+    hash_ = imagens.content_hash(dados_png)
+    with pytest.raises(OSError):
+        imagens.processar_imagem(dados_png, hash_)
+    assert not imagens.get_storage().exists(imagens.nome_arquivo(hash_, "png"))
+
+
+def test_patch_devolve_as_imagens_na_ordem_enviada(client, dados):
+    enviada = enviar(client, png()).json()["data"]
+    r = client.patch("/api/v1/produtos/produto/1", json={"imagens": [{"url": "http://x/novo.jpg"}, {"url": enviada["url"]}, {"url": "http://x/1.jpg"}]})
+    assert r.status_code == 202, r.text
+    imagens = r.json()["data"]["imagens"]
+    assert [img["url"] for img in imagens] == ["http://x/novo.jpg", enviada["url"], "http://x/1.jpg"]
+    # As mesmas linhas que o GET devolve, com os metadados do upload
+    assert imagens[1] == enviada
+    get = client.get("/api/v1/produtos/produto/1").json()["data"]["imagens"]
+    assert sorted(imagens, key=lambda img: img["url"]) == sorted(get, key=lambda img: img["url"])
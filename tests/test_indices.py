@@ -0,0 +1,67 @@
+import pytest
+
+from app.database import engine
+from scripts.index_advisor import (
+    SO_POSTGRESQL,
+    chaves_sem_indice,
+    consultas_representativas,
+    ordenacoes,
+    plano,
+    preparar,
+    problemas_do_plano,
+    varreduras,
+)
+
+
+# Os planos das consultas das rotas (as de scripts/index_advisor.py) precisam usar um
+# índice: um índice removido, ou que o filtro/ordenação deixou de aproveitar, falha aqui.
+# No PostgreSQL (TEST_DATABASE_URL) todas são checadas; no SQLite, as que não dependem
+# das estatísticas da tabela.
+POSTGRESQL = engine.dialect.name == "postgresql"
+CONSULTAS = consultas_representativas()
+
+
+@pytest.fixture
+def conn():
+    with engine.connect() as conn:
+        preparar(conn)
+        yield conn
+
+
+def test_chaves_estrangeiras_tem_indice():
+    assert chaves_sem_indice() == []
+
+
+@pytest.mark.parametrize("descricao,stmt", CONSULTAS, ids=[descricao for descricao, _ in CONSULTAS])
+def test_plano_usa_indice(conn, descricao, stmt):
+    if descricao in SO_POSTGRESQL and not POSTGRESQL:
+        pytest.skip("plano depende das estatísticas do PostgreSQL")
+    linhas = plano(conn, stmt)
+    assert problemas_do_plano(descricao, linhas) == [], "\n".join(linhas)
+
+
+@pytest.mark.parametrize(
+    "linhas,esperado",
+    [
+        (["Seq Scan on pedidos  (cost=0.00..1.00 rows=1 width=8)"], 1),
+        (["Index Scan using ix_pedidos_cliente_id_d_pedido on pedidos"], 0),
+        (["SCAN pedidos"], 1),
+        (["SCAN pedidos USING INDEX ix_pedidos_d_pedido"], 0),
+        (["SEARCH pedidos USING INDEX ix_pedidos_status_d_pedido (status=?)"], 0),
+    ],
+)
+def test_detecta_varredura(linhas, esperado):
+    assert len(varreduras(linhas)) == esperado
+
+
+@pytest.mark.parametrize(
+    "linhas,esperado",
+    [
+        (["Limit", "  ->  Sort  (cost=1.0..1.1 rows=11 width=8)"], 1),
+        (["Limit", "  ->  Incremental Sort  (cost=1.0..1.1 rows=11 width=8)"], 0),
+        (["USE TEMP B-TREE FOR ORDER BY"], 1),
+        (["USE TEMP B-TREE FOR RIGHT PART OF ORDER BY"], 0),
+    ],
+)
+def test_detecta_ordenacao(linhas, esperado):
+    assert len(ordenacoes(linhas)) == esperado
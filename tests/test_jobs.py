@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+import app.crud.cliente_crud as cliente_crud
+import app.models as models
+import app.worker as worker
+from app.cache import NullCache
+from app.crud.cliente_crud import cliente_cache
+from app.crud.job_crud import JOB_HANDLERS, enfileirar_job
+from app.crud.produto_crud import produto_cache
+from tests.utils import criar_pedido, estoque
+
+
+def test_remocao_de_cliente_grande_vira_job(client, dados, rodar_worker, monkeypatch):
+    monkeypatch.setattr(cliente_crud, "CLIENTE_REMOCAO_LIMITE", 2)
+    for _ in range(3):
+        criar_pedido(client, 1, (1, 1))
+
+    r = client.delete("/api/v1/clientes/cliente/1")
+    assert r.status_code == 202
+    remocao = r.json()["remocao"]
+    assert (remocao["status"], remocao["total_pedidos"]) == ("pendente", 3)
+    # Repetir a remoção devolve o mesmo job
+    assert client.delete("/api/v1/clientes/cliente/1").json()["remocao"]["job_id"] == remocao["job_id"]
+
+    assert rodar_worker() == 1
+    job = client.get(f"/api/v1/jobs/job/{remocao['job_id']}").json()["data"]
+    assert (job["status"], job["progresso"], job["tentativas"]) == ("concluido", 3, 1)
+    assert client.get("/api/v1/clientes/cliente/1").status_code == 404
+    assert estoque(client, 1) == 5
+
+
+def _processo(*args, **env):
+    ambiente = {k: v for k, v in os.environ.items() if not k.startswith("CACHE_")}
+    return subprocess.run([sys.executable, *args], env={**ambiente, **env}, capture_output=True, text=True, timeout=60)
+
+
+def test_sem_backend_compartilhado_o_cache_padrao_e_desligado():
+    r = _processo("-c", "import app.cache as c; print(c.CACHE_BACKEND)")
+    assert r.stdout.strip() == "none", r.stderr
+    r = _processo("-c", "import app.cache as c; print(c.CACHE_BACKEND)", CACHE_URL="redis://cache:6379/0")
+    assert r.stdout.strip() == "redis", r.stderr
+
+
+def test_remocao_feita_pelo_worker_aparece_na_api(client, dados, monkeypatch):
+    # A API e o worker em processos separados, com o cache padrão
+    for cache in (cliente_cache, produto_cache):
+        monkeypatch.setattr(cache, "backend", NullCache())
+    monkeypatch.setattr(cliente_crud, "CLIENTE_REMOCAO_LIMITE", 0)
+    criar_pedido(client, 1, (1, 2))
+    assert client.get("/api/v1/clientes/cliente/1").status_code == 200
+    assert estoque(client, 1) == 3
+    assert client.delete("/api/v1/clientes/cliente/1").status_code == 202
+
+    r = _processo("-m", "app.worker", "--processos", "1", "--ate-esvaziar")
+    assert r.returncode == 0, r.stderr
+    assert client.get("/api/v1/clientes/cliente/1").status_code == 404
+    assert estoque(client, 1) == 5
+
+
+def test_worker_recusa_cache_em_memoria():
+    r = _processo("-m", "app.worker", "--ate-esvaziar", CACHE_BACKEND="memory")
+    assert r.returncode == 2 and "CACHE_BACKEND" in r.stderr
+
+
+def test_importacao_de_catalogo(client, rodar_worker):
+    itens = [{"nome": f"P{i}", "descricao": "d", "preco": 1, "cod_barras": f"{i:013d}", "estoque": 1} for i in range(3)]
+    r = client.post("/api/v1/produtos/produto/importacao", json=itens + [itens[0], {"nome": "x"}])
+    assert r.status_code == 202
+    assert r.headers["Location"] == f"/api/v1/jobs/job/{r.json()['data']['id']}"
+
+    rodar_worker()
+    job = client.get(r.headers["Location"]).json()["data"]
+    assert job["status"] == "concluido"
+    assert (job["resultado"]["criados"], job["resultado"]["conflitos"], job["resultado"]["erros"]) == (3, 1, 1)
+    assert client.get("/api/v1/jobs/job?status=concluido").json()["data"][0]["id"] == job["id"]
+
+
+def test_dois_workers_nao_pegam_o_mesmo_job(db):
+    enfileirar_job(db, "reconstrucao_relatorios")
+    with worker.SessionLocal() as outra:
+        pego = worker.pegar_job(db, "a")
+        assert pego is not None and pego.tentativas == 1
+        assert worker.pegar_job(outra, "b") is None
+
+
+def _abandonar(db, job_id):
+    # O worker parou sem heartbeat há mais de JOBS_TIMEOUT
+    vencido = datetime.now(timezone.utc) - timedelta(seconds=worker.JOBS_TIMEOUT + 1)
+    db.execute(update(models.JobOrm).where(models.JobOrm.id == job_id).values(atualizado_em=vencido))
+    db.commit()
+
+
+def test_job_abandonado_volta_para_a_fila_ate_o_limite(db, monkeypatch):
+    monkeypatch.setattr(worker, "JOBS_MAX_TENTATIVAS", 2)
+    job_id = enfileirar_job(db, "reconstrucao_relatorios").id
+
+    assert worker.pegar_job(db, "a").id == job_id
+    _abandonar(db, job_id)
+    retentativa = worker.pegar_job(db, "b")
+    assert (retentativa.id, retentativa.tentativas) == (job_id, 2)
+
+    # O worker "a" não grava o resultado de um job que já não é dele
+    worker.finalizar_job(job_id, "a", status=worker.CONCLUIDO)
+    db.expire_all()
+    assert db.get(models.JobOrm, job_id).status == worker.EXECUTANDO
+
+    _abandonar(db, job_id)
+    assert worker.pegar_job(db, "c") is None
+    db.expire_all()
+    job = db.get(models.JobOrm, job_id)
+    assert job.status == worker.ERRO and job.detail
+
+
+def test_handler_com_erro(db, rodar_worker, monkeypatch):
+    def falha(db, progresso):
+        raise RuntimeError("sem espaço")
+
+    monkeypatch.setitem(JOB_HANDLERS, "reconstrucao_relatorios", falha)
+    job_id = enfileirar_job(db, "reconstrucao_relatorios").id
+    rodar_worker()
+    db.expire_all()
+    job = db.get(models.JobOrm, job_id)
+    assert (job.status, job.detail) == (worker.ERRO, "sem espaço")
+
+
+def test_job_inexistente(client):
+    assert client.get("/api/v1/jobs/job/9").status_code == 404
@@ -0,0 +1,34 @@
+import re
+
+
+def amostra(texto, nome, **rotulos) -> float:
+    """Valor da série nome{rotulos} no texto de /metrics (0 se ela ainda não existe)."""
+    for linha in texto.splitlines():
+        serie, _, valor = linha.rpartition(" ")
+        if serie.split("{")[0] == nome and all(f'{k}="{v}"' in serie for k, v in rotulos.items()):
+            return float(valor)
+    return 0
+
+
+def test_latencia_e_consultas_por_rota(client, dados):
+    rota = "/api/v1/produtos/produto"
+    contagem = lambda texto: amostra(texto, "http_request_duration_seconds_count", method="GET", route=rota, status="200")
+    inicial = contagem(client.get("/metrics").text)
+
+    client.get(f"{rota}?limit=5")
+    client.get(f"{rota}/1")
+    depois = client.get("/metrics")
+    assert depois.headers["content-type"].startswith("text/plain")
+    texto = depois.text
+    assert contagem(texto) == inicial + 1
+    # A rota é o template, não a URL: um rótulo por id seria uma série por produto
+    assert 'route="/api/v1/produtos/produto/{produto_id}"' in texto
+    assert "/api/v1/produtos/produto/1\"" not in texto
+    assert amostra(texto, "db_queries_per_request_sum", method="GET", route=rota) >= 1
+    assert 'db_pool_connections_in_use{pool="primary"}' in texto
+    assert re.search(r'^http_requests_in_flight \d', texto, re.M)
+
+
+def test_rota_inexistente_nao_cria_serie_por_url(client):
+    client.get("/nao/existe/123")
+    assert 'route="unmatched"' in client.get("/metrics").text
@@ -0,0 +1,47 @@
+import pytest
+
+
+def criar_clientes(client, nomes):
+    for i, nome in enumerate(nomes):
+        r = client.post("/api/v1/clientes/cliente", json={"nome": nome, "email": f"c{i}@exemplo.com", "cpf": f"{i:011d}"})
+        assert r.status_code == 201
+
+
+def percorrer(client, url):
+    """Segue next_cursor até a última página; retorna os nomes de cada página."""
+    paginas = []
+    cursor = None
+    while True:
+        r = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert r.status_code == 200, r.text
+        corpo = r.json()
+        paginas.append([cliente["nome"] for cliente in corpo["data"]])
+        cursor = corpo["next_cursor"]
+        if cursor is None:
+            return paginas
+
+
+@pytest.mark.parametrize("order_by,esperado", [
+    ("id", ["Eva", "Ana", "Bia", "Ana", "Caio"]),
+    ("nome", ["Ana", "Ana", "Bia", "Caio", "Eva"]),
+    ("-nome", ["Eva", "Caio", "Bia", "Ana", "Ana"]),
+])
+def test_cursor_percorre_todas_as_linhas_uma_vez(client, order_by, esperado):
+    criar_clientes(client, ["Eva", "Ana", "Bia", "Ana", "Caio"])
+    paginas = percorrer(client, f"/api/v1/clientes/cliente?limit=2&order_by={order_by}")
+    assert [len(pagina) for pagina in paginas] == [2, 2, 1]
+    assert sum(paginas, []) == esperado
+
+
+def test_cursor_de_outra_ordenacao(client):
+    criar_clientes(client, ["Eva", "Ana", "Bia"])
+    cursor = client.get("/api/v1/clientes/cliente?limit=1&order_by=nome").json()["next_cursor"]
+    assert client.get(f"/api/v1/clientes/cliente?limit=1&order_by=id&cursor={cursor}").status_code == 400
+    assert client.get("/api/v1/clientes/cliente?cursor=nao-e-um-cursor").status_code == 400
+
+
+def test_paginacao_por_pagina(client):
+    criar_clientes(client, ["Eva", "Ana", "Bia"])
+    r = client.get("/api/v1/clientes/cliente?limit=2&page=2")
+    assert [cliente["nome"] for cliente in r.json()["data"]] == ["Bia"]
+    assert r.json()["next_cursor"] is None
@@ -0,0 +1,86 @@
+from sqlalchemy import select
+
+import app.models as models
+from tests.utils import criar_pedido, estoque
+
+
+def linhas_no_banco(db, pedido_id):
+    db.rollback()
+    return db.execute(
+        select(models.PedidoProdutoOrm.id, models.PedidoProdutoOrm.produto_id, models.PedidoProdutoOrm.quantidade, models.PedidoProdutoOrm.preco_unitario)
+        .where(models.PedidoProdutoOrm.pedido_id == pedido_id)
+        .order_by(models.PedidoProdutoOrm.id)
+    ).all()
+
+
+def test_alterar_quantidade_mantem_a_linha_e_o_preco(client, dados, db):
+    pedido_id = criar_pedido(client, 1, (1, 2), (2, 1)).json()["data"]["id"]
+    antes = linhas_no_banco(db, pedido_id)
+    # O preço muda depois do pedido: as linhas que continuam ficam com o preço antigo
+    assert client.patch("/api/v1/produtos/produto/1", json={"preco": 20}).status_code == 202
+    assert client.patch("/api/v1/produtos/produto/2", json={"preco": 30}).status_code == 202
+
+    r = client.patch(f"/api/v1/pedidos/pedido/{pedido_id}", json={"produtos": [{"produto_id": 1, "quantidade": 4}, {"produto_id": 2, "quantidade": 1}]})
+    assert r.status_code == 202
+    pedido = r.json()["data"]
+    assert [(p["produto_id"], p["quantidade"], p["preco_unitario"]) for p in pedido["produtos"]] == [(1, 4, 10.5), (2, 1, 8)]
+    assert (pedido["total"], pedido["itens"]) == (50, 5)
+
+    depois = linhas_no_banco(db, pedido_id)
+    assert [linha.id for linha in depois] == [linha.id for linha in antes]
+    assert [(linha.quantidade, linha.preco_unitario) for linha in depois] == [(4, 10.5), (1, 8)]
+    assert (estoque(client, 1), estoque(client, 2)) == (1, 2)
+    assert client.get(f"/api/v1/pedidos/pedido/{pedido_id}").json()["data"]["total"] == 50
+
+
+def test_trocar_produto_leva_o_preco_atual(client, dados, db):
+    pedido_id = criar_pedido(client, 1, (1, 2)).json()["data"]["id"]
+    client.patch("/api/v1/produtos/produto/2", json={"preco": 30})
+
+    r = client.patch(f"/api/v1/pedidos/pedido/{pedido_id}", json={"produtos": [{"produto_id": 2, "quantidade": 1}]})
+    assert r.status_code == 202
+    assert [(p["produto_id"], p["preco_unitario"]) for p in r.json()["data"]["produtos"]] == [(2, 30)]
+    assert [linha.produto_id for linha in linhas_no_banco(db, pedido_id)] == [2]
+    assert (estoque(client, 1), estoque(client, 2)) == (5, 2)
+
+
+def test_pedido_criado_com_precos_e_totais(client, dados):
+    r = criar_pedido(client, 1, (1, 2), (2, 1))
+    assert r.status_code == 201
+    pedido = r.json()["data"]
+    assert [(p["produto_id"], p["preco_unitario"]) for p in pedido["produtos"]] == [(1, 10.5), (2, 8)]
+    assert (pedido["total"], pedido["itens"]) == (29, 3)
+    assert client.get("/api/v1/pedidos/pedido").json()["data"][0]["total"] == 29
+
+
+def test_pedido_de_produto_inexistente(client, dados):
+    assert criar_pedido(client, 1, (9, 1)).status_code == 404
+    # Cliente inexistente: a chave estrangeira recusa o pedido
+    assert criar_pedido(client, 9, (1, 1)).status_code == 409
+    assert estoque(client, 1) == 5
+
+
+def ids(client, url):
+    r = client.get(url)
+    assert r.status_code == 200, r.text
+    return [pedido["id"] for pedido in r.json()["data"]]
+
+
+def test_filtros_e_ordenacao_da_listagem(client, dados):
+    outro = client.post("/api/v1/clientes/cliente", json={"nome": "Bia", "email": "bia@exemplo.com", "cpf": "2"}).json()["data"]["id"]
+    criar_pedido(client, 1, (1, 1), d_pedido="2026-01-10T10:00:00Z", periodo_inicio="2026-01-01", periodo_fim="2026-01-31")
+    criar_pedido(client, outro, (1, 1), d_pedido="2026-01-12T10:00:00Z", status="enviado")
+    criar_pedido(client, 1, (2, 1), d_pedido="2026-01-11T10:00:00Z", status="cancelado", periodo_inicio="2026-02-01", periodo_fim="2026-02-28")
+
+    url = "/api/v1/pedidos/pedido"
+    assert ids(client, f"{url}?cliente_id=1") == [1, 3]
+    assert ids(client, f"{url}?status=enviado&status=cancelado") == [2, 3]
+    assert ids(client, f"{url}?cliente_id=1&status=pendente") == [1]
+    assert ids(client, f"{url}?d_pedido_de=2026-01-11T00:00:00&d_pedido_ate=2026-01-12T10:00:00") == [3]
+    assert ids(client, f"{url}?periodo_inicio=2026-01-20&periodo_fim=2026-02-05") == [1, 3]
+    assert ids(client, f"{url}?order_by=-d_pedido") == [2, 3, 1]
+
+    # O cursor continua valendo com os filtros
+    r = client.get(f"{url}?cliente_id=1&order_by=d_pedido&limit=1").json()
+    assert ids(client, f"{url}?cliente_id=1&order_by=d_pedido&limit=1&cursor={r['next_cursor']}") == [3]
+    assert client.get(f"{url}?status=perdido").status_code == 422
@@ -0,0 +1,17 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.pool import POOL_CHECKOUT_TIMEOUTS, POOL_CHECKOUT_WAITS, InstrumentedQueuePool, register_pool_metrics
+
+
+def test_pool_esgotado_conta_espera_e_timeout(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    register_pool_metrics(engine, label="teste")
+    esperas, timeouts = POOL_CHECKOUT_WAITS.value(pool="teste"), POOL_CHECKOUT_TIMEOUTS.value(pool="teste")
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert POOL_CHECKOUT_WAITS.value(pool="teste") == esperas + 1
+    assert POOL_CHECKOUT_TIMEOUTS.value(pool="teste") == timeouts + 1
+    engine.dispose()
@@ -0,0 +1,30 @@
+from tests.utils import criar_pedido
+
+
+def test_fields_devolve_so_os_campos_pedidos(client, dados):
+    r = client.get("/api/v1/produtos/produto?fields=nome,preco")
+    assert r.status_code == 200
+    assert r.json()["data"][0] == {"id": 1, "version": 1, "nome": "Arroz", "preco": 10.5}
+
+
+def test_include_escolhe_os_relacionamentos(client, dados):
+    criar_pedido(client, 1, (1, 2))
+    produto = client.get("/api/v1/produtos/produto?fields=nome&include=imagens").json()["data"][0]
+    assert set(produto) == {"id", "version", "nome", "imagens"}
+    assert produto["imagens"][0]["url"] == "http://x/1.jpg"
+
+    pedido = client.get("/api/v1/pedidos/pedido?include=produtos").json()["data"][0]
+    assert pedido["produtos"][0]["produto_id"] == 1
+    assert "produtos" not in client.get("/api/v1/pedidos/pedido?fields=id,total").json()["data"][0]
+
+
+def test_projecao_nos_ids(client, dados):
+    r = client.get("/api/v1/clientes/cliente?ids=1&fields=nome")
+    assert r.json()["data"] == [{"id": 1, "version": 1, "nome": "Ana"}]
+
+
+def test_campo_invalido(client, dados):
+    r = client.get("/api/v1/produtos/produto?fields=nome,senha")
+    assert r.status_code == 400
+    assert "senha" in r.json()["detail"]
+    assert client.get("/api/v1/produtos/produto?include=pedidos").status_code == 400
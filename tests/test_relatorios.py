@@ -0,0 +1,56 @@
+from sqlalchemy import delete
+
+import app.models as models
+from tests.utils import criar_pedido
+
+
+def relatorios(client):
+    vendas = client.get("/api/v1/relatorios/vendas-por-dia").json()["data"]
+    produtos = client.get("/api/v1/relatorios/produtos-mais-vendidos").json()["data"]
+    por_status = client.get("/api/v1/relatorios/pedidos-por-status").json()["data"]
+    return (
+        [(dia["dia"], dia["pedidos"], dia["itens"], dia["receita"]) for dia in vendas],
+        [(p["produto_id"], p["quantidade"], p["receita"]) for p in produtos],
+        {s["status"]: s["pedidos"] for s in por_status},
+    )
+
+
+def test_agregados_acompanham_os_pedidos(client, dados):
+    dia = "2026-01-10"
+    criar_pedido(client, 1, (1, 2), (2, 1), d_pedido=f"{dia}T10:00:00Z")
+    segundo = criar_pedido(client, 1, (2, 2), d_pedido=f"{dia}T15:00:00Z").json()["data"]["id"]
+    assert relatorios(client) == ([(dia, 2, 5, 45.0)], [(2, 3, 24.0), (1, 2, 21.0)], {"pendente": 2})
+
+    # Cancelado sai das vendas; o preço atual não muda a receita já registrada
+    client.patch("/api/v1/produtos/produto/1", json={"preco": 99})
+    client.patch(f"/api/v1/pedidos/pedido/{segundo}", json={"status": "cancelado"})
+    assert relatorios(client) == ([(dia, 1, 3, 29.0)], [(1, 2, 21.0), (2, 1, 8.0)], {"cancelado": 1, "pendente": 1})
+
+    client.delete("/api/v1/pedidos/pedido/1")
+    assert relatorios(client) == ([], [], {"cancelado": 1})
+
+
+def test_ranking_por_receita_e_periodo(client, dados):
+    criar_pedido(client, 1, (1, 1), d_pedido="2026-01-10T10:00:00Z")
+    criar_pedido(client, 1, (2, 2), d_pedido="2026-01-11T10:00:00Z")
+    r = client.get("/api/v1/relatorios/produtos-mais-vendidos?order_by=receita&limit=1")
+    assert [p["produto_id"] for p in r.json()["data"]] == [2]
+    r = client.get("/api/v1/relatorios/vendas-por-dia?inicio=2026-01-11&fim=2026-01-11")
+    assert [dia["dia"] for dia in r.json()["data"]] == ["2026-01-11"]
+    assert client.get("/api/v1/relatorios/vendas-por-dia?inicio=2026-01-11&fim=2026-01-10").status_code == 400
+
+
+def test_reconstrucao_refaz_os_agregados(client, dados, db, rodar_worker):
+    criar_pedido(client, 1, (1, 2), d_pedido="2026-01-10T10:00:00Z")
+    criar_pedido(client, 1, (2, 1), d_pedido="2026-01-12T10:00:00Z", status="cancelado")
+    esperado = relatorios(client)
+    for tabela in (models.RelatorioVendasDiaOrm, models.RelatorioVendasProdutoOrm, models.RelatorioPedidosStatusOrm):
+        db.execute(delete(tabela))
+    db.commit()
+    assert relatorios(client) == ([], [], {})
+
+    r = client.post("/api/v1/relatorios/reconstrucao")
+    assert r.status_code == 202
+    rodar_worker()
+    assert client.get(r.headers["Location"]).json()["data"]["status"] == "concluido"
+    assert relatorios(client) == esperado
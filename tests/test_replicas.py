@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import insert
+
+import app.database as database
+import app.models as models
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """Uma "réplica" SQLite com um produto que o primário não tem."""
+    replicas = database.ReplicaSet([f"sqlite:///{tmp_path}/replica.db"])
+    replicas._checker = object()  # sem a thread de verificação: o teste decide a saúde
+    replica = replicas.replicas[0]
+    models.Base.metadata.create_all(bind=replica.engine)
+    with replica.engine.begin() as conn:
+        conn.execute(insert(models.ProdutoOrm), [{"nome": "Só na réplica", "descricao": "d", "preco": 1, "cod_barras": "1", "estoque": 1}])
+    replica.healthy = True
+    monkeypatch.setattr(database, "replicas", replicas)
+    yield replica
+    replica.engine.dispose()
+
+
+def nomes(client):
+    return [p["nome"] for p in client.get("/api/v1/produtos/produto").json()["data"]]
+
+
+def test_leituras_vao_para_a_replica(client, dados, replica):
+    assert nomes(client) == ["Só na réplica"]
+    # O item por id alimenta o cache: sempre do primário
+    assert client.get("/api/v1/produtos/produto/1").json()["data"]["nome"] == "Arroz"
+
+
+def test_quem_escreveu_le_do_primario(client, dados, replica):
+    client.cookies.clear()
+    r = client.patch("/api/v1/produtos/produto/1", json={"nome": "Arroz parboilizado"})
+    assert r.status_code == 202
+    assert database.READ_YOUR_WRITES_COOKIE in r.headers["set-cookie"]
+    assert nomes(client) == ["Arroz parboilizado", "Feijão"]
+
+    # Outro cliente (sem o cookie) continua lendo da réplica
+    client.cookies.clear()
+    assert nomes(client) == ["Só na réplica"]
+
+
+def test_escrita_com_erro_nao_prende_no_primario(client, dados, replica):
+    client.cookies.clear()
+    r = client.patch("/api/v1/produtos/produto/9", json={"nome": "x"})
+    assert r.status_code == 404 and "set-cookie" not in r.headers
+    assert nomes(client) == ["Só na réplica"]
+
+
+def test_replica_fora_do_rodizio(client, dados, replica):
+    client.cookies.clear()
+    replica.healthy = False
+    assert nomes(client) == ["Arroz", "Feijão"]
+
+    # A verificação (atraso 0 no SQLite) a devolve ao rodízio
+    replica.check()
+    assert replica.healthy and nomes(client) == ["Só na réplica"]
@@ -0,0 +1,43 @@
+import fastapi.routing
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+import app.schemas.produto_schema as schemas
+from app.responses import ModelRoute
+
+
+def test_resposta_e_o_json_do_modelo_sem_revalidar(client, dados, monkeypatch):
+    def revalida(*args, **kwargs):
+        raise AssertionError("o response_model foi validado de novo")
+
+    monkeypatch.setattr(fastapi.routing, "serialize_response", revalida)
+    r = client.get("/api/v1/produtos/produto/1")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    esperado = schemas.ProdutoResponseModel.model_validate(r.json())
+    assert r.content == esperado.model_dump_json().encode()
+
+    r = client.get("/api/v1/produtos/produto?limit=2")
+    assert r.status_code == 200 and len(r.json()["data"]) == 2
+
+
+def test_rotas_com_dict_usam_orjson(client):
+    r = client.get("/api/healthchecker")
+    assert r.content == b'{"message":"API em funcionamento!!"}'
+
+
+def test_model_route_usa_o_status_da_rota():
+    class Item(BaseModel):
+        nome: str
+
+    app = FastAPI()
+    rotas = fastapi.routing.APIRouter(route_class=ModelRoute)
+
+    @rotas.post("/item", status_code=201, response_model=Item)
+    async def criar() -> Item:
+        return Item(nome="a")
+
+    app.include_router(rotas)
+    r = TestClient(app).post("/item")
+    assert (r.status_code, r.content) == (201, b'{"nome":"a"}')
@@ -0,0 +1,21 @@
+from bench import seed
+from tests.utils import criar_pedido
+
+
+def test_dados_gerados_sao_consistentes_com_a_api(client, capsys):
+    seed.run(clientes=4, produtos=6, pedidos=15, linhas=2, batch_size=4, seed=1, relatorios=True)
+    capsys.readouterr()
+
+    pedidos = client.get("/api/v1/pedidos/pedido?include=produtos&limit=100").json()["data"]
+    assert len(pedidos) == 15
+    for pedido in pedidos:
+        assert pedido["itens"] == sum(linha["quantidade"] for linha in pedido["produtos"])
+        assert abs(pedido["total"] - sum(linha["quantidade"] * linha["preco_unitario"] for linha in pedido["produtos"])) < 0.01
+
+    por_status = client.get("/api/v1/relatorios/pedidos-por-status").json()["data"]
+    assert sum(s["pedidos"] for s in por_status) == 15
+
+    # Os ids continuam depois dos gerados: a API segue criando normalmente
+    assert criar_pedido(client, 1, (1, 1)).json()["data"]["id"] == 16
+    seed.run(clientes=1, produtos=1, pedidos=1, linhas=1, batch_size=4, seed=2, relatorios=False)
+    assert len(client.get("/api/v1/pedidos/pedido?limit=100").json()["data"]) == 17
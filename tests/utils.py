@@ -0,0 +1,8 @@
+def estoque(client, produto_id: int) -> int:
+    return client.get(f"/api/v1/produtos/produto/{produto_id}").json()["data"]["estoque"]
+
+
+def criar_pedido(client, cliente_id: int, *linhas, **kwargs):
+    """POST /pedido com linhas (produto_id, quantidade)."""
+    payload = {"cliente_id": cliente_id, "produtos": [{"produto_id": p, "quantidade": q} for p, q in linhas], **kwargs}
+    return client.post("/api/v1/pedidos/pedido", json=payload)